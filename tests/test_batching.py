@@ -0,0 +1,130 @@
+import asyncio
+
+from textworld import batching
+from textworld.batching import SceneBatcher
+from textworld.scheduler import TurnScheduler
+
+
+class Actor:
+    turn_deadline = None
+
+    def __init__(self, name, location):
+        self.name = name
+        self.location = location
+        self.public_description = name
+        self.briefed = False
+
+    async def batch_brief(self):
+        self.briefed = True
+        return self.name
+
+    def turn_priority(self):
+        return 0
+
+
+class Client:
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = 0
+        self.finished = 0
+
+    async def generate_stream(self, prompt, system, session=None, on_field=None):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        self.finished += 1
+        session.stats = {"prompt_eval_count": 10, "eval_count": 5}
+        return {name: {"response": "hi"} for name in "abcdef"}
+
+
+class Location:
+    name = "Clearing"
+    description = ""
+    exits_display_raw = "north"
+
+    def __init__(self):
+        self.actors = []
+
+    def list_actors(self):
+        return self.actors
+
+
+def scene(count):
+    location = Location()
+    location.actors.extend(Actor(name, location) for name in "abcdef"[:count])
+    return location
+
+
+def test_a_full_batch_takes_one_scheduler_slot(monkeypatch):
+    client = Client()
+    monkeypatch.setattr(batching, "get_ollama_client", lambda: client)
+
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=4, calls_per_sec=100)
+        batcher = SceneBatcher(window=10.0, max_batch=6, scheduler=scheduler)
+        location = scene(6)
+        responses = await asyncio.gather(
+            *(batcher.request(actor) for actor in location.actors)
+        )
+        assert responses == [{"response": "hi"}] * 6
+        assert client.calls == 1
+        assert scheduler.started == 1
+        assert batcher.batched_turns == 6
+
+    asyncio.run(scenario())
+
+
+def test_a_batch_is_bounded_by_the_turn_deadline(monkeypatch):
+    monkeypatch.setattr(batching, "get_ollama_client", lambda: Client(delay=10.0))
+
+    async def scenario():
+        batcher = SceneBatcher(window=0.0, scheduler=TurnScheduler())
+        location = scene(2)
+        for actor in location.actors:
+            actor.turn_deadline = 0.05
+        requests = [batcher.request(actor) for actor in location.actors]
+        for result in await asyncio.gather(*requests, return_exceptions=True):
+            assert isinstance(result, TimeoutError)
+        assert not batcher._running
+
+    asyncio.run(scenario())
+
+
+def test_a_batch_nobody_waits_for_is_cancelled(monkeypatch):
+    client = Client(delay=10.0)
+    monkeypatch.setattr(batching, "get_ollama_client", lambda: client)
+
+    async def scenario():
+        scheduler = TurnScheduler()
+        batcher = SceneBatcher(window=0.0, scheduler=scheduler)
+        location = scene(3)
+        requests = [
+            asyncio.create_task(batcher.request(actor)) for actor in location.actors
+        ]
+        await asyncio.sleep(0.01)
+        assert client.calls == 1
+        for request in requests:
+            request.cancel()
+        await asyncio.gather(*requests, return_exceptions=True)
+        await asyncio.sleep(0)
+        assert not batcher._running
+        assert scheduler.running == 0
+        assert client.finished == 0
+
+    asyncio.run(scenario())
+
+
+def test_a_shed_batch_leaves_the_statements_alone(monkeypatch):
+    client = Client()
+    monkeypatch.setattr(batching, "get_ollama_client", lambda: client)
+
+    async def scenario():
+        batcher = SceneBatcher(window=0.0, scheduler=TurnScheduler(max_queued=0))
+        location = scene(2)
+        responses = await asyncio.gather(
+            *(batcher.request(actor) for actor in location.actors)
+        )
+        assert responses == [{}, {}]
+        assert client.calls == 0
+        assert not any(actor.briefed for actor in location.actors)
+
+    asyncio.run(scenario())
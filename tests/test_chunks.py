@@ -0,0 +1,46 @@
+import numpy as np
+
+from textworld.models.chunks import ChunkedWorld
+from textworld.models.occupancy import OccupancyIndex
+
+PLACES = [{"name": "Shack", "description": "", "emoji": "", "color": "red"}]
+
+
+def test_chunks_regenerate_the_same_tiles():
+    first = ChunkedWorld(PLACES, seed=9, chunk_size=8, place_density=0.2)
+    again = ChunkedWorld(PLACES, seed=9, chunk_size=8, place_density=0.2)
+    other = ChunkedWorld(PLACES, seed=10, chunk_size=8, place_density=0.2)
+    for cx, cy in ((0, 0), (-1, 0), (0, -1), (3, -7)):
+        kinds = first.chunk(cx, cy).kinds
+        assert kinds.any()
+        assert np.array_equal(kinds, again.chunk(cx, cy).kinds)
+    assert not np.array_equal(first.chunk(0, 0).kinds, other.chunk(0, 0).kinds)
+    # (-1, 0) and (0, -1) zigzag to different seeds
+    assert not np.array_equal(first.chunk(-1, 0).kinds, first.chunk(0, -1).kinds)
+
+
+def test_tiles_map_to_their_chunk():
+    world = ChunkedWorld(PLACES, seed=1, chunk_size=4, place_density=0.5)
+    view = world.location_at(-3, 6)
+    assert (view.x, view.y) == (-3, 6)
+    kind = world.chunk(-1, 1).kinds[2 * 4 + 1]
+    assert (view.name == "Shack") == bool(kind)
+    assert world.location_at(-3, 6) is view
+    assert world.materialized == 1
+    assert view.get_exit("west").destination is world.location_at(-4, 6)
+
+
+def test_least_recently_used_empty_chunks_are_evicted():
+    occupancy = OccupancyIndex()
+    world = ChunkedWorld(
+        [], seed=1, chunk_size=4, max_live_chunks=2, occupancy=occupancy
+    )
+    occupied = world.location_at(0, 0)
+    occupancy.add("someone", occupied)
+    world.location_at(4, 0)
+    world.location_at(8, 0)  # over the limit; chunk (0, 0) has someone in it
+    assert world.live_chunks == 2
+    assert world.evicted == 1
+    assert world.location_at(0, 0) is occupied
+    world.location_at(4, 0)  # evicted, so generated again
+    assert world.generated == 4
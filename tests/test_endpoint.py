@@ -0,0 +1,69 @@
+import asyncio
+import socket
+
+import pytest
+
+from textworld.llm_trace import TraceReplay
+from textworld.metrics import Metrics, configure_metrics, get_metrics
+from textworld.ollama_utils import RECOVERABLE_ERRORS, OllamaEndpoint
+
+
+def closed_port_url():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    return f"http://127.0.0.1:{port}"
+
+
+@pytest.mark.parametrize("stream", [False, True])
+def test_a_host_that_refuses_connections_trips_the_breaker(stream):
+    async def scenario():
+        endpoint = OllamaEndpoint(closed_port_url(), failure_threshold=2)
+        for _ in range(2):
+            with pytest.raises(RECOVERABLE_ERRORS):
+                async with endpoint.reserve(timeout=5.0) as client:
+                    response = await client.generate(
+                        model="fake", prompt="hi", stream=stream
+                    )
+                    if stream:
+                        async for _ in response:
+                            pass
+        assert endpoint.breaker.state == "open"
+        await endpoint.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_replay_misses_leave_the_breaker_closed():
+    async def scenario():
+        replay = TraceReplay([], timing="instant")
+        endpoint = OllamaEndpoint(closed_port_url(), failure_threshold=2, trace=replay)
+        for _ in range(5):
+            with pytest.raises(RECOVERABLE_ERRORS):
+                async with endpoint.reserve() as client:
+                    await client.generate(model="fake", prompt="hi")
+        assert endpoint.breaker.state == "closed"
+        await endpoint.aclose()
+
+    asyncio.run(scenario())
+
+
+def test_the_wait_for_a_slot_is_timed_apart_from_the_request():
+    async def scenario():
+        endpoint = OllamaEndpoint(closed_port_url(), max_in_flight=1)
+
+        async def hold(seconds):
+            async with endpoint.reserve():
+                await asyncio.sleep(seconds)
+
+        first = asyncio.create_task(hold(0.1))
+        await asyncio.sleep(0)
+        await hold(0.0)
+        await first
+        await endpoint.aclose()
+
+    configure_metrics(Metrics())
+    asyncio.run(scenario())
+    queue = get_metrics().histogram("llm.queue")
+    assert queue.count == 2
+    assert queue.max >= 0.05
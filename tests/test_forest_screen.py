@@ -0,0 +1,39 @@
+import asyncio
+import os
+
+from textual.app import App
+
+from textworld.tui.components.screens.theforestgame import TheForestGameScreen
+
+
+class ForestApp(App):
+    def on_mount(self):
+        self.push_screen(TheForestGameScreen())
+
+
+def play_and_quit(monkeypatch, snapshot_path):
+    monkeypatch.setenv("SNAPSHOT_PATH", snapshot_path)
+    monkeypatch.setenv("SNAPSHOT_INTERVAL", "1000")
+    monkeypatch.setenv("LLM_LOG_PATH", "")
+
+    async def scenario():
+        app = ForestApp()
+        async with app.run_test() as pilot:
+            await pilot.pause(0.2)
+            app.exit()
+        return app
+
+    return asyncio.run(scenario())
+
+
+def test_leaving_the_game_saves_it(monkeypatch, tmp_path):
+    path = str(tmp_path / "forest.twsave")
+    play_and_quit(monkeypatch, path)
+    assert os.path.exists(path)
+
+
+def test_a_failed_save_on_exit_does_not_crash(monkeypatch, tmp_path):
+    path = str(tmp_path / "missing" / "forest.twsave")
+    app = play_and_quit(monkeypatch, path)
+    assert app.return_code == 0
+    assert not os.path.exists(path)
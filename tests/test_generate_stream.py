@@ -0,0 +1,71 @@
+import asyncio
+
+from textworld.fake_ollama import FakeOllama, start_fake_ollama
+from textworld.metrics import Metrics, configure_metrics, get_metrics
+from textworld.ollama_utils import (
+    LLMSession,
+    close_ollama_clients,
+    configure_ollama,
+    get_ollama_client,
+)
+
+
+async def stream_turns(session, chatter=""):
+    runner, url = await start_fake_ollama(FakeOllama(latency=0.01, chatter=chatter))
+    configure_ollama([url], "fake")
+    try:
+        fields = {}
+        client = get_ollama_client()
+        first = await client.generate_stream(
+            "hello", "persona", session=session, on_field=fields.__setitem__
+        )
+        context = session.context
+        await client.generate_stream("again", "persona", session=session)
+        return first, fields, context
+    finally:
+        await close_ollama_clients()
+        await runner.cleanup()
+
+
+def test_a_streamed_turn_keeps_the_session_context():
+    session = LLMSession()
+    response, fields, context = asyncio.run(
+        stream_turns(session, chatter=" I hope that helps!")
+    )
+    assert fields == response
+    assert context
+    assert session.active
+    # the second turn carried on from the first one's context
+    assert len(session.context) > len(context)
+
+
+def test_a_session_without_context_stops_at_the_closing_brace():
+    session = LLMSession(max_context=0)
+    response, _, context = asyncio.run(
+        stream_turns(session, chatter=" I hope that helps!")
+    )
+    assert response
+    assert context is None
+    assert session.stats["cancelled"]
+
+
+def test_waiting_for_the_host_is_not_counted_as_network_time():
+    async def two_turns():
+        runner, url = await start_fake_ollama(FakeOllama(latency=0.2, jitter=0))
+        configure_ollama([url], "fake", max_in_flight_per_host=1)
+        try:
+            client = get_ollama_client()
+            await asyncio.gather(
+                client.generate_stream("hello", "persona"),
+                client.generate_stream("again", "persona"),
+            )
+        finally:
+            await close_ollama_clients()
+            await runner.cleanup()
+
+    configure_metrics(Metrics())
+    asyncio.run(two_turns())
+    metrics = get_metrics()
+    # the second turn waited out the first one's 0.2s in the queue
+    assert metrics.histogram("llm.queue").max >= 0.15
+    assert metrics.histogram("llm.network").max < 0.35
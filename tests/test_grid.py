@@ -0,0 +1,39 @@
+import numpy as np
+
+from textworld.models.directions import Direction
+from textworld.models.grid import GridTopology
+
+
+def grid(width=4, height=3):
+    return GridTopology(width, height, np.zeros(width * height, np.uint16), [])
+
+
+def test_neighbors_match_the_coordinates():
+    world = grid()
+    for index in range(world.width * world.height):
+        y, x = divmod(index, world.width)
+        for direction in Direction:
+            dx, dy = direction.offset
+            expected = (
+                world.index_of(x + dx, y + dy) if world.contains(x + dx, y + dy) else -1
+            )
+            assert world.neighbors[direction, index] == expected
+
+
+def test_exits_stop_at_the_edge_and_parse_any_spelling():
+    world = grid()
+    corner = world.location_at(0, 0)
+    assert world.exits_at(0, 0) == [Direction.SOUTH, Direction.EAST]
+    assert corner.get_exit("north") is None
+    for spelling in ("south", "South ", "s", Direction.SOUTH):
+        assert corner.get_exit(spelling).destination is world.location_at(0, 1)
+    assert corner.exit_towards(world.location_at(1, 0)).direction == Direction.EAST
+
+
+def test_views_are_made_on_demand_and_kept():
+    world = grid()
+    assert world.materialized == 0
+    view = world.location_at(2, 1)
+    assert world.location_at(2, 1) is view
+    view.get_exit("e").destination
+    assert world.materialized == 2
@@ -0,0 +1,50 @@
+import argparse
+import asyncio
+
+from textworld.headless import add_run_arguments, run
+
+
+def test_a_run_against_the_fake_server():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=5)
+    parser.add_argument("--height", type=int, default=2)
+    parser.add_argument("--npcs", type=int, default=3)
+    add_run_arguments(parser)
+    args = parser.parse_args(
+        [
+            "--fake-ollama",
+            "--latency=0.01",
+            "--jitter=0",
+            "--ticks=30",
+            "--tick-interval=0.01",
+            "--trace-memory",
+        ]
+    )
+    stats = asyncio.run(run(args))
+    assert stats["ticks"] == 30
+    assert stats["llm_calls"] > 0
+    assert stats["turn_fallbacks"] == 0
+    assert stats["memory_per_actor_kb"] > 0
+
+
+def test_a_recorded_run_reports_what_the_trace_dropped(tmp_path):
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--width", type=int, default=5)
+    parser.add_argument("--height", type=int, default=2)
+    parser.add_argument("--npcs", type=int, default=3)
+    add_run_arguments(parser)
+    trace_path = tmp_path / "run.trace.jsonl"
+    args = parser.parse_args(
+        [
+            "--fake-ollama",
+            "--latency=0.01",
+            "--jitter=0",
+            "--ticks=10",
+            "--tick-interval=0.01",
+            f"--record-llm={trace_path}",
+        ]
+    )
+    stats = asyncio.run(run(args))
+    assert stats["trace_recorded"] > 0
+    assert stats["trace_dropped"] == 0
+    assert len(trace_path.read_text().splitlines()) == stats["trace_recorded"]
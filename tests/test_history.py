@@ -0,0 +1,77 @@
+import asyncio
+import random
+
+from textworld.models.actors.history import ActorHistory
+
+
+class Note:
+    def __init__(self, text, actor=None):
+        self.text = text
+        self.actor = actor
+
+    def describe(self, viewer):
+        return self.text
+
+
+def wander(history, rng, steps=200):
+    """Moves through a few shared logs, returning what a plain list would hold."""
+    logs = [[] for _ in range(3)]
+    seen = []
+    here = None
+    for step in range(steps):
+        if here is None or rng.random() < 0.2:
+            here = rng.choice(logs)
+            history.enter(here)
+        # everyone's logs keep growing, whether the actor is there or not
+        for log in logs:
+            if rng.random() < 0.5:
+                log.append(Note(f"{step}:{id(log)}"))
+                if log is here:
+                    seen.append(log[-1])
+    return seen
+
+
+def test_events_read_like_a_plain_list():
+    rng = random.Random(2)
+    history = ActorHistory()
+    seen = wander(history, rng)
+    history.leave()
+    seen += wander(history, rng)
+    assert len(history) == len(seen)
+    assert list(history.events()) == seen
+    for _ in range(200):
+        start = rng.randrange(len(seen) + 1)
+        stop = rng.randrange(start, len(seen) + 2)
+        assert list(history.events(start, stop)) == seen[start:stop]
+    assert history[-1] == seen[-1].text
+    assert history[3:9] == [note.text for note in seen[3:9]]
+    assert history[::7] == [note.text for note in seen[::7]]
+
+
+def test_restore_puts_back_the_same_history():
+    rng = random.Random(5)
+    history = ActorHistory()
+    seen = wander(history, rng)
+    copy = ActorHistory()
+    copy.restore(history.stays, history.current_stay, "gist", 4)
+    assert list(copy.events()) == seen
+    assert copy.summary == "gist"
+
+
+def test_compaction_folds_all_but_the_window():
+    history = ActorHistory(window=3)
+    log = []
+    history.enter(log)
+    log.extend(Note(str(n)) for n in range(5))
+    assert not history.needs_compaction
+    log.append(Note("5"))
+    assert history.needs_compaction
+
+    async def summarize(summary, events, viewer):
+        return summary + "".join(event.text for event in events)
+
+    asyncio.run(history.compact(summarize))
+    assert history.summary == "012"
+    assert history.recent == ["3", "4", "5"]
+    assert not history.needs_compaction
+    assert history.prompt_text().splitlines()[1] == "012"
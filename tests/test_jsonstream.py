@@ -0,0 +1,33 @@
+from textworld.jsonstream import JsonObjectStream
+
+
+def test_fields_complete_as_they_stream():
+    stream = JsonObjectStream()
+    assert stream.feed('Sure! {"move": "no') == {}
+    assert stream.partial is None or stream.partial[0] == "move"
+    assert stream.feed('rth", "response": "Hel') == {"move": "north"}
+    assert stream.partial == ("response", "Hel")
+    assert not stream.done
+    assert stream.feed('lo"} and more') == {"response": "Hello"}
+    assert stream.done
+    assert stream.result == {"move": "north", "response": "Hello"}
+
+
+def test_nested_values_and_escapes():
+    stream = JsonObjectStream()
+    text = '{"say": "a \\"quoted\\" }", "facts": ["x", {"y": 1}], "n": null}'
+    for char in text:
+        stream.feed(char)
+    assert stream.done
+    assert stream.fields == {
+        "say": 'a "quoted" }',
+        "facts": ["x", {"y": 1}],
+        "n": None,
+    }
+
+
+def test_nothing_is_scanned_after_the_object():
+    stream = JsonObjectStream()
+    stream.feed('{"a": 1}')
+    assert stream.feed('{"b": 2}') == {}
+    assert stream.result == {"a": 1}
@@ -0,0 +1,35 @@
+import asyncio
+
+from textworld.models.actors.llm import LLMActor
+from textworld.models.simulation import Simulation
+
+
+def test_an_early_move_keeps_the_rest_of_the_turn():
+    async def scenario():
+        simulation = Simulation(6, 4, num_npcs=1, seed=3)
+        actor = next(a for a in simulation.actors if isinstance(a, LLMActor))
+        actor.background_turns = True
+        actor.next_turn = float("inf")
+        start = actor.location
+        direction = start.exits[0].name.lower()
+
+        thinking = asyncio.Event()
+        actor._pending_turn_location = start
+        turn = actor._pending_turn = asyncio.create_task(thinking.wait())
+        actor.on_response_field("move", direction)
+
+        assert await actor.update() == [{"action": "move", "direction": direction}]
+        assert actor._pending_turn is turn
+        actor.move(direction)
+        assert await actor.update() == []
+        assert actor._pending_turn is turn
+
+        # leaving any other way makes the turn stale
+        actor.location = start
+        await actor.update()
+        await asyncio.sleep(0)
+        assert turn.cancelled()
+        assert actor._pending_turn is not turn  # it thinks again
+        actor.cancel_turn()
+
+    asyncio.run(scenario())
@@ -0,0 +1,42 @@
+from textworld.llm_cache import ResponseCache
+
+
+def test_lru_eviction_and_stats():
+    cache = ResponseCache(max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1
+    cache.put("c", 3)  # "b" is the least recently used
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert cache.stats()["hits"] == 2
+    assert cache.stats()["misses"] == 1
+
+
+def test_entries_expire():
+    cache = ResponseCache(ttl=-1.0)
+    cache.put("a", 1)
+    assert cache.get("a") is None
+
+
+def test_key_ignores_whitespace():
+    assert ResponseCache.make_key("m", "sys  tem", " hi\n") == ResponseCache.make_key(
+        "m", "sys tem", "hi"
+    )
+    assert ResponseCache.make_key("m", "s", "hi") != ResponseCache.make_key(
+        "other", "s", "hi"
+    )
+
+
+def test_survives_a_restart(tmp_path):
+    path = str(tmp_path / "cache.sqlite")
+    cache = ResponseCache(max_entries=4, path=path)
+    for index in range(6):
+        cache.put(f"k{index}", {"response": index})
+    cache.close()
+
+    reopened = ResponseCache(max_entries=3, path=path)
+    assert reopened.get("k5") == {"response": 5}
+    assert reopened.get("k2") is None  # only the newest max_entries are loaded
+    reopened.close()
+    assert reopened.write_errors == 0
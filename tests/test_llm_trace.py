@@ -0,0 +1,22 @@
+import asyncio
+import json
+
+from textworld.llm_trace import TraceRecorder
+
+
+def test_records_without_room_in_the_queue_are_counted(tmp_path):
+    path = tmp_path / "session.trace.jsonl"
+
+    async def main():
+        recorder = TraceRecorder(path, max_queue=2)
+        # nothing is written until the loop gets a chance to run the writer
+        for index in range(5):
+            recorder.record("generate", {"prompt": str(index)}, 0.1, response={})
+        await recorder.aclose()
+        return recorder
+
+    recorder = asyncio.run(main())
+    assert recorder.recorded == 5
+    assert recorder.dropped == 3
+    lines = [json.loads(line) for line in path.read_text().splitlines()]
+    assert [line["request"]["prompt"] for line in lines] == ["0", "1"]
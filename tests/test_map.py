@@ -0,0 +1,59 @@
+import random
+
+from textworld.map import MapCells, generate_map_table
+from textworld.models.occupancy import OccupancyIndex
+
+
+class Tile:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+class Grid:
+    bounded = True
+
+
+class Forest:
+    def __init__(self, width, height):
+        self.width = width
+        self.height = height
+        self.grid = Grid()
+        self.occupancy = OccupancyIndex()
+
+
+def cells(table):
+    return [
+        [column._cells[row] for column in table.columns]
+        for row in range(table.row_count)
+    ]
+
+
+def test_an_unchanged_frame_renders_nothing():
+    forest = Forest(4, 3)
+    minimap = MapCells()
+    player = Tile(1, 1)
+    assert minimap.render(forest, player) is not None
+    assert minimap.render(forest, player) is None
+    forest.occupancy.add("npc", Tile(3, 2))
+    assert minimap.render(forest, player) is not None
+
+
+def test_cells_match_a_full_redraw():
+    rng = random.Random(7)
+    forest = Forest(12, 9)
+    for size in (None, (5, 4)):
+        minimap = MapCells(size)
+        player = Tile(0, 0)
+        shown = None
+        for _ in range(100):
+            actor = rng.randrange(6)
+            forest.occupancy.remove(actor)
+            forest.occupancy.add(actor, Tile(rng.randrange(12), rng.randrange(9)))
+            if rng.random() < 0.3:
+                player = Tile(rng.randrange(12), rng.randrange(9))
+            table = minimap.render(forest, player)
+            expected = cells(generate_map_table(forest, player, size))
+            if table is not None:
+                shown = cells(table)
+            assert shown == expected
@@ -0,0 +1,50 @@
+import asyncio
+
+import numpy as np
+
+from textworld.models.actors import memory
+from textworld.models.actors.memory import EpisodicMemory, VectorIndex
+
+
+def test_search_ranks_by_cosine_similarity():
+    index = VectorIndex(capacity=2)
+    index.add([[1, 0, 0], [0, 2, 0], [1, 1, 0]], ["x", "y", "xy"])
+    index.add([[0, 0, 5]], ["z"])  # past the initial capacity
+    assert len(index) == 4
+    hits = index.search([3, 0.1, 0], k=2)
+    assert [payload for _, payload in hits] == ["x", "xy"]
+    assert abs(hits[0][0] - 1.0) < 0.01
+    assert [payload for _, payload in index.search([0, 0, 1], k=10)][0] == "z"
+    assert VectorIndex().search([1, 0, 0]) == []
+
+
+class History(list):
+    def __init__(self, events, recent):
+        super().__init__(events)
+        self.recent = self[-recent:]
+
+
+class Client:
+    """Embeds "event N" as a one-hot vector on axis N."""
+
+    async def embed(self, texts):
+        vectors = np.zeros((len(texts), 8))
+        for row, text in enumerate(texts):
+            vectors[row, int(text.split()[-1])] = 1.0
+        return vectors
+
+
+def test_recall_skips_what_the_prompt_already_has(monkeypatch):
+    monkeypatch.setattr(memory, "get_ollama_client", lambda model: Client())
+
+    async def scenario():
+        history = History([f"event {n}" for n in range(6)], recent=2)
+        episodic = EpisodicMemory("embed", batch_size=4, top_k=1)
+        await episodic.ingest(history)
+        assert len(episodic.index) == 6
+        assert await episodic.recall(history, "event 1") == ["event 1"]
+        # event 5 is in the recent window, so an older event is given instead
+        (recalled,) = await episodic.recall(history, "event 5")
+        assert recalled not in history.recent
+
+    asyncio.run(scenario())
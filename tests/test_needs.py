@@ -0,0 +1,42 @@
+from textworld.models.actors.needs import Need, NeedsEngine
+
+
+class Owner:
+    def __init__(self, name, needs):
+        self.name = name
+        self.needs = needs
+
+
+def test_decay_matches_per_need_arithmetic():
+    engine = NeedsEngine(capacity=2)  # grows while actors are added
+    owners = [
+        Owner(f"npc{n}", [Need("hunger", 1.0 + n, 10.0, 0.5), Need("sleep", 5.0, 5.0)])
+        for n in range(5)
+    ]
+    for owner in owners:
+        engine.add_actor(owner)
+    assert engine.size == 10
+
+    engine.update(2.0)
+    for n, owner in enumerate(owners):
+        hunger, sleep = owner.needs
+        assert hunger.value == 1.0 + n - 1.0
+        assert abs(sleep.value - 4.9) < 1e-9
+        assert hunger.max_value == 10.0 and sleep.decay == 0.05
+
+
+def test_only_needs_that_cross_zero_are_reported_once():
+    engine = NeedsEngine()
+    owner = Owner("npc", [Need("hunger", 1.0, 10.0, 1.0), Need("mood", 8.0, 10.0, 1.0)])
+    engine.add_actor(owner)
+
+    assert engine.update(0.5) == []
+    (crossing,) = engine.update(1.0)
+    assert crossing.actor is owner
+    assert crossing.need is owner.needs[0]
+    assert crossing.value == -0.5
+    # already below zero, so it isn't reported again
+    assert engine.update(1.0) == []
+
+    owner.needs[0].value = 0.5  # topped up through the view
+    assert [c.need.name for c in engine.update(1.0)] == ["hunger"]
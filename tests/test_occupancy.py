@@ -0,0 +1,56 @@
+import random
+
+from textworld.models.occupancy import OccupancyIndex
+
+
+class Tile:
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+def test_actors_follow_their_moves():
+    index = OccupancyIndex()
+    index.add("a", Tile(1, 1))
+    index.add("b", Tile(1, 1))
+    index.add("c", Tile(0, 2))
+    assert index.actors_at(1, 1) == ["a", "b"]
+    assert index.count_at(0, 2) == 1
+    assert index.occupied() == [(1, 1), (0, 2)]
+
+    index.remove("a")
+    index.add("a", Tile(3, 0))
+    index.remove("c")
+    index.remove("c")  # not there any more
+    assert index.position_of("a") == (3, 0)
+    assert index.actors_at(1, 1) == ["b"]
+    assert index.count_at(0, 2) == 0
+    assert index.occupied() == [(3, 0), (1, 1)]
+    assert len(index) == 2 and "c" not in index
+
+
+def test_within_matches_a_scan_sparse_and_dense():
+    rng = random.Random(4)
+    for actors in (3, 400):
+        index = OccupancyIndex()
+        positions = {}
+        for actor in range(actors):
+            positions[actor] = rng.randrange(20), rng.randrange(20)
+            index.add(actor, Tile(*positions[actor]))
+        for k in (0, 1, 3):
+            expected = {
+                actor
+                for actor, (x, y) in positions.items()
+                if abs(x - 10) + abs(y - 10) <= k
+            }
+            assert set(index.within(10, 10, k)) == expected
+
+
+def test_changes_are_only_kept_once_something_drains_them():
+    index = OccupancyIndex()
+    index.add("a", Tile(0, 0))
+    assert index.drain_changes() == set()
+    index.remove("a")
+    index.add("a", Tile(0, 1))
+    assert index.drain_changes() == {(0, 0), (0, 1)}
+    assert index.drain_changes() == set()
@@ -0,0 +1,132 @@
+import asyncio
+
+from textworld.scheduler import TurnScheduler
+
+
+def test_runs_turns_in_priority_order_within_the_limit():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=1)
+        order = []
+        gate = asyncio.Event()
+
+        def turn(name):
+            async def run():
+                order.append(name)
+                if name == "first":
+                    await gate.wait()
+                return name
+
+            return run
+
+        tasks = [asyncio.create_task(scheduler.submit("first", 0, turn("first")))]
+        await asyncio.sleep(0)
+        for key, priority in (("low", 0), ("high", 2), ("mid", 1)):
+            tasks.append(
+                asyncio.create_task(scheduler.submit(key, priority, turn(key)))
+            )
+        await asyncio.sleep(0)
+        assert scheduler.running == 1
+        assert scheduler.depth == 3
+        gate.set()
+        results = await asyncio.gather(*tasks)
+        assert results == ["first", "low", "high", "mid"]
+        assert order == ["first", "high", "mid", "low"]
+
+    asyncio.run(scenario())
+
+
+def test_coalesces_and_sheds():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=1, max_queued=2)
+        gate = asyncio.Event()
+
+        async def blocked():
+            await gate.wait()
+
+        async def answer():
+            return "answer"
+
+        running = asyncio.create_task(scheduler.submit("busy", 0, blocked))
+        await asyncio.sleep(0)
+        first = asyncio.create_task(scheduler.submit("a", 0, answer))
+        again = asyncio.create_task(scheduler.submit("a", 1, answer))
+        other = asyncio.create_task(scheduler.submit("b", 1, answer))
+        shed = asyncio.create_task(scheduler.submit("c", 2, answer))
+        await asyncio.sleep(0)
+        assert scheduler.coalesced == 1
+        assert scheduler.shed == 1
+        gate.set()
+        await running
+        # "a" and "b" tie on priority and "a" was queued first, so it's shed
+        assert await first is None
+        assert await again is None
+        assert await other == "answer"
+        assert await shed == "answer"
+
+    asyncio.run(scenario())
+
+
+def test_a_cancelled_waiter_abandons_its_queued_turn():
+    async def scenario():
+        scheduler = TurnScheduler(max_concurrent=1)
+        gate = asyncio.Event()
+        ran = []
+
+        async def blocked():
+            await gate.wait()
+
+        async def turn():
+            ran.append(True)
+
+        running = asyncio.create_task(scheduler.submit("busy", 0, blocked))
+        await asyncio.sleep(0)
+        waiting = asyncio.create_task(scheduler.submit("a", 0, turn))
+        await asyncio.sleep(0)
+        waiting.cancel()
+        await asyncio.sleep(0)
+        assert scheduler.depth == 0
+        gate.set()
+        await running
+        assert ran == []
+
+    asyncio.run(scenario())
+
+
+def test_tokens_charged_after_the_fact_defer_later_turns():
+    async def scenario():
+        now = [0.0]
+        scheduler = TurnScheduler(tokens_per_sec=100, clock=lambda: now[0])
+
+        async def turn():
+            return True
+
+        assert await scheduler.submit("a", 0, turn)
+        scheduler.charge(150)  # 50 tokens in debt
+        later = asyncio.create_task(scheduler.submit("b", 0, turn))
+        await asyncio.sleep(0)
+        assert scheduler.deferred == 1
+        assert not later.done()
+        now[0] = 1.0
+        assert await later
+
+    asyncio.run(scenario())
+
+
+def test_a_fractional_call_rate_still_lets_calls_through():
+    async def scenario():
+        now = [0.0]
+        scheduler = TurnScheduler(calls_per_sec=0.5, clock=lambda: now[0])
+
+        async def turn():
+            return True
+
+        assert await scheduler.submit("a", 0, turn)
+        later = asyncio.create_task(scheduler.submit("b", 0, turn))
+        await asyncio.sleep(0)
+        assert not later.done()
+        assert scheduler.calls.delay(1) == 2.0
+        now[0] = 2.0
+        scheduler._woken()
+        assert await later
+
+    asyncio.run(scenario())
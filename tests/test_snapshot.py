@@ -0,0 +1,55 @@
+from textworld.models.simulation import Simulation
+from textworld.snapshot import SnapshotWriter, load_snapshot
+
+
+def state(simulation):
+    return [
+        (actor.name, type(actor).__name__, actor.location.x, actor.location.y)
+        for actor in simulation.actors
+    ]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "world.twsave")
+    simulation = Simulation(6, 4, num_npcs=3, seed=5)
+    simulation.player
+    simulation.time = 12.5
+    simulation.player.queued_actions.append({"action": "say", "content": "hi"})
+    SnapshotWriter(path).save_now(simulation)
+
+    restored = load_snapshot(path)
+    assert state(restored) == state(simulation)
+    assert restored.time == simulation.time
+    assert restored.player.name == simulation.player.name
+    assert (restored.grid.kinds == simulation.grid.kinds).all()
+    assert restored.player.get_need_value("sanity") == (
+        simulation.player.get_need_value("sanity")
+    )
+
+
+def test_chunked_round_trip(tmp_path):
+    path = str(tmp_path / "world.twsave")
+    simulation = Simulation(
+        6, 4, num_npcs=2, chunked=True, seed=7, chunk_size=4, max_live_chunks=2
+    )
+    simulation.player
+    SnapshotWriter(path).save_now(simulation)
+
+    restored = load_snapshot(path)
+    assert state(restored) == state(simulation)
+    assert restored.grid.seed == simulation.grid.seed
+
+
+def test_random_generator_carries_on(tmp_path):
+    path = str(tmp_path / "world.twsave")
+    simulation = Simulation(6, 4, num_npcs=2, seed=11)
+    simulation.player
+    simulation.rng.random()
+    SnapshotWriter(path).save_now(simulation)
+
+    restored = load_snapshot(path)
+    assert [restored.rng.random() for _ in range(3)] == [
+        simulation.rng.random() for _ in range(3)
+    ]
+    npc = next(actor for actor in restored.actors if actor is not restored.player)
+    assert npc.rng is restored.rng
@@ -0,0 +1,42 @@
+from textworld.timestep import FixedStep, TimerWheel
+
+
+def test_fixed_step_carries_the_remainder():
+    step = FixedStep(1.0)
+    assert step.advance(0.6) == 0
+    assert step.advance(0.6) == 1
+    assert abs(step.remaining - 0.8) < 1e-9
+    assert step.steps == 1
+
+
+def test_fixed_step_drops_the_backlog_after_a_stall():
+    step = FixedStep(1.0, max_steps=5)
+    assert step.advance(8.5) == 5
+    assert step.dropped == 3
+    assert abs(step.accumulated - 0.5) < 1e-9
+
+
+def test_timer_wheel_wakes_sleepers_when_due():
+    wheel = TimerWheel(resolution=1.0, slots=8)
+    wheel.schedule("a", 2.5)
+    wheel.schedule("b", 5.0)
+    wheel.schedule("far", 20.0)  # more than a turn of the wheel away
+    assert wheel.advance(2.0) == []
+    assert wheel.advance(3.0) == ["a"]
+    assert wheel.advance(10.0) == ["b"]
+    assert len(wheel) == 1
+    assert wheel.advance(19.0) == []
+    assert wheel.advance(20.0) == ["far"]
+
+
+def test_timer_wheel_reschedule_wake_and_cancel():
+    wheel = TimerWheel(resolution=1.0, slots=8)
+    wheel.schedule("a", 1.0)
+    wheel.schedule("a", 4.0)
+    wheel.schedule("b", 6.0)
+    wheel.schedule("c", 2.0)
+    wheel.wake("b")
+    wheel.cancel("c")
+    assert wheel.advance(2.0) == ["b"]
+    assert wheel.advance(4.0) == ["a"]
+    assert len(wheel) == 0
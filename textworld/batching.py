@@ -0,0 +1,160 @@
+import asyncio
+
+from textworld.ollama_utils import LLMSession, get_ollama_client
+
+batch_system_prompt = """
+You are playing several NPCs in a text based adventure, all in the same scene.
+
+Every turn you will be told where the characters are, who else is in the scene,
+and for each character you play what it knows, what has happened to it and
+what was said to it.  Respond in character for every one of them.
+
+Use the following json structure to respond, with one entry per character you
+play, keyed by the character's name:
+
+```
+{
+    "<character name>": {
+        "response": $RESPONSE
+        "move": <one of the valid moves listed for this turn, or null>
+    }
+}
+```
+
+null means the character will not move.
+
+where $RESPONSE is the json string the character would reply with
+
+Keep every response to fewer than 200 characters.
+"""
+
+batch_scene_template = """
+The characters are in: {location.name}
+Description of {location.name}: {location.description}
+
+This is information about everyone currently in the scene:
+{local_actors}
+
+The only moves that are valid right now are: {location.exits_display_raw}
+
+The characters you play this turn are: {names}
+
+{briefs}
+"""
+
+
+class SceneBatcher:
+    """
+    Turns NPCs in the same location take within `window` seconds of each other
+    are sent to the model as one multi-character prompt.
+
+    The scene is described once instead of once per NPC, and the streamed
+    response object has a field per character, so each NPC gets its own part
+    as soon as that field is complete.  An NPC that ends up alone in its batch
+    is told to take its turn on its own, keeping its session context.
+
+    NPCs wait for their batch before they queue for the scheduler, and a batch
+    goes through the scheduler once, taking one slot and one call, within the
+    NPCs' `turn_deadline`.  The briefs (and the statements they take) are only
+    made once the batch starts, so a shed batch leaves them for the next turn,
+    and a batch whose NPCs all stopped waiting is cancelled.
+    """
+
+    def __init__(self, window=0.05, max_batch=6, scheduler=None):
+        self.window = window
+        self.max_batch = max_batch
+        self.scheduler = scheduler
+        self.batches = 0
+        self.batched_turns = 0
+        self._pending: dict[object, list] = {}
+        self._running: set[asyncio.Task] = set()
+
+    async def request(self, actor):
+        """
+        The actor's part of a shared turn (an empty dict if the model left it
+        out), or None if the actor should take the turn on its own.
+        """
+        loop = asyncio.get_running_loop()
+        location = actor.location
+        batch = self._pending.get(location)
+        if batch is None:
+            batch = self._pending[location] = []
+            loop.call_later(self.window, self._flush, location, batch)
+        future = loop.create_future()
+        batch.append((actor, future))
+        if len(batch) >= self.max_batch:
+            self._flush(location, batch)
+        return await future
+
+    def _flush(self, location, batch):
+        if self._pending.get(location) is not batch:
+            return  # already flushed when it filled up
+        del self._pending[location]
+        batch = [(actor, future) for actor, future in batch if not future.done()]
+        if len(batch) == 1:
+            batch[0][1].set_result(None)
+        elif batch:
+            task = asyncio.create_task(self._run(location, batch))
+            self._running.add(task)
+            task.add_done_callback(self._running.discard)
+            futures = [future for _, future in batch]
+
+            def abandon(future):
+                # once nobody is waiting any more the batch gives up its slot
+                if future.cancelled() and all(other.done() for other in futures):
+                    task.cancel()
+
+            for future in futures:
+                future.add_done_callback(abandon)
+
+    async def _run(self, location, batch):
+        futures = {actor.name: future for actor, future in batch}
+
+        def deliver(name, value):
+            future = futures.get(name)
+            if future is not None and not future.done():
+                future.set_result(value if isinstance(value, dict) else {})
+
+        async def turn():
+            prompt = batch_scene_template.format(
+                location=location,
+                local_actors="\n---------------\n".join(
+                    actor.public_description for actor in location.list_actors()
+                ),
+                names=", ".join(futures),
+                briefs="\n".join([await actor.batch_brief() for actor, _ in batch]),
+            )
+            # nobody carries on from a shared turn, so it stops at the closing brace
+            session = LLMSession(max_context=0)
+            response = await get_ollama_client().generate_stream(
+                prompt, batch_system_prompt, session=session, on_field=deliver
+            )
+            self.batches += 1
+            self.batched_turns += len(batch)
+            if self.scheduler is not None and not session.stats.get("cached"):
+                self.scheduler.charge(
+                    (session.stats.get("prompt_eval_count") or len(prompt) // 4)
+                    + (session.stats.get("eval_count") or 0)
+                )
+            return response or {}
+
+        deadlines = [actor.turn_deadline for actor, _ in batch]
+        try:
+            async with asyncio.timeout(None if None in deadlines else max(deadlines)):
+                if self.scheduler is None:
+                    response = await turn()
+                else:
+                    # a shed batch resolves to None, like a shed turn
+                    response = await self.scheduler.submit(
+                        (location, tuple(futures)),
+                        max(actor.turn_priority() for actor, _ in batch),
+                        turn,
+                    )
+        except Exception as error:
+            for future in futures.values():
+                if not future.done():
+                    future.set_exception(error)
+            return
+
+        for name in futures:
+            deliver(name, (response or {}).get(name))
@@ -0,0 +1,110 @@
+"""
+Tick throughput benchmarks across map sizes and NPC counts.
+
+Every scenario runs headless against an in-process fake Ollama server, so the
+numbers only move when the simulation itself gets faster or slower.
+
+    python -m textworld.benchmark --json bench.json
+    python -m textworld.benchmark --baseline bench.json --tolerance 0.2
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+from copy import copy
+
+from rich.console import Console
+from rich.table import Table
+
+from textworld.headless import add_run_arguments, run
+
+MAP_SIZES = [(5, 2), (20, 20), (50, 50)]
+NPC_COUNTS = [4, 16, 64]
+
+COLUMNS = [
+    ("ticks_per_sec", "ticks/s"),
+    ("tick_p50_ms", "p50 ms"),
+    ("tick_p99_ms", "p99 ms"),
+    ("llm_calls_per_sec", "llm calls/s"),
+    ("memory_per_actor_kb", "KiB/actor"),
+]
+
+
+def scenario_name(width, height, npcs):
+    return f"{width}x{height}/{npcs}npcs"
+
+
+async def run_benchmarks(args):
+    results = {}
+    for width, height in MAP_SIZES:
+        for npcs in NPC_COUNTS:
+            scenario = copy(args)
+            scenario.width, scenario.height, scenario.npcs = width, height, npcs
+            results[scenario_name(width, height, npcs)] = await run(scenario)
+    return results
+
+
+def find_regressions(results, baseline, tolerance):
+    regressions = []
+    for name, stats in results.items():
+        previous = baseline.get(name)
+        if not previous:
+            continue
+        if stats["ticks_per_sec"] < previous["ticks_per_sec"] * (1 - tolerance):
+            regressions.append((name, "ticks_per_sec"))
+        if stats["tick_p99_ms"] > previous["tick_p99_ms"] * (1 + tolerance):
+            regressions.append((name, "tick_p99_ms"))
+    return regressions
+
+
+def print_results(results, regressions=()):
+    regressed = set(regressions)
+    table = Table(title="Simulation benchmarks")
+    table.add_column("scenario")
+    for _, label in COLUMNS:
+        table.add_column(label, justify="right")
+    for name, stats in results.items():
+        cells = []
+        for key, _ in COLUMNS:
+            value = stats.get(key)
+            cell = "-" if value is None else f"{value:.2f}"
+            if (name, key) in regressed:
+                cell = f"[bold red]{cell}[/bold red]"
+            cells.append(cell)
+        table.add_row(name, *cells)
+    Console().print(table)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    add_run_arguments(parser)
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--baseline", help="compare against a previous --json file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    # memory is always traced so runs stay comparable with each other
+    parser.set_defaults(
+        ticks=120, warmup=5, tick_interval=0.01, fake_ollama=True, trace_memory=True
+    )
+    args = parser.parse_args()
+
+    results = asyncio.run(run_benchmarks(args))
+
+    regressions = []
+    if args.baseline:
+        with open(args.baseline) as fd:
+            regressions = find_regressions(results, json.load(fd), args.tolerance)
+    print_results(results, regressions)
+
+    if args.json:
+        with open(args.json, "w") as fd:
+            json.dump(results, fd, indent=2)
+
+    if regressions:
+        for name, key in regressions:
+            print(f"regression: {name} {key}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,2 +1,10 @@
 class NeedViolatedError(Exception):
     pass
+
+
+class LLMTimeoutError(Exception):
+    pass
+
+
+class EndpointUnavailableError(Exception):
+    pass
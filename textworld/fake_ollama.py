@@ -0,0 +1,178 @@
+"""
+A stand-in for the Ollama HTTP API, for running the simulation without a GPU.
+
+Answers `/api/generate` (streamed or not), `/api/embed` and `/api/embeddings`
+with canned NPC responses after a configurable latency, so tick throughput can
+be measured against a model host that behaves the same on every run.
+
+    python -m textworld.fake_ollama --port 11435 --latency 0.5 --jitter 0.2
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+
+from aiohttp import web
+
+CANNED_RESPONSES = [
+    {"response": "Evening. Didn't expect to see anyone out here.", "move": None},
+    {"response": "I've got somewhere to be.", "move": "north"},
+    {"response": "Keep your voice down, people are listening.", "move": None},
+    {"response": "Follow me if you want to talk business.", "move": "east"},
+    {"response": "Not now.", "move": "south"},
+    {"response": "You look like you could use a friend.", "move": None},
+    {"response": "This place gives me the creeps.", "move": "west"},
+]
+
+BATCH_NAMES_PREFIX = "The characters you play this turn are: "
+
+
+@web.middleware
+async def _quiet_disconnects(request, handler):
+    try:
+        return await handler(request)
+    except ConnectionResetError:
+        # the client gave up on the request before it was answered
+        return web.Response(status=499)
+
+
+class FakeOllama:
+
+    def __init__(
+        self,
+        latency=0.5,
+        jitter=0.0,
+        responses=None,
+        chatter="",
+        embedding_size=64,
+        seed=None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.responses = responses or CANNED_RESPONSES
+        self.chatter = chatter
+        self.embedding_size = embedding_size
+        self.requests = 0
+        self._random = random.Random(seed)
+
+    def make_app(self):
+        app = web.Application(middlewares=[_quiet_disconnects])
+        app.router.add_post("/api/generate", self.generate)
+        app.router.add_post("/api/embed", self.embed)
+        app.router.add_post("/api/embeddings", self.embeddings)
+        return app
+
+    async def _wait(self):
+        delay = self.latency + self._random.uniform(-self.jitter, self.jitter)
+        await asyncio.sleep(max(delay, 0.0))
+
+    def _completion(self, prompt=""):
+        # a batched turn asks for one response per character
+        for line in prompt.splitlines():
+            if line.startswith(BATCH_NAMES_PREFIX):
+                names = line[len(BATCH_NAMES_PREFIX) :].split(", ")
+                responses = {
+                    name: self._random.choice(self.responses) for name in names
+                }
+                return json.dumps(responses) + self.chatter
+        return json.dumps(self._random.choice(self.responses)) + self.chatter
+
+    def _vector(self, text):
+        digest = hashlib.sha256(text.encode()).digest()
+        seeded = random.Random(digest)
+        return [seeded.uniform(-1.0, 1.0) for _ in range(self.embedding_size)]
+
+    def _done(self, request, completion):
+        prompt_tokens = len(request.get("prompt") or "") // 4
+        completion_tokens = len(completion) // 4
+        context = list(request.get("context") or [])
+        return {
+            "model": request.get("model", ""),
+            "done": True,
+            "done_reason": "stop",
+            "context": context + list(range(prompt_tokens + completion_tokens)),
+            "prompt_eval_count": prompt_tokens,
+            "eval_count": completion_tokens,
+            "total_duration": int(self.latency * 1e9),
+        }
+
+    async def generate(self, request):
+        self.requests += 1
+        body = await request.json()
+        completion = self._completion(body.get("prompt") or "")
+
+        if not body.get("stream", True):
+            await self._wait()
+            return web.json_response(
+                {**self._done(body, completion), "response": completion}
+            )
+
+        response = web.StreamResponse(headers={"Content-Type": "application/x-ndjson"})
+        await response.prepare(request)
+        # spread the latency over the tokens, the way a real model streams them
+        tokens = [completion[i : i + 4] for i in range(0, len(completion), 4)]
+        delay = self.latency / max(len(tokens), 1)
+        try:
+            for token in tokens:
+                await asyncio.sleep(delay)
+                chunk = {
+                    "model": body.get("model", ""),
+                    "response": token,
+                    "done": False,
+                }
+                await response.write(json.dumps(chunk).encode() + b"\n")
+            done = {**self._done(body, completion), "response": ""}
+            await response.write(json.dumps(done).encode() + b"\n")
+        except ConnectionResetError:
+            # the client cancelled the generation
+            pass
+        return response
+
+    async def embed(self, request):
+        self.requests += 1
+        body = await request.json()
+        inputs = body.get("input") or []
+        if isinstance(inputs, str):
+            inputs = [inputs]
+        await self._wait()
+        return web.json_response(
+            {
+                "model": body.get("model", ""),
+                "embeddings": [self._vector(text) for text in inputs],
+            }
+        )
+
+    async def embeddings(self, request):
+        self.requests += 1
+        body = await request.json()
+        await self._wait()
+        return web.json_response({"embedding": self._vector(body.get("prompt", ""))})
+
+
+async def start_fake_ollama(fake: FakeOllama, host="127.0.0.1", port=0):
+    """Serves `fake` in the running loop, returning the runner and its base url."""
+    runner = web.AppRunner(fake.make_app(), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_port = runner.addresses[0][1]
+    return runner, f"http://{host}:{bound_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11435)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    fake = FakeOllama(latency=args.latency, jitter=args.jitter, seed=args.seed)
+    web.run_app(fake.make_app(), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,258 @@
+"""
+Runs the simulation without the TUI, as fast as it will go.
+
+    python -m textworld.headless --ticks 600 --fake-ollama --latency 0.5
+"""
+
+import argparse
+import asyncio
+import gc
+import tracemalloc
+from statistics import quantiles
+from time import perf_counter
+
+import anyio
+
+from textworld.fake_ollama import FakeOllama, start_fake_ollama
+from textworld.llm_trace import TraceRecorder, TraceReplay
+from textworld.metrics import Metrics, configure_metrics, get_metrics
+from textworld.models.actors.llm import LLMActor
+from textworld.models.simulation import Simulation
+from textworld.ollama_utils import (
+    close_ollama_clients,
+    configure_ollama,
+    count_ollama_requests,
+)
+from textworld.profiler import SamplingProfiler
+from textworld.settings import AppSettings
+from textworld.snapshot import SnapshotWriter, load_snapshot
+
+
+def percentile(values, pct):
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return quantiles(values, n=100, method="inclusive")[pct - 1]
+
+
+async def run_headless(
+    simulation: Simulation, ticks, delta_time=1.0, tick_interval=0.0, warmup=0
+):
+    """
+    Ticks `simulation` `ticks` times, advancing simulated time by `delta_time` per
+    tick, and returns timing stats for the run.
+
+    Between ticks the loop sleeps for `tick_interval` real seconds (0 just yields),
+    which is when background NPC turns make progress.  The first `warmup` ticks
+    (connection setup, first prompts) are run but left out of the stats.
+    """
+    simulation.player  # the player is created on first use
+    for _ in range(warmup):
+        await simulation.tick(delta_time)
+        await asyncio.sleep(tick_interval)
+
+    requests_before = count_ollama_requests()
+    tick_times = []
+    started = perf_counter()
+    for _ in range(ticks):
+        tick_started = perf_counter()
+        await simulation.tick(delta_time)
+        tick_times.append(perf_counter() - tick_started)
+        await asyncio.sleep(tick_interval)
+    elapsed = perf_counter() - started
+
+    llm_calls = count_ollama_requests() - requests_before
+    scheduler = simulation.scheduler.stats()
+    return {
+        "ticks": ticks,
+        "elapsed": elapsed,
+        "ticks_per_sec": ticks / elapsed if elapsed else 0.0,
+        "tick_p50_ms": percentile(tick_times, 50) * 1000,
+        "tick_p99_ms": percentile(tick_times, 99) * 1000,
+        "llm_calls": llm_calls,
+        "llm_calls_per_sec": llm_calls / elapsed if elapsed else 0.0,
+        "actor_updates": simulation.actor_updates,
+        "turn_queue_max": scheduler["max_depth"],
+        "turns_coalesced": scheduler["coalesced"],
+        "turns_shed": scheduler["shed"],
+        "batched_turns": simulation.batcher.batched_turns if simulation.batcher else 0,
+        "turn_fallbacks": sum(
+            actor.fallbacks
+            for actor in simulation.actors
+            if isinstance(actor, LLMActor)
+        ),
+    }
+
+
+async def run(args):
+    settings = AppSettings()
+    runner = None
+    hosts = settings.ollama_hosts
+    if args.fake_ollama:
+        runner, url = await start_fake_ollama(
+            FakeOllama(latency=args.latency, jitter=args.jitter)
+        )
+        hosts = [url]
+    trace = None
+    if args.replay_llm:
+        trace = TraceReplay.load(
+            args.replay_llm, "instant" if args.replay_instant else "recorded"
+        )
+    elif args.record_llm:
+        trace = TraceRecorder(args.record_llm)
+    configure_ollama(
+        hosts,
+        settings.ollama_model,
+        max_in_flight_per_host=settings.ollama_max_in_flight_per_host,
+        request_timeout=settings.ollama_request_timeout,
+        failure_threshold=settings.ollama_failure_threshold,
+        reset_timeout=settings.ollama_circuit_reset,
+        trace=trace,
+    )
+
+    configure_metrics(Metrics(enabled=settings.metrics_enabled))
+    profiler = SamplingProfiler() if args.profile else None
+    try:
+        kwargs = dict(
+            max_concurrent_turns=settings.max_concurrent_npc_turns,
+            num_npcs=args.npcs,
+            chunked=args.chunked,
+            seed=args.seed,
+            detail_radius=args.detail_radius,
+            llm_calls_per_sec=args.calls_per_sec or settings.llm_calls_per_sec,
+            llm_tokens_per_sec=args.tokens_per_sec or settings.llm_tokens_per_sec,
+            max_queued_turns=settings.max_queued_npc_turns,
+            turn_deadline=settings.npc_turn_deadline,
+            batch_window=args.batch_window or settings.npc_batch_window,
+            max_batch=settings.max_npc_batch,
+            update_frequency=settings.npc_update_interval,
+            needs_interval=settings.needs_update_interval,
+            max_catch_up=settings.max_catch_up_steps,
+        )
+        baseline = 0
+        if args.trace_memory:
+            # httpx loads its async backend on the first request; load it now so
+            # those imports don't count as what the NPCs cost
+            anyio.current_time()
+            tracemalloc.start()
+            # the same world with no NPCs, so only what the NPCs add is counted
+            empty = Simulation(args.width, args.height, **{**kwargs, "num_npcs": 0})
+            empty.player
+            baseline, _ = tracemalloc.get_traced_memory()
+            del empty
+            gc.collect()
+        restore_ms = None
+        if args.restore:
+            started = perf_counter()
+            simulation = load_snapshot(args.restore, **kwargs)
+            restore_ms = (perf_counter() - started) * 1000
+        else:
+            simulation = Simulation(args.width, args.height, **kwargs)
+        if profiler is not None:
+            profiler.start()
+        stats = await run_headless(
+            simulation, args.ticks, args.delta_time, args.tick_interval, args.warmup
+        )
+        if profiler is not None:
+            profiler.stop()
+            profiler.write(args.profile)
+        if args.metrics:
+            get_metrics().write(args.metrics)
+        if restore_ms is not None:
+            stats["restore_ms"] = restore_ms
+        if args.snapshot:
+            writer = SnapshotWriter(args.snapshot, settings.snapshot_compression)
+            started = perf_counter()
+            await writer.save(simulation)
+            stats["snapshot_ms"] = (perf_counter() - started) * 1000
+            stats["snapshot_kb"] = writer.last_size / 1024
+        if args.trace_memory:
+            # everything the run allocated beyond an NPC-less world, spread over
+            # the NPCs; the fake server was started before tracing
+            memory, _ = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            npcs = max(len(simulation.actors) - 1, 1)
+            stats["memory_per_actor_kb"] = (memory - baseline) / npcs / 1024
+        # tiles that got a Location view; the rest of the map stays plain arrays
+        stats["materialized_tiles"] = simulation.grid.materialized
+        if args.chunked:
+            stats["live_chunks"] = simulation.grid.live_chunks
+            stats["evicted_chunks"] = simulation.grid.evicted
+        await simulation.cancel_turns()
+        if isinstance(trace, TraceReplay):
+            stats["replay_missed"] = trace.missed
+    finally:
+        await close_ollama_clients()
+        if runner is not None:
+            await runner.cleanup()
+    if isinstance(trace, TraceRecorder):
+        # counted once the recorder is closed and everything queued is written
+        stats["trace_recorded"] = trace.recorded
+        stats["trace_dropped"] = trace.dropped
+    return stats
+
+
+def add_run_arguments(parser):
+    parser.add_argument("--ticks", type=int, default=300)
+    parser.add_argument("--delta-time", type=float, default=1.0)
+    parser.add_argument("--tick-interval", type=float, default=0.0)
+    parser.add_argument("--warmup", type=int, default=0)
+    parser.add_argument("--chunked", action="store_true", help="unbounded world")
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument(
+        "--detail-radius",
+        type=int,
+        default=None,
+        help="only NPCs this close to the player get LLM turns",
+    )
+    parser.add_argument("--calls-per-sec", type=float, default=None)
+    parser.add_argument("--tokens-per-sec", type=float, default=None)
+    parser.add_argument(
+        "--batch-window",
+        type=float,
+        default=None,
+        help="share one prompt between NPCs in a location due within this window",
+    )
+    parser.add_argument(
+        "--snapshot", default=None, help="save the world here after the run"
+    )
+    parser.add_argument("--restore", default=None, help="start from this snapshot")
+    parser.add_argument("--record-llm", default=None, help="trace Ollama traffic here")
+    parser.add_argument(
+        "--replay-llm", default=None, help="answer LLM requests from this trace"
+    )
+    parser.add_argument(
+        "--replay-instant",
+        action="store_true",
+        help="replay responses at once instead of at the recorded latency",
+    )
+    parser.add_argument(
+        "--metrics",
+        default=None,
+        help="write span histograms here (Prometheus text for *.prom, else JSON)",
+    )
+    parser.add_argument(
+        "--profile", default=None, help="sample the run and write folded stacks here"
+    )
+    parser.add_argument("--fake-ollama", action="store_true")
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--jitter", type=float, default=0.1)
+    parser.add_argument(
+        "--trace-memory",
+        action="store_true",
+        help="measure memory with tracemalloc (slows the run down)",
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--width", type=int, default=5)
+    parser.add_argument("--height", type=int, default=2)
+    parser.add_argument("--npcs", type=int, default=None)
+    add_run_arguments(parser)
+    stats = asyncio.run(run(parser.parse_args()))
+    for key, value in stats.items():
+        print(f"{key}: {value:.2f}" if isinstance(value, float) else f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+import json
+
+KEY, COLON, VALUE = "key", "colon", "value"
+
+
+class JsonObjectStream:
+    """
+    Incrementally scans streamed model output for the first JSON object in it.
+
+    Text is fed in as it arrives.  Every top-level field is parsed as soon as its
+    value is complete (`fields`), the text of a top-level string value that is
+    still being written is available through `partial`, and `done` is set the
+    moment the object's closing brace arrives, so the caller can stop generating.
+    """
+
+    def __init__(self):
+        self.buffer = []
+        self.fields = {}
+        self.done = False
+        self.result = None
+        self._pos = 0
+        self._start = None
+        self._depth = 0
+        self._in_string = False
+        self._escaped = False
+        self._expect = KEY
+        self._key = None
+        self._token_start = None
+
+    def feed(self, text):
+        """Scans `text`, returning the fields that were completed by it."""
+        completed = {}
+        if self.done:
+            return completed
+
+        self.buffer.append(text)
+        output = "".join(self.buffer)
+        self.buffer = [output]
+
+        for pos in range(self._pos, len(output)):
+            char = output[pos]
+            if self._start is None:
+                if char == "{":
+                    self._start = pos
+                    self._depth = 1
+                continue
+
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == "\\":
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+                    if self._depth == 1 and self._expect == KEY:
+                        self._key = self._loads(output[self._token_start : pos + 1])
+                        self._expect = COLON
+                continue
+
+            if char == '"':
+                self._in_string = True
+                if self._depth == 1 and self._expect in (KEY, VALUE):
+                    if self._token_start is None or self._expect == KEY:
+                        self._token_start = pos
+            elif char in "{[":
+                if self._depth == 1 and self._expect == VALUE:
+                    self._token_start = self._token_start or pos
+                self._depth += 1
+            elif char in "}]":
+                self._depth -= 1
+                if self._depth == 0:
+                    self._complete_field(output, pos, completed)
+                    self.done = True
+                    self.result = self._loads(output[self._start : pos + 1])
+                    self._pos = pos + 1
+                    return completed
+            elif self._depth == 1:
+                if char == ":" and self._expect == COLON:
+                    self._expect = VALUE
+                    self._token_start = None
+                elif char == ",":
+                    self._complete_field(output, pos, completed)
+                elif self._expect == VALUE and not char.isspace():
+                    self._token_start = (
+                        pos if self._token_start is None else self._token_start
+                    )
+
+        self._pos = len(output)
+        return completed
+
+    @property
+    def partial(self):
+        """The in-progress string value of the field being written, if any."""
+        if not (self._in_string and self._depth == 1 and self._expect == VALUE):
+            return None
+        raw = "".join(self.buffer)[self._token_start + 1 :]
+        if self._escaped:
+            raw = raw[:-1]
+        return self._key, self._loads(f'"{raw}"') or raw
+
+    def _complete_field(self, output, pos, completed):
+        if self._expect == VALUE and self._token_start is not None:
+            value = self._loads(output[self._token_start : pos], default=self)
+            if value is not self:
+                self.fields[self._key] = completed[self._key] = value
+        self._expect = KEY
+        self._key = None
+        self._token_start = None
+
+    @staticmethod
+    def _loads(text, default=None):
+        try:
+            return json.loads(text)
+        except json.decoder.JSONDecodeError:
+            return default
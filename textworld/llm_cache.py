@@ -0,0 +1,136 @@
+import hashlib
+import json
+import queue
+import sqlite3
+import threading
+from collections import OrderedDict
+from time import time
+
+
+def normalize(text):
+    return " ".join(text.split()) if text else ""
+
+
+class ResponseCache:
+    """
+    LRU + TTL cache of parsed model responses, keyed on the normalized request.
+
+    Entries live in memory, and optionally in a SQLite file so they survive a
+    restart.  Expiry uses wall-clock time for the same reason.  The file is
+    only read once, when the cache is opened; after that lookups never leave
+    memory and writes go to the file from a background thread, so the event
+    loop never waits on the disk.
+    """
+
+    def __init__(self, max_entries=1024, ttl=120.0, path=None):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.write_errors = 0
+        self._entries = OrderedDict()
+        self._db = None
+        self._writes: queue.SimpleQueue | None = None
+        self._writer: threading.Thread | None = None
+        if path:
+            self._open(path)
+
+    def _open(self, path):
+        # the writer thread takes the connection over once it's loaded
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses"
+            " (key TEXT PRIMARY KEY, expires REAL, value TEXT)"
+        )
+        self._db.execute("DELETE FROM responses WHERE expires <= ?", (time(),))
+        self._db.commit()
+        rows = self._db.execute(
+            "SELECT key, expires, value FROM responses ORDER BY expires DESC LIMIT ?",
+            (self.max_entries,),
+        ).fetchall()
+        for key, expires, value in reversed(rows):
+            self._entries[key] = expires, json.loads(value)
+
+        self._writes = queue.SimpleQueue()
+        self._writer = threading.Thread(
+            target=self._write_behind, name="response-cache", daemon=True
+        )
+        self._writer.start()
+
+    def _write_behind(self):
+        while True:
+            batch = [self._writes.get()]
+            while not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            closing = None in batch
+            try:
+                for statement in batch:
+                    if statement is not None:
+                        self._db.execute(*statement)
+                self._db.commit()
+            except sqlite3.Error:
+                # the in-memory cache still works; only persistence suffers
+                self.write_errors += 1
+            if closing:
+                return
+
+    @staticmethod
+    def make_key(model, system, prompt):
+        request = "\0".join((model, normalize(system), normalize(prompt)))
+        return hashlib.sha256(request.encode()).hexdigest()
+
+    def get(self, key):
+        now = time()
+        entry = self._entries.get(key)
+        if entry is None or entry[0] <= now:
+            if entry is not None:
+                self._forget(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def put(self, key, value):
+        entry = time() + self.ttl, value
+        self._remember(key, entry)
+        if self._writes is not None:
+            self._writes.put(
+                (
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, entry[0], json.dumps(value)),
+                )
+            )
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        """Writes out whatever is still queued and closes the file."""
+        if self._writer is not None:
+            self._writes.put(None)
+            self._writer.join()
+            self._writer = None
+            self._writes = None
+        if self._db is not None:
+            self._db.close()
+            self._db = None
+
+    def _remember(self, key, entry):
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _forget(self, key):
+        self._entries.pop(key, None)
+        if self._writes is not None:
+            self._writes.put(("DELETE FROM responses WHERE key = ?", (key,)))
@@ -0,0 +1,253 @@
+"""
+Recording and replaying the game's traffic with its Ollama hosts.
+
+    configure_ollama(hosts, model, trace=TraceRecorder("session.trace.jsonl"))
+    configure_ollama(hosts, model, trace=TraceReplay.load("session.trace.jsonl"))
+
+A recorder writes every request with its response (for a streamed one, every
+chunk and when it arrived) as JSON lines.  A replay answers requests from such
+a trace instead of a model host, either at the recorded latency or instantly,
+so a session can be profiled and benchmarked again offline.
+"""
+
+import asyncio
+import json
+from collections import deque
+from time import monotonic
+
+from ollama import ResponseError
+
+from textworld.logsink import AsyncLogSink
+
+# the fields that pick a recorded response; the session context isn't one of
+# them, a replayed session builds up its own
+KEY_FIELDS = ("model", "prompt", "system", "input", "stream")
+
+
+def request_key(method, request):
+    return json.dumps([method] + [request.get(field) for field in KEY_FIELDS])
+
+
+def _plain(response):
+    if hasattr(response, "model_dump"):
+        return response.model_dump(mode="json", exclude_none=True)
+    return dict(response)
+
+
+class TraceRecorder:
+    """
+    Writes a trace of every request made through the endpoints it wraps.
+
+    Records go through an `AsyncLogSink`, so recording never waits on the disk;
+    the ones it had no room for (or couldn't write) are counted in `dropped`,
+    and a replay of the trace misses those requests.
+    """
+
+    def __init__(self, path, max_queue=65536):
+        self.path = path
+        self.recorded = 0
+        self._sink = AsyncLogSink(path, max_queue=max_queue, max_bytes=0)
+
+    def wrap(self, client):
+        return _RecordingClient(client, self)
+
+    def record(self, method, request, duration, response=None, chunks=None, error=None):
+        record = {
+            "method": method,
+            "request": {
+                key: value
+                for key, value in request.items()
+                if key not in ("context", "keep_alive")
+            },
+            "duration": duration,
+        }
+        if response is not None:
+            record["response"] = response
+        if chunks is not None:
+            record["chunks"] = chunks
+        if error is not None:
+            record["error"] = error
+        self._sink.emit(record)
+        self.recorded += 1
+
+    @property
+    def dropped(self):
+        return self._sink.dropped
+
+    async def aclose(self):
+        await self._sink.aclose()
+
+
+def _error(error):
+    if isinstance(error, asyncio.CancelledError):
+        return {"cancelled": True}
+    return {"message": str(error), "status_code": getattr(error, "status_code", -1)}
+
+
+class _RecordingClient:
+    """Stands in for an ollama `AsyncClient`, recording what goes through it."""
+
+    def __init__(self, client, recorder: TraceRecorder):
+        self._client = client
+        self._recorder = recorder
+
+    async def generate(self, **request):
+        if request.get("stream"):
+            started = monotonic()
+            try:
+                chunks = await self._client.generate(**request)
+            except BaseException as error:
+                self._recorder.record(
+                    "generate", request, monotonic() - started, error=_error(error)
+                )
+                raise
+            return self._stream(request, chunks, started)
+        return await self._call("generate", request)
+
+    async def embed(self, **request):
+        return await self._call("embed", request)
+
+    async def embeddings(self, **request):
+        return await self._call("embeddings", request)
+
+    async def _call(self, method, request):
+        started = monotonic()
+        try:
+            response = await getattr(self._client, method)(**request)
+        except BaseException as error:
+            self._recorder.record(
+                method, request, monotonic() - started, error=_error(error)
+            )
+            raise
+        self._recorder.record(
+            method, request, monotonic() - started, response=_plain(response)
+        )
+        return response
+
+    async def _stream(self, request, chunks, started):
+        recorded = []
+        error = None
+        try:
+            async for chunk in chunks:
+                recorded.append([monotonic() - started, _plain(chunk)])
+                yield chunk
+        except (Exception, asyncio.CancelledError) as caught:
+            error = _error(caught)
+            raise
+        finally:
+            # the caller closing the stream early is a normal end, not an error
+            await chunks.aclose()
+            self._recorder.record(
+                "generate",
+                request,
+                monotonic() - started,
+                chunks=recorded,
+                error=error,
+            )
+
+
+class TraceReplay:
+    """
+    Answers requests from a recorded trace.
+
+    Requests are matched to recordings by method, model, prompt and system
+    prompt, in the order they were recorded; once a request has used up its
+    recordings the last one is served again.  Requests that failed fail again.
+    A request that was never recorded (the replayed session went its own way)
+    gets the next successful recording of the same kind instead, and is
+    counted in `missed`.  Cancelled requests never got an answer to replay, so
+    they're left out.
+
+    With `timing="recorded"` responses take as long as they did when recorded,
+    streamed chunks included; with `timing="instant"` they come back at once.
+    """
+
+    def __init__(self, records, timing="recorded"):
+        if timing not in ("recorded", "instant"):
+            raise ValueError(f"unknown replay timing {timing!r}")
+        self.timing = timing
+        self.served = 0
+        self.missed = 0
+        self._by_request: dict[str, deque] = {}
+        self._by_kind: dict[tuple, list] = {}
+        self._next_of_kind: dict[tuple, int] = {}
+        for record in records:
+            method, request = record["method"], record["request"]
+            error = record.get("error")
+            if error and error.get("cancelled"):
+                continue
+            key = request_key(method, request)
+            self._by_request.setdefault(key, deque()).append(record)
+            if not error:
+                kind = method, bool(request.get("stream"))
+                self._by_kind.setdefault(kind, []).append(record)
+
+    @classmethod
+    def load(cls, path, timing="recorded"):
+        with open(path) as fd:
+            return cls([json.loads(line) for line in fd if line.strip()], timing)
+
+    def wrap(self, client):
+        return _ReplayClient(self)
+
+    def take(self, method, request):
+        """The recording to answer a request with."""
+        recorded = self._by_request.get(request_key(method, request))
+        if recorded:
+            self.served += 1
+            return recorded.popleft() if len(recorded) > 1 else recorded[0]
+
+        kind = method, bool(request.get("stream"))
+        records = self._by_kind.get(kind)
+        if not records:
+            raise ResponseError(f"no recorded {method} requests to replay", 404)
+        self.missed += 1
+        index = self._next_of_kind.get(kind, 0)
+        self._next_of_kind[kind] = (index + 1) % len(records)
+        return records[index]
+
+    async def wait(self, seconds):
+        if self.timing == "recorded" and seconds > 0:
+            await asyncio.sleep(seconds)
+
+    async def aclose(self):
+        pass
+
+
+def _raise_recorded(error):
+    raise ResponseError(error["message"], error.get("status_code", -1))
+
+
+class _ReplayClient:
+    """Stands in for an ollama `AsyncClient`, answering from a `TraceReplay`."""
+
+    def __init__(self, replay: TraceReplay):
+        self._replay = replay
+
+    async def generate(self, **request):
+        record = self._replay.take("generate", request)
+        if "chunks" in record:
+            return self._stream(record)
+        return await self._answer(record)
+
+    async def embed(self, **request):
+        return await self._answer(self._replay.take("embed", request))
+
+    async def embeddings(self, **request):
+        return await self._answer(self._replay.take("embeddings", request))
+
+    async def _answer(self, record):
+        await self._replay.wait(record["duration"])
+        if "error" in record:
+            _raise_recorded(record["error"])
+        return record["response"]
+
+    async def _stream(self, record):
+        elapsed = 0.0
+        for offset, chunk in record["chunks"]:
+            await self._replay.wait(offset - elapsed)
+            elapsed = offset
+            yield chunk
+        if record.get("error"):
+            await self._replay.wait(record["duration"] - elapsed)
+            _raise_recorded(record["error"])
@@ -0,0 +1,127 @@
+import asyncio
+import gzip
+import json
+import os
+import shutil
+from pathlib import Path
+from time import time
+
+
+class AsyncLogSink:
+    """
+    JSON-lines log written by a background task.
+
+    `emit` only puts the record on a bounded queue, so it never waits on the disk.
+    When the queue is full (the disk can't keep up) records are dropped and
+    counted rather than stalling the simulation.  The writer drains the queue in
+    batches and does the file I/O in a worker thread, rotating the file once it
+    grows past `max_bytes`.  A batch that can't be written (missing directory,
+    full disk) is dropped and counted in `write_errors`, and the writer carries
+    on with the next one.
+    """
+
+    def __init__(
+        self,
+        path,
+        max_queue=1024,
+        max_bytes=10 * 1024 * 1024,
+        backup_count=3,
+        compress=False,
+        batch_size=64,
+    ):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.compress = compress
+        self.batch_size = batch_size
+        self.dropped = 0
+        self.write_errors = 0
+        self._queue = asyncio.Queue(max_queue)
+        self._task: asyncio.Task | None = None
+
+    def emit(self, record):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        record.setdefault("time", time())
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run(self):
+        while True:
+            batch = [await self._queue.get()]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            try:
+                lines = "".join(
+                    json.dumps(record, default=str) + "\n" for record in batch
+                )
+                await asyncio.to_thread(self._write, lines)
+            except (OSError, TypeError, ValueError):
+                self.write_errors += 1
+                self.dropped += len(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def _write(self, lines):
+        with open(self.path, "a") as fd:
+            fd.write(lines)
+            size = fd.tell()
+        if self.max_bytes and size >= self.max_bytes:
+            self._rotate()
+
+    def _backup_path(self, index):
+        suffix = ".gz" if self.compress else ""
+        return self.path.with_name(f"{self.path.name}.{index}{suffix}")
+
+    def _rotate(self):
+        if not self.backup_count:
+            os.remove(self.path)
+            return
+        for index in range(self.backup_count - 1, 0, -1):
+            if self._backup_path(index).exists():
+                os.replace(self._backup_path(index), self._backup_path(index + 1))
+        if self.compress:
+            with open(self.path, "rb") as src, gzip.open(
+                self._backup_path(1), "wb"
+            ) as dst:
+                shutil.copyfileobj(src, dst)
+            os.remove(self.path)
+        else:
+            os.replace(self.path, self._backup_path(1))
+
+    async def aclose(self, timeout=5.0):
+        """
+        Writes out everything still queued, waiting at most `timeout` seconds,
+        and stops the writer.  Whatever is left after that is dropped.
+        """
+        if self._task is None:
+            return
+        task, self._task = self._task, None
+        try:
+            async with asyncio.timeout(timeout):
+                await self._queue.join()
+        except TimeoutError:
+            self.dropped += self._queue.qsize()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        while not self._queue.empty():
+            self._queue.get_nowait()
+            self._queue.task_done()
+
+
+_sink: AsyncLogSink | None = None
+
+
+def configure_log_sink(sink: AsyncLogSink | None):
+    global _sink
+    _sink = sink
+
+
+def get_log_sink() -> AsyncLogSink | None:
+    return _sink
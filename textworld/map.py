@@ -1,23 +1,99 @@
 from rich.table import Table
 
 
-def generate_map_table(forest, player_location):
-    table = Table(show_header=False)
+def map_viewport(forest, player_location, size=None):
+    """
+    The columns and rows the minimap shows: the whole map, or a window of
+    `size` (map-sized for an unbounded world) centered on the player.  Windows
+    on a bounded map stop at its edges.
+    """
+    if forest.grid.bounded and size is None:
+        return range(forest.width), range(forest.height)
+    width, height = size or (forest.width, forest.height)
+    left = player_location.x - width // 2
+    top = player_location.y - height // 2
+    if forest.grid.bounded:
+        width, height = min(width, forest.width), min(height, forest.height)
+        left = min(max(left, 0), forest.width - width)
+        top = min(max(top, 0), forest.height - height)
+    return range(left, left + width), range(top, top + height)
+
+
+def map_cell(forest, x, y, player_location):
+    num_actors = forest.occupancy.count_at(x, y)
+    if (player_location.x, player_location.y) == (x, y):
+        cell_color = "bold blue"
+    elif num_actors:
+        cell_color = "bold red"
+    else:
+        cell_color = "white"
+    return f"[{cell_color}]{num_actors}[/{cell_color}]"
 
-    for y in range(forest.height):
-        row = []
-        for x in range(forest.width):
-            tile = forest.get_tile_at(x, y)
-            num_actors = len(tile.list_actors())
-            if player_location is tile:
-                cell_color = "bold blue"
-            elif num_actors:
-                cell_color = "bold red"
-            else:
-                cell_color = "white"
-
-            cell = f"[{cell_color}]{num_actors}[/{cell_color}]"
-            row.append(cell)
-        table.add_row(*row)
 
+def map_table(rows):
+    table = Table(show_header=False)
+    for row in rows:
+        table.add_row(*row)
     return table
+
+
+def generate_map_table(forest, player_location, size=None):
+    columns, rows = map_viewport(forest, player_location, size)
+    return map_table(
+        [[map_cell(forest, x, y, player_location) for x in columns] for y in rows]
+    )
+
+
+class MapCells:
+    """
+    The minimap's cells, kept from one frame to the next.
+
+    Only the cells of tiles whose occupancy changed since the last frame (as
+    reported by the occupancy index) or that the player entered or left are
+    worked out again, and a frame where none of the visible cells changed and
+    the viewport stayed put doesn't produce a table at all.
+    """
+
+    def __init__(self, size=None):
+        self.size = size
+        self._cells: dict[tuple[int, int], str] = {}
+        self._viewport = None
+        self._player = None
+
+    def render(self, forest, player_location):
+        """A table of the visible cells, or None if it would be the same as the last one."""
+        player = player_location.x, player_location.y
+        viewport = map_viewport(forest, player_location, self.size)
+        columns, rows = viewport
+
+        dirty = forest.occupancy.drain_changes()
+        if player != self._player:
+            dirty.add(player)
+            if self._player is not None:
+                dirty.add(self._player)
+            self._player = player
+        for position in dirty:
+            self._cells.pop(position, None)
+
+        if viewport == self._viewport:
+            if not any(x in columns and y in rows for x, y in dirty):
+                return None
+        else:
+            self._viewport = viewport
+            self._cells = {
+                (x, y): cell
+                for (x, y), cell in self._cells.items()
+                if x in columns and y in rows
+            }
+
+        cells = self._cells
+        table_rows = []
+        for y in rows:
+            row = []
+            for x in columns:
+                cell = cells.get((x, y))
+                if cell is None:
+                    cell = cells[x, y] = map_cell(forest, x, y, player_location)
+                row.append(cell)
+            table_rows.append(row)
+        return map_table(table_rows)
@@ -0,0 +1,160 @@
+"""
+Timing spans for the hot paths of the game, kept as in-process histograms.
+
+    with get_metrics().span("tick"):
+        await simulation.tick(delta_time)
+
+    get_metrics().write("metrics.prom")  # or metrics.json
+
+Each span name gets a histogram with fixed, doubling buckets (what the
+Prometheus text export reports) and a window of its most recent timings, which
+the live p50/p99 are worked out from.
+"""
+
+import json
+import os
+from bisect import bisect_left
+from collections import deque
+from time import perf_counter
+
+import numpy as np
+
+# upper bounds in seconds, 10µs to about 84s
+BUCKETS = tuple(1e-5 * 2**index for index in range(24))
+
+
+class Histogram:
+
+    def __init__(self, recent=1024):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+        self.recent = deque(maxlen=recent)
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+        if seconds > self.max:
+            self.max = seconds
+        self.recent.append(seconds)
+
+    def quantiles(self, *qs):
+        """Quantiles of the recent timings, in seconds."""
+        if not self.recent:
+            return [0.0] * len(qs)
+        return [float(value) for value in np.quantile(self.recent, qs)]
+
+    def summary(self):
+        p50, p99 = self.quantiles(0.5, 0.99)
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "max": self.max,
+            "p50": p50,
+            "p99": p99,
+        }
+
+
+class _Span:
+    __slots__ = ("_histogram", "_started")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._started = perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(perf_counter() - self._started)
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Metrics:
+    """
+    Histograms by span name.  A disabled registry hands out spans that don't
+    time anything, so instrumented code costs next to nothing without it.
+    """
+
+    def __init__(self, enabled=True, recent=1024):
+        self.enabled = enabled
+        self.recent = recent
+        self.histograms: dict[str, Histogram] = {}
+
+    def histogram(self, name) -> Histogram:
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms[name] = Histogram(self.recent)
+        return histogram
+
+    def span(self, name):
+        """A context manager timing its body into the `name` histogram."""
+        if not self.enabled:
+            return _NULL_SPAN
+        return _Span(self.histogram(name))
+
+    def observe(self, name, seconds):
+        if self.enabled:
+            self.histogram(name).observe(seconds)
+
+    def reset(self):
+        self.histograms.clear()
+
+    def summary(self):
+        return {
+            name: histogram.summary()
+            for name, histogram in sorted(self.histograms.items())
+        }
+
+    def to_json(self):
+        return json.dumps(self.summary(), indent=2)
+
+    def to_prometheus(self, metric="textworld_span_seconds"):
+        lines = [
+            f"# HELP {metric} Time spent in instrumented spans.",
+            f"# TYPE {metric} histogram",
+        ]
+        for name, histogram in sorted(self.histograms.items()):
+            label = f'span="{name}"'
+            cumulative = 0
+            for bound, count in zip(BUCKETS, histogram.counts):
+                cumulative += count
+                lines.append(f'{metric}_bucket{{{label},le="{bound:g}"}} {cumulative}')
+            lines.append(f'{metric}_bucket{{{label},le="+Inf"}} {histogram.count}')
+            lines.append(f"{metric}_sum{{{label}}} {histogram.sum}")
+            lines.append(f"{metric}_count{{{label}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Writes the histograms to `path`: Prometheus text for *.prom, else JSON."""
+        text = self.to_prometheus() if path.endswith(".prom") else self.to_json()
+        temporary = f"{path}.tmp"
+        with open(temporary, "w") as fd:
+            fd.write(text)
+        os.replace(temporary, path)
+
+
+_metrics = Metrics()
+
+
+def configure_metrics(metrics: Metrics):
+    global _metrics
+    _metrics = metrics
+
+
+def get_metrics() -> Metrics:
+    return _metrics
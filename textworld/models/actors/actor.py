@@ -1,5 +1,7 @@
+from textworld.models.actors.history import ActorHistory
 from textworld.models.actors.needs import Need
 from textworld.models.components import Component
+from textworld.models.journal import Event, EventKind
 
 ACTOR_DESCRIPTION_TEMPLATE = """
 # {actor}
@@ -8,34 +10,75 @@ ACTOR_DESCRIPTION_TEMPLATE = """
 * Exits: {actor.location.exits_display}
 """
 
+ACTOR_PUBLIC_DESCRIPTION_TEMPLATE = """
+Name: {actor.name}
+Known Information:
+{formatted_public_facts}
+{formatted_private_facts}
+"""
+
 
 class Actor(Component):
     _location: "Location" = None
-    needs: list[Need] = []
+    _needs: list[Need] = []
+    _needs_by_name: dict[str, Need] = {}
+    history_window = 20
 
     def __init__(self, name, private_facts, public_facts):
         super().__init__(name)
         self.private_facts = private_facts
         self.public_facts = public_facts
         self.queued_actions = []
-        self.history = []
+        self.history = ActorHistory(self.history_window, owner=self)
+        self._descriptions_key = None
+        self._public_description = None
+        self._private_description = None
 
     async def update(self):
-        for need in self.needs:
-            await need.update()
         actions = self.queued_actions[::]
         del self.queued_actions[::]
         return actions
 
+    def wake_time(self):
+        """
+        When the actor next needs an update if nothing happens around it, or
+        None to be updated every time.
+        """
+        return None
+
     @property
     def description(self):
         return ACTOR_DESCRIPTION_TEMPLATE.format(actor=self)
 
-    def hear(self, actor, statement):
-        if actor == self:
-            self.history.append(f"(Said) {actor}: {statement}")
-        else:
-            self.history.append(f"(Heard) {actor}: {statement}")
+    def _format_descriptions(self):
+        # the descriptions go into every prompt, so only re-format them when the
+        # facts they're built from change
+        key = (self.name, tuple(self.public_facts), tuple(self.private_facts))
+        if key == self._descriptions_key:
+            return
+        formatted_public_facts = "\n".join(f"\t{fact}" for fact in self.public_facts)
+        formatted_private_facts = "\n".join(f"\t{fact}" for fact in self.private_facts)
+        self._public_description = ACTOR_PUBLIC_DESCRIPTION_TEMPLATE.format(
+            actor=self,
+            formatted_public_facts=formatted_public_facts,
+            formatted_private_facts="",
+        )
+        self._private_description = ACTOR_PUBLIC_DESCRIPTION_TEMPLATE.format(
+            actor=self,
+            formatted_public_facts=formatted_public_facts,
+            formatted_private_facts=formatted_private_facts,
+        )
+        self._descriptions_key = key
+
+    @property
+    def public_description(self):
+        self._format_descriptions()
+        return self._public_description
+
+    @property
+    def private_description(self):
+        self._format_descriptions()
+        return self._private_description
 
     @property
     def location(self):
@@ -46,38 +89,48 @@ class Actor(Component):
         if value is self._location:
             return
 
-        if self._location:
-            for actor in self.location.list_actors():
-                if actor is self:
-                    continue
-                actor._history_dirty = True
-                for exit in self.location.exits:
-                    if exit.destination == value:
-                        portal_name = exit.name.lower()
-                        break
-                else:
-                    portal_name = "UNKNOWN"
-
-                actor.history.append(
-                    f"Saw {self.name} leave {self.location.name} towards {value.name} (Using: {portal_name})"
+        origin = self._location
+        if origin:
+            exit = origin.exit_towards(value)
+            company = tuple(
+                actor for actor in origin.list_actors() if actor is not self
+            )
+            origin.record(
+                Event(
+                    EventKind.DEPARTED,
+                    self,
+                    origin,
+                    destination=value,
+                    text=exit.name.lower() if exit else "UNKNOWN",
+                    company=company,
                 )
-                self.history.append(f"Left {actor.name} at {self.location.name}")
-
-            self._location.detach_sync(self)
+            )
+            self.history.leave()
+            origin.detach_sync(self)
 
+        company = tuple(value.list_actors())
         value.attach_sync(self)
         self._location = value
-        self.history.append(f"Moved to {value.name}")
+        self.history.enter(value.log)
+        value.record(Event(EventKind.ARRIVED, self, value, company=company))
 
-        for actor in self.location.list_actors():
-            if actor is self:
-                continue
-            actor._history_dirty = True
-            actor.history.append(f"Encountered {self.name} in {self.location.name}")
-            self.history.append(f"Encountered {actor.name} in {self.location.name}")
+    @property
+    def needs(self):
+        return self._needs
+
+    @needs.setter
+    def needs(self, needs: list[Need]):
+        self._needs = needs
+        self._needs_by_name = {need.name.lower(): need for need in needs}
+
+    def place(self, location: "Location"):
+        """
+        Puts the actor at `location` without it having moved there: nothing is
+        recorded and the history is left alone, as when restoring a saved world.
+        """
+        self._location = location
+        location.attach_sync(self)
 
     def get_need_value(self, need_name):
-        for need in self.needs:
-            if need.name.lower() == need_name.lower():
-                return need.value
-        return None
+        need = self._needs_by_name.get(need_name.lower())
+        return None if need is None else need.value
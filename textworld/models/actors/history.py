@@ -0,0 +1,228 @@
+from bisect import bisect_right
+from collections import deque
+
+from textworld.models.journal import Event, EventKind
+from textworld.ollama_utils import get_ollama_client
+
+SUMMARY_SYSTEM_PROMPT = """
+You keep the memory of an NPC in a text based adventure.
+Fold the new events into the existing summary, keeping the details the character
+would remember: who they met, where they went and what was said.
+
+Use the following json structure to respond:
+
+```
+{{
+    "summary": $SUMMARY
+}}
+```
+
+Keep the summary to fewer than {max_length} characters.
+"""
+
+
+class RuleSummarizer:
+    """
+    Folds events into a fixed-size summary without calling a model.
+
+    Only the most recent places, people and statements are kept, so the summary
+    stays the same size no matter how many events are folded into it.
+    """
+
+    def __init__(self, max_items=5):
+        self.moves = 0
+        self.places = deque(maxlen=max_items)
+        self.people = deque(maxlen=max_items)
+        self.statements = deque(maxlen=max_items)
+
+    def _remember(self, items, item):
+        if item in items:
+            items.remove(item)
+        items.append(item)
+
+    async def __call__(self, summary, events, viewer):
+        for event in events:
+            if event.kind == EventKind.ARRIVED and event.actor is viewer:
+                self.moves += 1
+                self._remember(self.places, event.location.name)
+                for other in event.company:
+                    self._remember(self.people, other.name)
+            elif event.kind == EventKind.ARRIVED:
+                self._remember(self.people, event.actor.name)
+            elif event.kind == EventKind.SAID:
+                self.statements.append(f"{event.actor.name}: {event.text}")
+
+        lines = []
+        if self.moves:
+            lines.append(
+                f"Moved {self.moves} times, most recently to: " + ", ".join(self.places)
+            )
+        if self.people:
+            lines.append("Met: " + ", ".join(self.people))
+        if self.statements:
+            lines.append("Remembered statements:")
+            lines.extend(f"\t{statement}" for statement in self.statements)
+        return "\n".join(lines)
+
+
+class ModelSummarizer:
+    """Asks the model to fold events into the summary, falling back to the rules."""
+
+    def __init__(self, max_length=600, model=None):
+        self.max_length = max_length
+        self.model = model
+        self.fallback = RuleSummarizer()
+
+    async def __call__(self, summary, events, viewer):
+        rule_summary = await self.fallback(summary, events, viewer)
+        prompt = "Existing summary:\n{}\n\nNew events:\n{}".format(
+            summary or "None", "\n".join(event.describe(viewer) for event in events)
+        )
+        response = await get_ollama_client(self.model).generate(
+            prompt, SUMMARY_SYSTEM_PROMPT.format(max_length=self.max_length)
+        )
+        if not response or not isinstance(response.get("summary"), str):
+            return rule_summary
+        return response["summary"][: self.max_length]
+
+
+class ActorHistory:
+    """
+    Everything an actor has seen, with a bounded view of it for prompts.
+
+    Events aren't copied into the history.  It is a list of stays: stretches of
+    the logs of the locations the actor was in, for as long as it was there.
+    Each event is stored once however many actors saw it, and is only turned
+    into text (from this actor's point of view) when something reads it.
+
+    Prompts only get the events that haven't been summarized yet (between
+    `window` and twice that many) plus a summary of everything older.  Folding
+    old events into the summary is done in batches by `compact`, which runs as
+    part of the (background) LLM turn rather than whenever an event happens.
+    """
+
+    def __init__(self, window=20, owner=None):
+        self.window = window
+        self.owner = owner
+        self.summary = ""
+        self._summarized = 0
+        # (log, start, end) of the stays that are over, and the history index
+        # each of them starts at
+        self._stays = []
+        self._offsets = []
+        self._closed = 0
+        # the log of the current location, from where the actor came in
+        self._log = None
+        self._start = 0
+
+    def enter(self, log: list[Event]):
+        self.leave()
+        self._log = log
+        self._start = len(log)
+
+    def leave(self):
+        if self._log is None:
+            return
+        end = len(self._log)
+        if end > self._start:
+            self._stays.append((self._log, self._start, end))
+            self._offsets.append(self._closed)
+            self._closed += end - self._start
+        self._log = None
+
+    @property
+    def stays(self):
+        """(log, start, end) of every stay that is over, oldest first."""
+        return list(self._stays)
+
+    @property
+    def current_stay(self):
+        """(log, start) of the stay the actor is in, or None."""
+        return None if self._log is None else (self._log, self._start)
+
+    def restore(self, stays, current_stay=None, summary="", summarized=0):
+        """Puts back a history saved from its `stays` and `current_stay`."""
+        self._stays = []
+        self._offsets = []
+        self._closed = 0
+        for log, start, end in stays:
+            self._stays.append((log, start, end))
+            self._offsets.append(self._closed)
+            self._closed += end - start
+        self._log, self._start = current_stay or (None, 0)
+        self.summary = summary
+        self._summarized = summarized
+
+    def __len__(self):
+        if self._log is None:
+            return self._closed
+        return self._closed + len(self._log) - self._start
+
+    def events(self, start=0, stop=None):
+        """The events from `start` up to `stop`, oldest first."""
+        stop = len(self) if stop is None else min(stop, len(self))
+        index = start
+        while index < stop:
+            if index >= self._closed:
+                base = self._start - self._closed
+                yield from self._log[base + index : base + stop]
+                return
+            stay = bisect_right(self._offsets, index) - 1
+            log, log_start, log_end = self._stays[stay]
+            first = log_start + index - self._offsets[stay]
+            last = min(log_end, first + stop - index)
+            yield from log[first:last]
+            index += last - first
+
+    def event_at(self, index) -> Event:
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("history index out of range")
+        return next(self.events(index, index + 1))
+
+    def __getitem__(self, item):
+        if not isinstance(item, slice):
+            return self.event_at(item).describe(self.owner)
+        start, stop, step = item.indices(len(self))
+        if step == 1:
+            events = list(self.events(start, stop))
+        else:
+            events = list(self.events())[item]
+        return [event.describe(self.owner) for event in events]
+
+    def __iter__(self):
+        for event in self.events():
+            yield event.describe(self.owner)
+
+    def has_news(self, since):
+        """Whether anything the owner didn't do itself happened since `since`."""
+        return any(event.actor is not self.owner for event in self.events(since))
+
+    @property
+    def recent(self):
+        start = max(self._summarized, len(self) - 2 * self.window)
+        return self[start:]
+
+    @property
+    def needs_compaction(self):
+        # fold in batches of `window` so compaction is amortized across turns
+        return len(self) - self._summarized >= 2 * self.window
+
+    async def compact(self, summarizer):
+        end = len(self) - self.window
+        if end <= self._summarized:
+            return
+        folded = list(self.events(self._summarized, end))
+        self.summary = await summarizer(self.summary, folded, self.owner)
+        self._summarized = end
+
+    def prompt_text(self):
+        lines = []
+        if self.summary:
+            lines.append("Summary of earlier events:")
+            lines.append(self.summary)
+            lines.append("")
+            lines.append("Most recent events:")
+        lines.extend(self.recent)
+        return "\n".join(lines)
@@ -1,42 +1,45 @@
-import json
+import asyncio
+import random
 from time import monotonic
 
+from textworld.batching import SceneBatcher
 from textworld.models.actors.actor import Actor
-from textworld.ollama_utils import OllamaClient
+from textworld.models.actors.player import Player
+from textworld.models.journal import EventKind
+from textworld.llm_cache import ResponseCache
+from textworld.logsink import get_log_sink
+from textworld.metrics import get_metrics
+from textworld.ollama_utils import RECOVERABLE_ERRORS, LLMSession, get_ollama_client
+from textworld.scheduler import (
+    PRIORITY_BACKGROUND,
+    PRIORITY_CONVERSATION,
+    PRIORITY_NEARBY,
+    TurnScheduler,
+)
+from textworld.timestep import TimerWheel
+from textworld.models.actors.history import RuleSummarizer
+from textworld.models.actors.memory import EpisodicMemory
 
-system_chat_template = """
+persona_template = """
 You are an NPC in a text based adventure
 Your character's name is "{actor.name}".
-Your current location is: {location.name}
-Description of {location.name}: {location.description}
-
-
-Recent activity leading up to this round of actions:
-
-```
-{recent_history}
-```
 
 This is information about your character:
 {actor.private_description}
 
-
-This is information about other characters currently in the scene:
-{local_actors}
-
-Respond to the following statement from the speakers (if any)
+Every turn you will be told where your character is, what has happened and who
+else is in the scene.  Respond to the statements from the speakers (if any).
 
 Use the following json structure to respond:
 
 ```
 {{
     "response": $RESPONSE
-    "move": <one of: {location.exits_display_raw},null>
+    "move": <one of the valid moves listed for this turn, or null>
 }}
 ```
 
 null means your character will not move.
-The only moves that are valid right now are: {location.exits_display_raw}
 If a direction you want is not listed, then you are at the edge of the map
 
 where $RESPONSE is the json string you would reply with (in character)
@@ -44,120 +47,451 @@ where $RESPONSE is the json string you would reply with (in character)
 Keep all responses to fewer than 200 characters.
 """
 
-ACTOR_PUBLIC_DESCRIPTION_TEMPLATE = """
-Name: {actor.name}
-Known Information:
-{formatted_public_facts}
-{formatted_private_facts}
+scene_template = """
+Your current location is: {location.name}
+Description of {location.name}: {location.description}
+
+{activity_heading}:
+
+```
+{recent_history}
+```
+
+Older memories that may be relevant right now:
+
+```
+{memories}
+```
+
+This is information about other characters currently in the scene:
+{local_actors}
+
+The only moves that are valid right now are: {location.exits_display_raw}
+
+Statements from the speakers:
+{statements}
+"""
+
+character_template = """
+## {actor.name}
+
+This is information about {actor.name}:
+{actor.private_description}
+
+Recent activity {actor.name} has seen:
+
+```
+{recent_history}
+```
+
+Older memories of {actor.name}'s that may be relevant right now:
+
+```
+{memories}
+```
+
+Statements to {actor.name} from the speakers:
+{statements}
 """
 
 
+def response_field_action(key, value):
+    if not value:
+        return None
+    if key == "response":
+        return {"action": "say", "content": value}
+    if key == "move":
+        return {"action": "move", "direction": value}
+    return None
+
+
 class LLMActor(Actor):
     action_tick = 10.0
+    scheduler: TurnScheduler | None = None
+    wakeups: TimerWheel | None = None
+    batcher: SceneBatcher | None = None
+    background_turns = False
+    stream_turns = False
+    # seconds a turn may take, waiting for the scheduler included; None waits forever
+    turn_deadline: float | None = None
+    # NPCs out of the player's sight drop to a cheap random walk every idle_tick
+    # seconds
+    full_detail = True
+    idle_tick = 30.0
+    wander_chance = 0.5
+    # the simulation hands its NPCs its own generator, seeded with the world
+    rng = random.Random()
 
-    def __init__(self, name, private_facts, public_facts):
+    def __init__(
+        self,
+        name,
+        private_facts,
+        public_facts,
+        summarizer=None,
+        memory=None,
+        clock=monotonic,
+    ):
         super().__init__(name, private_facts, public_facts)
-        self.tick_remaining = self.action_tick
-        self.last_update = monotonic()
+        self.clock = clock
+        self.summarizer = summarizer or RuleSummarizer()
+        self.memory: EpisodicMemory | None = memory
+        self.next_turn = self.clock() + self.action_tick
         self.name = name
         self.private_facts = private_facts
         self.public_facts = public_facts
         self._history_dirty = False
-        self._recent_statements = []
+        # how far into the history the last turn and the last prompt had got
+        self._turn_seen = 0
+        self._statements_seen = 0
+        self._pending_turn: asyncio.Task | None = None
+        self._pending_turn_location = None
+        self._early_actions = []
+        self._committed_fields = set()
+        self.partial_response = None
+        self.session = LLMSession()
+        self._persona = None
+        self._persona_source = None
+        self._prompted_history = 0
+        self._prompted_scene = None
+        self.fallbacks = 0
 
     @property
-    def public_description(self):
-        formatted_public_facts = "\n".join(f"\t{fact}" for fact in self.public_facts)
-        return ACTOR_PUBLIC_DESCRIPTION_TEMPLATE.format(
-            actor=self,
-            formatted_public_facts=formatted_public_facts,
-            formatted_private_facts="",
-        )
-
-    @property
-    def private_description(self):
-        formatted_public_facts = "\n".join(f"\t{fact}" for fact in self.public_facts)
-        formatted_private_facts = "\n".join(f"\t{fact}" for fact in self.private_facts)
-        return ACTOR_PUBLIC_DESCRIPTION_TEMPLATE.format(
-            actor=self,
-            formatted_public_facts=formatted_public_facts,
-            formatted_private_facts=formatted_private_facts,
-        )
+    def persona(self):
+        """The static part of the prompt, sent as the system prompt."""
+        private_description = self.private_description
+        if private_description is not self._persona_source:
+            self._persona = persona_template.format(actor=self)
+            self._persona_source = private_description
+        return self._persona
 
     async def update(self):
         # maybe move
-        this_update = monotonic()
-        self.tick_remaining -= this_update - self.last_update
-        self.last_update = this_update
-        if self.tick_remaining <= 0 or self._history_dirty:
-            self.tick_remaining = self.action_tick
-            return await self.act()
-        return []
+        now = self.clock()
+        scene = self._pending_turn_location
+        actions = self.collect_turn()
+        # an early move the turn made itself (not applied yet) is not leaving
+        if (
+            self._pending_turn is not None
+            and self.location is not scene
+            and self.location is not self._pending_turn_location
+        ):
+            # the turn is about a scene the actor has left; think again
+            self.cancel_turn()
+            self._history_dirty = True
+
+        if not self.full_detail:
+            if now >= self.next_turn:
+                self.next_turn = now + self.idle_tick
+                actions.extend(self.idle_actions())
+            return actions
+
+        if self._pending_turn is None and (
+            now >= self.next_turn
+            or self._history_dirty
+            or self.history.has_news(self._turn_seen)
+        ):
+            self.next_turn = now + self.action_tick
+            self._history_dirty = False
+            self._turn_seen = len(self.history)
+            if self.background_turns:
+                self.submit_turn()
+            else:
+                actions.extend(await self.take_turn())
+        return actions
+
+    def set_full_detail(self, full_detail):
+        if full_detail == self.full_detail:
+            return
+        self.full_detail = full_detail
+        if full_detail:
+            # don't sit out the rest of a long idle interval
+            self.next_turn = min(self.next_turn, self.clock() + self.action_tick)
+
+    def wake_time(self):
+        return self.next_turn
+
+    def wake(self, *_):
+        """Asks for an update as soon as possible, e.g. when a turn comes in."""
+        if self.wakeups is not None:
+            self.wakeups.wake(self)
+
+    def idle_actions(self):
+        """A rule-based stand-in for an LLM turn: maybe wander off somewhere."""
+        exits = self.location.exits
+        if not exits or self.rng.random() >= self.wander_chance:
+            return []
+        return [{"action": "move", "direction": self.rng.choice(exits).name.lower()}]
+
+    async def take_turn(self):
+        """
+        One LLM turn, queueing included, bounded by `turn_deadline`.  If the
+        deadline passes or the model host fails, the actor falls back to a
+        default action instead.
+        """
+        try:
+            async with asyncio.timeout(self.turn_deadline):
+                if self.batcher is not None:
+                    # a shared turn goes through the scheduler once, as a batch
+                    response = await self.batcher.request(self)
+                    if response is not None:
+                        return await self.act(response)
+                if self.scheduler is None:
+                    return await self.act()
+                actions = await self.scheduler.submit(
+                    self, self.turn_priority(), self.act
+                )
+                return actions or []
+        except RECOVERABLE_ERRORS as error:
+            return self.fallback_actions(error)
+
+    def fallback_actions(self, error):
+        self.fallbacks += 1
+        self.partial_response = None
+        # the model may not have seen the prompt that was built for this turn
+        self.session.reset()
+        log_sink = get_log_sink()
+        if log_sink is not None:
+            log_sink.emit(
+                {
+                    "actor": self.name,
+                    "fallback": type(error).__name__,
+                    "error": str(error),
+                }
+            )
+        return self.idle_actions()
+
+    def turn_priority(self):
+        if any(isinstance(speaker, Player) for speaker, _ in self.recent_statements()):
+            return PRIORITY_CONVERSATION
+        if any(isinstance(actor, Player) for actor in self.location.list_actors()):
+            return PRIORITY_NEARBY
+        return PRIORITY_BACKGROUND
+
+    def submit_turn(self):
+        """
+        Starts thinking about the next turn in the background.  The actions are
+        picked up by `collect_turn` on a later update, so the simulation (and the
+        UI driving it) never waits on the model.
+        """
+        self._pending_turn_location = self.location
+        self._pending_turn = asyncio.create_task(self.take_turn())
+        self._pending_turn.add_done_callback(self.wake)
+
+    def cancel_turn(self):
+        """Abandons the turn in flight, returning its task (if any) to await."""
+        turn, self._pending_turn = self._pending_turn, None
+        del self._early_actions[::]
+        self.partial_response = None
+        if turn is not None:
+            turn.cancel()
+            self.session.reset()
+        return turn
+
+    def collect_turn(self):
+        """
+        Returns the actions of the background turn that are ready.
+
+        With streaming, fields of the response are committed as soon as they are
+        parsed, before the turn itself has finished.
+
+        If the actor has moved since the turn was submitted, the response was
+        written for a scene that no longer exists: speech is dropped and a move is
+        only kept if it is still a valid exit from where the actor is now.
+        """
+        actions = self._early_actions[::]
+        del self._early_actions[::]
+        if self._pending_turn is not None and self._pending_turn.done():
+            turn, self._pending_turn = self._pending_turn, None
+            self.partial_response = None
+            actions.extend(turn.result())
+
+        if actions and self.location is not self._pending_turn_location:
+            actions = [
+                action
+                for action in actions
+                if action["action"] == "move"
+                and self.location.get_exit(action["direction"])
+            ]
+
+        for action in actions:
+            # the rest of a streamed turn follows the actor through its own move
+            if action["action"] == "move":
+                portal = self.location.get_exit(action["direction"])
+                if portal:
+                    self._pending_turn_location = portal.destination
+        return actions
+
+    def on_response_field(self, key, value):
+        if not self.background_turns:
+            return
+        action = response_field_action(key, value)
+        if action:
+            self._committed_fields.add(key)
+            self._early_actions.append(action)
+            self.wake()
+        if key == "response":
+            self.partial_response = None
+
+    def on_response_partial(self, key, text):
+        if key == "response":
+            self.partial_response = text
 
     def move(self, portal):
         self._history_dirty = True
-        for exit_portal in self.location.exits:
-            if exit_portal.name.lower() == portal.lower():
-                self.location = exit_portal.destination
+        exit_portal = self.location.get_exit(portal)
+        if exit_portal:
+            self.location = exit_portal.destination
 
-    def hear(self, actor, statement):
-        if actor is self:
-            self.history.append(f"{actor.name} (self) said: {statement}")
-        else:
-            self._history_dirty = True
-            self.history.append(f"{actor.name} said: {statement}")
-            self._recent_statements.append((actor, statement))
+    def recent_statements(self):
+        """What others said to the actor since its last prompt."""
+        return [
+            (event.actor, event.text)
+            for event in self.history.events(self._statements_seen)
+            if event.kind == EventKind.SAID and event.actor is not self
+        ]
 
-    async def act(self):
-        actions = []
-        base_url = "http://192.168.1.14:11434"
-        model = "mistral"
-        client = OllamaClient(base_url, model)
-        speakers = ", ".join([actor.name for actor, _ in self._recent_statements])
-        local_actors = (
-            "\n---------------\n".join(
-                actor.public_description
-                for actor in self.location.list_actors()
-                if actor is not self
-            )
-            or "None"
+    async def recall(self):
+        if self.memory is None:
+            return []
+        await self.memory.ingest(self.history)
+        query = "\n".join(
+            [f"{self.location.name}: {self.location.description}"]
+            + [
+                f"{actor.name}: {statement}"
+                for actor, statement in self.recent_statements()
+            ]
         )
-        system_prompt = system_chat_template.format(
-            actor=self,
-            speakers=speakers,
+        return await self.memory.recall(self.history, query)
+
+    async def scene_prompt(self, system_prompt):
+        """
+        The per-turn part of the prompt.
+
+        While the session's context is reusable the model has already seen the
+        earlier turns, so only the events since the last turn are sent (and the
+        other characters only when they changed); a fresh session gets the
+        summary and the recent window instead.
+        """
+        continuing = self.session.continues(system_prompt)
+        if continuing:
+            activity_heading = "Activity since your last turn"
+            recent_history = "\n".join(self.history[self._prompted_history :])
+        else:
+            activity_heading = "Recent activity leading up to this round of actions"
+            recent_history = self.history.prompt_text()
+        self._prompted_history = len(self.history)
+
+        others = [actor for actor in self.location.list_actors() if actor is not self]
+        scene = (self.location, [actor.public_description for actor in others])
+        if continuing and scene == self._prompted_scene:
+            local_actors = "Unchanged since your last turn"
+        else:
+            local_actors = "\n---------------\n".join(scene[1]) or "None"
+        self._prompted_scene = scene
+        memories = await self.recall()
+
+        return scene_template.format(
             location=self.location,
-            recent_history="\n".join(self.history),
+            activity_heading=activity_heading,
+            recent_history=recent_history or "Nothing new",
+            memories="\n".join(memories) or "None",
             local_actors=local_actors,
+            statements=self.take_statements(),
         )
 
-        if not self._recent_statements:
-            prompt = "<Not engaged in conversation>"
-        else:
-            prompt = "\n".join(
-                f"{speaker}: {statement}"
-                for speaker, statement in self._recent_statements
-            )
-            del self._recent_statements[::]
+    async def batch_brief(self):
+        """This actor's part of a turn prompt shared with the rest of its scene."""
+        # the actor's own session never sees the shared turn
+        self.session.reset()
+        if self.history.needs_compaction:
+            await self.history.compact(self.summarizer)
+        memories = await self.recall()
+        return character_template.format(
+            actor=self,
+            recent_history=self.history.prompt_text() or "Nothing yet",
+            memories="\n".join(memories) or "None",
+            statements=self.take_statements(),
+        )
 
-        response = await client.generate(prompt, system_prompt)
+    def take_statements(self):
+        recent_statements = self.recent_statements()
+        self._statements_seen = len(self.history)
+        if not recent_statements:
+            return "<Not engaged in conversation>"
+        return "\n".join(
+            f"{speaker.name}: {statement}" for speaker, statement in recent_statements
+        )
+
+    async def act(self, batched=None):
+        """A turn, or with `batched`, the actor's part of a shared one."""
+        with get_metrics().span("actor.act"):
+            return await self._act(batched)
+
+    async def _act(self, batched):
+        actions = []
+        client = get_ollama_client()
+        if self.history.needs_compaction:
+            await self.history.compact(self.summarizer)
+
+        self._committed_fields.clear()
+        self.session.stats = {}
+        started = monotonic()
+        system_prompt = prompt = None
+        response = batched
+        if response is None:
+            system_prompt = self.persona
+            with get_metrics().span("actor.prompt"):
+                prompt = await self.scene_prompt(system_prompt)
+            response = await self.generate(client, system_prompt, prompt)
         if not response:
             return []
 
-        if response:
-            say = response.get("response")
-            if say:
-                actions.append({"action": "say", "content": response["response"]})
-            move = response.get("move")
-            if move:
-                actions.append({"action": "move", "direction": move})
-
-        with open("output.log", "a") as fd:
-            fd.write("\n=========\n")
-            fd.write(system_prompt)
-            fd.write("\n----------\n")
-            fd.write(prompt)
-            fd.write("\n----------\n")
-            fd.write(json.dumps(response))
+        for key in ("response", "move"):
+            if key not in self._committed_fields:
+                action = response_field_action(key, response.get(key))
+                if action:
+                    actions.append(action)
+
+        log_sink = get_log_sink()
+        if log_sink is not None:
+            prompt_hash = None
+            if prompt is not None:
+                prompt_hash = ResponseCache.make_key(
+                    client.model, system_prompt, prompt
+                )[:16]
+            log_sink.emit(
+                {
+                    "actor": self.name,
+                    "model": client.model,
+                    "latency": monotonic() - started,
+                    "prompt_hash": prompt_hash,
+                    "prompt_tokens": self.session.stats.get("prompt_eval_count"),
+                    "completion_tokens": self.session.stats.get("eval_count"),
+                    "cached": self.session.stats.get("cached", False),
+                    "batched": prompt is None,
+                    "response": response,
+                }
+            )
 
-        self._history_dirty = False
         return actions
+
+    async def generate(self, client, system_prompt, prompt):
+        if self.stream_turns:
+            response = await client.generate_stream(
+                prompt,
+                system_prompt,
+                session=self.session,
+                on_field=self.on_response_field,
+                on_partial=self.on_response_partial,
+            )
+        else:
+            response = await client.generate(
+                prompt, system_prompt, session=self.session
+            )
+        if self.scheduler is not None and not self.session.stats.get("cached"):
+            # a cancelled stream never reports its prompt tokens, so estimate them
+            self.scheduler.charge(
+                (self.session.stats.get("prompt_eval_count") or len(prompt) // 4)
+                + (self.session.stats.get("eval_count") or 0)
+            )
+        return response
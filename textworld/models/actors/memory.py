@@ -0,0 +1,97 @@
+import numpy as np
+
+from textworld.ollama_utils import get_ollama_client
+
+
+class VectorIndex:
+    """
+    Append-only matrix of unit vectors with a brute-force cosine search.
+
+    Rows are normalized on insert, so a search is a single matrix-vector product
+    followed by a partial sort of the top `k` scores.  Storage grows by doubling,
+    keeping appends amortized O(1).
+    """
+
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.size = 0
+        self.payloads = []
+        self._vectors = None
+
+    def __len__(self):
+        return self.size
+
+    def add(self, vectors, payloads):
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if not len(vectors):
+            return
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors = vectors / np.maximum(norms, 1e-12)
+
+        if self._vectors is None:
+            self._vectors = np.empty(
+                (max(self.capacity, len(vectors)), vectors.shape[1]), dtype=np.float32
+            )
+        needed = self.size + len(vectors)
+        if needed > len(self._vectors):
+            grown = np.empty(
+                (max(needed, 2 * len(self._vectors)), self._vectors.shape[1]),
+                dtype=np.float32,
+            )
+            grown[: self.size] = self._vectors[: self.size]
+            self._vectors = grown
+
+        self._vectors[self.size : needed] = vectors
+        self.size = needed
+        self.payloads.extend(payloads)
+
+    def search(self, query, k=5):
+        if not self.size or k <= 0:
+            return []
+        query = np.asarray(query, dtype=np.float32)
+        query = query / max(float(np.linalg.norm(query)), 1e-12)
+        scores = self._vectors[: self.size] @ query
+
+        if k < self.size:
+            top = np.argpartition(scores, -k)[-k:]
+        else:
+            top = np.arange(self.size)
+        top = top[np.argsort(scores[top])[::-1]]
+        return [(float(scores[i]), self.payloads[i]) for i in top]
+
+
+class EpisodicMemory:
+    """
+    Embedding-backed recall over an actor's history.
+
+    New history events are embedded in batches and appended to a `VectorIndex`
+    the next time the actor takes a turn.  The index only stores positions in the
+    history, so the event text isn't duplicated.
+    """
+
+    def __init__(self, model, batch_size=32, top_k=5):
+        self.model = model
+        self.batch_size = batch_size
+        self.top_k = top_k
+        self.index = VectorIndex()
+        self._cursor = 0
+
+    async def ingest(self, history):
+        client = get_ollama_client(self.model)
+        while self._cursor < len(history):
+            end = min(self._cursor + self.batch_size, len(history))
+            vectors = await client.embed(history[self._cursor : end])
+            self.index.add(vectors, range(self._cursor, end))
+            self._cursor = end
+
+    async def recall(self, history, query):
+        """Returns the `top_k` events relevant to `query` that aren't in the prompt."""
+        if not self.index.size:
+            return []
+        (query_vector,) = await get_ollama_client(self.model).embed([query])
+        recent_start = len(history) - len(history.recent)
+        # over-fetch so that hits inside the recent window can be skipped
+        hits = self.index.search(query_vector, self.top_k + len(history.recent))
+        return [history[position] for _, position in hits if position < recent_start][
+            : self.top_k
+        ]
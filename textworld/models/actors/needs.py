@@ -1,19 +1,117 @@
-from textworld.errors import NeedViolatedError
+import numpy as np
+
 from textworld.models.components import Component
 
 
 class Need(Component):
+    """
+    One of an actor's needs.  Until it is added to a `NeedsEngine` it keeps its
+    own numbers; after that it is a view of its row in the engine's columns.
+    """
 
     def __init__(self, name, value: float, max_value: float, decay: float = 0.05):
         super().__init__(name)
-        self.value = value
-        self.max_value = max_value
-        self.decay = decay
+        self._value = value
+        self._max_value = max_value
+        self._decay = decay
+        self._engine = None
+        self._row = None
+
+    def bind(self, engine, row):
+        self._engine = engine
+        self._row = row
+
+    @property
+    def value(self):
+        if self._engine is None:
+            return self._value
+        return float(self._engine.values[self._row])
+
+    @value.setter
+    def value(self, value):
+        if self._engine is None:
+            self._value = value
+        else:
+            self._engine.values[self._row] = value
 
-    async def update(self):
-        self.value -= self.decay
-        if self.value < 0:
-            raise NeedViolatedError(self)
+    @property
+    def max_value(self):
+        if self._engine is None:
+            return self._max_value
+        return float(self._engine.max_values[self._row])
+
+    @property
+    def decay(self):
+        """How much the need drops per second."""
+        if self._engine is None:
+            return self._decay
+        return float(self._engine.decays[self._row])
 
     def __str__(self):
         return f"{super().__str__()}  ({self.value / self.max_value:.2%})"
+
+
+class NeedCrossing:
+    """A need that dropped below zero during an update."""
+
+    __slots__ = ("actor", "need", "value")
+
+    def __init__(self, actor, need: Need, value: float):
+        self.actor = actor
+        self.need = need
+        self.value = value
+
+    def __repr__(self):
+        return (
+            f"NeedCrossing({self.actor.name!r}, {self.need.name!r}, {self.value:.2f})"
+        )
+
+
+class NeedsEngine:
+    """
+    The needs of every actor in the world, one row per need, in columns.
+
+    Decaying every need is a single vectorized step scaled by the real time
+    that passed, instead of a coroutine per need per actor, and the needs that
+    crossed zero in that step come back together as one batch.
+    """
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        self.values = np.zeros(capacity)
+        self.max_values = np.zeros(capacity)
+        self.decays = np.zeros(capacity)
+        self.needs: list[Need] = []
+        self.owners = []
+
+    def add(self, actor, need: Need):
+        if self.size == len(self.values):
+            self._grow()
+        row = self.size
+        self.values[row] = need.value
+        self.max_values[row] = need.max_value
+        self.decays[row] = need.decay
+        self.needs.append(need)
+        self.owners.append(actor)
+        need.bind(self, row)
+        self.size += 1
+
+    def add_actor(self, actor):
+        for need in actor.needs:
+            self.add(actor, need)
+
+    def _grow(self):
+        capacity = 2 * len(self.values)
+        for column in ("values", "max_values", "decays"):
+            grown = np.zeros(capacity)
+            grown[: self.size] = getattr(self, column)[: self.size]
+            setattr(self, column, grown)
+
+    def update(self, delta_time) -> list[NeedCrossing]:
+        values = self.values[: self.size]
+        satisfied = values >= 0
+        values -= self.decays[: self.size] * delta_time
+        return [
+            NeedCrossing(self.owners[row], self.needs[row], float(values[row]))
+            for row in np.flatnonzero(satisfied & (values < 0))
+        ]
@@ -0,0 +1,128 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from textworld.models.directions import Direction
+from textworld.models.grid import TileLocation
+from textworld.models.occupancy import OccupancyIndex
+from textworld.timestep import TimerWheel
+
+
+def _unsigned(n):
+    """Zigzag-encodes a chunk coordinate so negative ones can seed a generator."""
+    return 2 * n if n >= 0 else -2 * n - 1
+
+
+class Chunk:
+    def __init__(self, cx, cy, kinds: np.ndarray):
+        self.cx = cx
+        self.cy = cy
+        self.kinds = kinds
+        self.views: dict[tuple[int, int], TileLocation] = {}
+
+    def is_occupied(self):
+        return any(view.count_actors() for view in self.views.values())
+
+
+class ChunkedWorld:
+    """
+    An unbounded map generated one square chunk at a time.
+
+    A chunk's tiles only depend on the world seed and the chunk's coordinates, so
+    chunks are generated the first time anything touches them and can be dropped
+    again once nobody is around: coming back regenerates the same tiles.  Live
+    chunks are kept in LRU order, and past `max_live_chunks` the least recently
+    used chunks without actors in them are evicted.
+    """
+
+    bounded = False
+    width = None
+    height = None
+
+    def __init__(
+        self,
+        places: list[dict],
+        seed=None,
+        chunk_size=32,
+        max_live_chunks=64,
+        place_density=0.01,
+        occupancy: OccupancyIndex | None = None,
+        concurrent_updates=False,
+        wakeups: TimerWheel | None = None,
+    ):
+        self.places = places
+        self.seed = np.random.SeedSequence(seed).entropy
+        self.chunk_size = chunk_size
+        self.max_live_chunks = max_live_chunks
+        self.place_density = place_density
+        self.occupancy = occupancy
+        self.concurrent_updates = concurrent_updates
+        self.wakeups = wakeups
+        self.generated = 0
+        self.evicted = 0
+        self._chunks: OrderedDict[tuple[int, int], Chunk] = OrderedDict()
+
+    def contains(self, x, y):
+        return True
+
+    def exits_at(self, x, y):
+        return list(Direction)
+
+    def chunk(self, cx, cy) -> Chunk:
+        key = cx, cy
+        chunk = self._chunks.get(key)
+        if chunk is None:
+            chunk = self._chunks[key] = self._generate(cx, cy)
+            self._evict()
+        else:
+            self._chunks.move_to_end(key)
+        return chunk
+
+    def _generate(self, cx, cy):
+        rng = np.random.default_rng([self.seed, _unsigned(cx), _unsigned(cy)])
+        tiles = self.chunk_size * self.chunk_size
+        kinds = np.zeros(tiles, dtype=np.uint16)
+        if self.places:
+            spots = rng.random(tiles) < self.place_density
+            kinds[spots] = rng.integers(
+                1, len(self.places) + 1, size=int(spots.sum()), dtype=np.uint16
+            )
+        self.generated += 1
+        return Chunk(cx, cy, kinds)
+
+    def _evict(self):
+        excess = len(self._chunks) - self.max_live_chunks
+        for key in list(self._chunks)[:-1]:
+            if excess <= 0:
+                break
+            if self._chunks[key].is_occupied():
+                continue
+            del self._chunks[key]
+            self.evicted += 1
+            excess -= 1
+
+    def location_at(self, x, y) -> TileLocation:
+        cx, local_x = divmod(x, self.chunk_size)
+        cy, local_y = divmod(y, self.chunk_size)
+        chunk = self.chunk(cx, cy)
+        view = chunk.views.get((x, y))
+        if view is None:
+            kind = chunk.kinds[local_y * self.chunk_size + local_x]
+            place = self.places[kind - 1] if kind else None
+            view = chunk.views[x, y] = TileLocation(self, x, y, place)
+        return view
+
+    def views(self):
+        """The `Location` views of the live chunks."""
+        return [
+            view for chunk in self._chunks.values() for view in chunk.views.values()
+        ]
+
+    @property
+    def live_chunks(self):
+        return len(self._chunks)
+
+    @property
+    def materialized(self):
+        """How many tiles of the live chunks currently have a `Location` view."""
+        return sum(len(chunk.views) for chunk in self._chunks.values())
@@ -1,5 +1,11 @@
+import asyncio
+
+from textworld.metrics import get_metrics
+
+
 class Component:
     color = "blue"
+    concurrent_updates = False
 
     def __init__(self, name):
         self.name = name
@@ -9,21 +15,53 @@ class Component:
         return f"[{self.color}]{self.name}[/{self.color}]"
 
     async def attach(self, component: "Component"):
-        self._components.append(component)
+        self.attach_sync(component)
 
     def attach_sync(self, component: "Component"):
         self._components.append(component)
 
     async def detach(self, component: "Component"):
-        self._components.remove(component)
+        self.detach_sync(component)
 
     def detach_sync(self, component: "Component"):
         self._components.remove(component)
 
     async def update(self) -> list[tuple["Component", dict]]:
+        return await self.update_components()
+
+    async def timed_update(self):
+        with get_metrics().span(f"update.{type(self).__name__}"):
+            return await self.update()
+
+    async def update_components(
+        self, components: list["Component"] | None = None
+    ) -> list[tuple["Component", dict]]:
+        """
+        Updates every child component (or just `components`, in the order they
+        were attached) and collects their actions.
+
+        When `concurrent_updates` is set, the children are updated in a task group
+        so slow children (LLM turns) overlap, but the returned actions always keep
+        the order of `_components`.
+        """
+        if components is None:
+            components = self._components[::]
+        else:
+            components = [
+                component for component in self._components if component in components
+            ]
+        if self.concurrent_updates and len(components) > 1:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(component.timed_update())
+                    for component in components
+                ]
+            results = [task.result() for task in tasks]
+        else:
+            results = [await component.timed_update() for component in components]
+
         actions = []
-        for component in self._components:
-            component_actions = await component.update()
+        for component, component_actions in zip(components, results):
             if component_actions:
                 actions.extend((component, action) for action in component_actions)
         return actions
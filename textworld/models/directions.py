@@ -0,0 +1,46 @@
+from enum import IntEnum
+
+
+class Direction(IntEnum):
+    """Compass directions, in the order a grid stores its neighbor indices."""
+
+    NORTH = 0
+    SOUTH = 1
+    EAST = 2
+    WEST = 3
+
+    @property
+    def label(self):
+        return self.name.capitalize()
+
+    @property
+    def offset(self):
+        return _OFFSETS[self]
+
+    @classmethod
+    def towards(cls, dx, dy):
+        """The direction of a one-tile step by (dx, dy), or None."""
+        return _BY_OFFSET.get((dx, dy))
+
+    @classmethod
+    def parse(cls, value):
+        """The direction named by `value` ("north", "N", ...), or None."""
+        if isinstance(value, Direction):
+            return value
+        return _NAMES.get(str(value).strip().lower())
+
+
+_OFFSETS = {
+    Direction.NORTH: (0, -1),
+    Direction.SOUTH: (0, 1),
+    Direction.EAST: (1, 0),
+    Direction.WEST: (-1, 0),
+}
+
+_BY_OFFSET = {offset: direction for direction, offset in _OFFSETS.items()}
+
+_NAMES = {
+    alias: direction
+    for direction in Direction
+    for alias in (direction.name.lower(), direction.name[0].lower())
+}
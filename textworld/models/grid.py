@@ -0,0 +1,164 @@
+import numpy as np
+
+from textworld.models.components import Component
+from textworld.models.directions import Direction
+from textworld.models.locations import Location, Portal
+from textworld.models.occupancy import OccupancyIndex
+from textworld.timestep import TimerWheel
+
+FOREST_EMOJI = "🌲🌳🌲"
+FOREST_DESCRIPTION = "A random stretch of forest, it's almost pleasant."
+
+
+class TilePortal(Portal):
+    """
+    An exit of a tile view.
+
+    The destination is looked up through the world every time, so portals never
+    hold on to views the world may since have dropped.
+    """
+
+    def __init__(self, world, direction: Direction, x, y):
+        Component.__init__(self, direction.label)
+        self.world = world
+        self.direction = direction
+        self.target = x, y
+
+    @property
+    def destination(self) -> Location:
+        return self.world.location_at(*self.target)
+
+
+class TileLocation(Location):
+    """
+    A view of one tile of a grid world.
+
+    Views are only created for tiles something actually touches; their exits are
+    derived from the world's topology the first time they're asked for.
+    """
+
+    def __init__(self, world, x, y, place: dict | None = None):
+        self.world = world
+        self.x = x
+        self.y = y
+        if place:
+            super().__init__(
+                place["name"],
+                description=place["description"],
+                emoji=place["emoji"],
+                color=place["color"],
+            )
+        else:
+            super().__init__(
+                f"The Forest ({x}, {y})",
+                description=FOREST_DESCRIPTION,
+                emoji=FOREST_EMOJI,
+            )
+        self.occupancy = world.occupancy
+        self.concurrent_updates = world.concurrent_updates
+        self.wakeups = world.wakeups
+
+    def build_exits(self):
+        exits = []
+        for direction in self.world.exits_at(self.x, self.y):
+            dx, dy = direction.offset
+            exits.append(TilePortal(self.world, direction, self.x + dx, self.y + dy))
+        return exits
+
+    def exit_towards(self, destination):
+        direction = Direction.towards(destination.x - self.x, destination.y - self.y)
+        return self.get_exit(direction) if direction is not None else None
+
+
+class GridTopology:
+    """
+    A rectangular map stored as flat arrays indexed by `y * width + x`.
+
+    `kinds` holds 0 for plain forest, or 1 + the index of a named place; the
+    `neighbors` table holds, per direction, each tile's neighbor index or -1 at
+    the map's edge.  `Location` objects are views created on demand and cached.
+    """
+
+    bounded = True
+
+    def __init__(
+        self,
+        width,
+        height,
+        kinds: np.ndarray,
+        places: list[dict],
+        occupancy: OccupancyIndex | None = None,
+        concurrent_updates=False,
+        wakeups: TimerWheel | None = None,
+    ):
+        self.width = width
+        self.height = height
+        self.kinds = kinds
+        self.places = places
+        self.occupancy = occupancy
+        self.concurrent_updates = concurrent_updates
+        self.wakeups = wakeups
+        self.neighbors = self._build_neighbors(width, height)
+        self._views: dict[int, TileLocation] = {}
+
+    @classmethod
+    def generate(cls, width, height, places, rng: np.random.Generator = None, **kwargs):
+        """A map with each of `places` on a random tile, and forest everywhere else."""
+        rng = rng or np.random.default_rng()
+        total_tiles = width * height
+        places = places[:total_tiles]
+        kinds = np.zeros(total_tiles, dtype=np.uint16)
+        spots = rng.choice(total_tiles, size=len(places), replace=False)
+        kinds[spots] = np.arange(1, len(places) + 1, dtype=np.uint16)
+        return cls(width, height, kinds, places, **kwargs)
+
+    @staticmethod
+    def _build_neighbors(width, height):
+        tiles = np.arange(width * height, dtype=np.int32).reshape(height, width)
+        neighbors = np.full((len(Direction), height, width), -1, dtype=np.int32)
+        neighbors[Direction.NORTH, 1:, :] = tiles[:-1, :]
+        neighbors[Direction.SOUTH, :-1, :] = tiles[1:, :]
+        neighbors[Direction.EAST, :, :-1] = tiles[:, 1:]
+        neighbors[Direction.WEST, :, 1:] = tiles[:, :-1]
+        return neighbors.reshape(len(Direction), width * height)
+
+    def __len__(self):
+        return self.width * self.height
+
+    def contains(self, x, y):
+        return 0 <= x < self.width and 0 <= y < self.height
+
+    def index_of(self, x, y):
+        if not self.contains(x, y):
+            raise IndexError(
+                f"({x}, {y}) is outside the {self.width}x{self.height} map"
+            )
+        return y * self.width + x
+
+    def place_at(self, index):
+        kind = self.kinds[index]
+        return self.places[kind - 1] if kind else None
+
+    def exits_at(self, x, y):
+        neighbors = self.neighbors[:, self.index_of(x, y)]
+        return [direction for direction in Direction if neighbors[direction] >= 0]
+
+    def location(self, index) -> TileLocation:
+        view = self._views.get(index)
+        if view is None:
+            y, x = divmod(index, self.width)
+            view = TileLocation(self, x, y, self.place_at(index))
+            self._views[index] = view
+        return view
+
+    def location_at(self, x, y) -> TileLocation:
+        return self.location(self.index_of(x, y))
+
+    def views(self):
+        """The `Location` views that currently exist."""
+        return list(self._views.values())
+
+    @property
+    def materialized(self):
+        """How many tiles currently have a `Location` view."""
+        return len(self._views)
@@ -0,0 +1,54 @@
+from enum import IntEnum
+
+
+class EventKind(IntEnum):
+    DEPARTED = 0
+    ARRIVED = 1
+    SAID = 2
+
+
+class Event:
+    """
+    Something that happened at a location, recorded once in the location's log.
+
+    Nothing is formatted when the event is recorded; `describe` renders it from
+    the point of view of whichever actor is reading it, when they read it.
+    """
+
+    __slots__ = ("kind", "actor", "location", "destination", "text", "company")
+
+    def __init__(
+        self, kind: EventKind, actor, location, destination=None, text=None, company=()
+    ):
+        self.kind = kind
+        self.actor = actor
+        self.location = location
+        self.destination = destination
+        self.text = text
+        # the other actors who were there when it happened
+        self.company = company
+
+    def describe(self, viewer):
+        actor = self.actor
+        if self.kind == EventKind.SAID:
+            if viewer is actor:
+                return f"{actor.name} (self) said: {self.text}"
+            return f"{actor.name} said: {self.text}"
+
+        if self.kind == EventKind.ARRIVED:
+            if viewer is not actor:
+                return f"Encountered {actor.name} in {self.location.name}"
+            if self.company:
+                names = ", ".join(other.name for other in self.company)
+                return f"Moved to {self.location.name}, encountering {names}"
+            return f"Moved to {self.location.name}"
+
+        if viewer is not actor:
+            return (
+                f"Saw {actor.name} leave {self.location.name} towards "
+                f"{self.destination.name} (Using: {self.text})"
+            )
+        if self.company:
+            names = ", ".join(other.name for other in self.company)
+            return f"Moved through portal '{self.text}', leaving {names} at {self.location.name}"
+        return f"Moved through portal '{self.text}'"
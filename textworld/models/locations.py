@@ -1,29 +1,39 @@
 from textworld.models.actors.actor import Actor
 from textworld.models.components import Component
+from textworld.models.directions import Direction
+from textworld.models.journal import Event, EventKind
+from textworld.models.occupancy import OccupancyIndex
+from textworld.timestep import TimerWheel
 
 
 class Portal(Component):
     destination: "Location"
+    direction: Direction | None = None
 
-    def __init__(self, name, destination):
+    def __init__(self, name, destination, direction: Direction | None = None):
         super().__init__(name)
         self.destination = destination
+        self.direction = direction
 
 
 class Location(Component):
     is_container: bool = True
-    exits: list[Portal]
     description: str = "A location"
     emoji: str = "🚫"
     color: str = "green"
     x: int = 0
     y: int = 0
+    occupancy: OccupancyIndex | None = None
+    wakeups: TimerWheel | None = None
+    _exits: list[Portal] | None = None
 
     def __init__(
         self, name, exits: list[Portal] = None, description=None, emoji=None, color=None
     ):
         super().__init__(name)
-        self.exits = exits or []
+        self.log: list[Event] = []
+        if exits is not None:
+            self.exits = exits
         self.description = description or self.description
         self.emoji = emoji or self.emoji
         self.color = color or self.color
@@ -31,6 +41,26 @@ class Location(Component):
     def __str__(self):
         return f"[{self.color}]{self.name}[/{self.color}]"
 
+    @property
+    def exits(self) -> list[Portal]:
+        if self._exits is None:
+            self.exits = self.build_exits()
+        return self._exits
+
+    @exits.setter
+    def exits(self, exits: list[Portal]):
+        self._exits = list(exits)
+        self._exits_by_name = {portal.name.lower(): portal for portal in self._exits}
+        self._exits_by_direction = {
+            portal.direction: portal
+            for portal in self._exits
+            if portal.direction is not None
+        }
+
+    def build_exits(self) -> list[Portal]:
+        """Exits for a location created without any; subclasses may derive them."""
+        return []
+
     @property
     def exits_display(self):
         return ", ".join(str(exit) for exit in self.exits)
@@ -43,38 +73,61 @@ class Location(Component):
     def preposition(self):
         return "in" if self.is_container else "on"
 
+    def attach_sync(self, component: Component):
+        super().attach_sync(component)
+        if self.occupancy is not None and isinstance(component, Actor):
+            self.occupancy.add(component, self)
+
+    def detach_sync(self, component: Component):
+        super().detach_sync(component)
+        if self.occupancy is not None and isinstance(component, Actor):
+            self.occupancy.remove(component)
+
     def list_actors(self):
+        if self.occupancy is not None:
+            return self.occupancy.actors_at(self.x, self.y)
         return [actor for actor in self._components if isinstance(actor, Actor)]
 
-    def get_exit(self, name):
-        name = name.lower()
+    def count_actors(self):
+        if self.occupancy is not None:
+            return self.occupancy.count_at(self.x, self.y)
+        return len(self.list_actors())
+
+    def get_exit(self, name: str | Direction):
+        """The exit a direction ("north", "N", `Direction.NORTH`) or name leads out by."""
+        if self._exits is None:
+            self.exits = self.build_exits()
+        direction = Direction.parse(name)
+        if direction is not None and direction in self._exits_by_direction:
+            return self._exits_by_direction[direction]
+        return self._exits_by_name.get(str(name).strip().lower())
+
+    def exit_towards(self, destination: "Location"):
         for portal in self.exits:
-            exit_name = portal.name.lower()
-            if exit_name == name:
+            if portal.destination is destination:
                 return portal
         return None
 
     async def update(self):
-        downstream_actions = await super().update()
+        downstream_actions = await self.update_components()
+        await self.apply_actions(downstream_actions)
+        return []
+
+    def record(self, event: Event):
+        """Adds an event to the log everyone here at the time gets to see."""
+        self.log.append(event)
+        if self.wakeups is not None:
+            for actor in self.list_actors():
+                self.wakeups.wake(actor)
+
+    async def apply_actions(self, downstream_actions):
         for actor, action in downstream_actions:
             if action["action"] == "move":
                 portal = self.get_exit(action["direction"])
                 if portal:
-                    for other_actor in actor.location.list_actors():
-                        if other_actor is actor:
-                            actor.history.append(
-                                f"Moved through portal '{action['direction']}'"
-                            )
-                        else:
-                            other_actor.history.append(
-                                f"Saw {actor.name} through portal '{action['direction']}'"
-                            )
                     actor.location = portal.destination
             elif action["action"] == "say":
-                local_actors = self.list_actors()
-                for other_actor in local_actors:
-                    other_actor.hear(actor, action["content"])
-        return []
+                self.record(Event(EventKind.SAID, actor, self, text=action["content"]))
 
 
 class TheCar(Location):
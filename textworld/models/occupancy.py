@@ -0,0 +1,76 @@
+class OccupancyIndex:
+    """
+    World-level index of which actors are on which tile.
+
+    Actors are bucketed by tile coordinates and the buckets are kept up to date
+    as actors are attached to and detached from locations, so counting or listing
+    a tile's actors never scans the tile's components.  Tiles whose occupancy
+    changed are collected in `changed` for anyone who wants to react to moves,
+    from the first `drain_changes` on; until something drains them (a minimap)
+    they aren't kept at all, so they can't pile up.
+    """
+
+    def __init__(self):
+        self._buckets: dict[tuple[int, int], dict] = {}
+        self._positions = {}
+        self.changed: set[tuple[int, int]] | None = None
+
+    def __len__(self):
+        return len(self._positions)
+
+    def __contains__(self, actor):
+        return actor in self._positions
+
+    def add(self, actor, location):
+        position = location.x, location.y
+        self._buckets.setdefault(position, {})[actor] = None
+        self._positions[actor] = position
+        if self.changed is not None:
+            self.changed.add(position)
+
+    def remove(self, actor):
+        position = self._positions.pop(actor, None)
+        if position is None:
+            return
+        bucket = self._buckets[position]
+        del bucket[actor]
+        if not bucket:
+            del self._buckets[position]
+        if self.changed is not None:
+            self.changed.add(position)
+
+    def position_of(self, actor):
+        return self._positions.get(actor)
+
+    def actors_at(self, x, y):
+        bucket = self._buckets.get((x, y))
+        return list(bucket) if bucket else []
+
+    def count_at(self, x, y):
+        bucket = self._buckets.get((x, y))
+        return len(bucket) if bucket else 0
+
+    def occupied(self):
+        """Occupied tile positions, in map order (row by row)."""
+        return sorted(self._buckets, key=lambda position: (position[1], position[0]))
+
+    def within(self, x, y, k):
+        """Actors at most `k` moves (manhattan distance) away from (x, y)."""
+        actors = []
+        if len(self._buckets) < (2 * k + 1) ** 2:
+            for (bx, by), bucket in self._buckets.items():
+                if abs(bx - x) + abs(by - y) <= k:
+                    actors.extend(bucket)
+            return actors
+
+        for dy in range(-k, k + 1):
+            span = k - abs(dy)
+            for dx in range(-span, span + 1):
+                bucket = self._buckets.get((x + dx, y + dy))
+                if bucket:
+                    actors.extend(bucket)
+        return actors
+
+    def drain_changes(self):
+        changed, self.changed = self.changed or set(), set()
+        return changed
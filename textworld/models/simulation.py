@@ -1,88 +1,158 @@
+import asyncio
 import random
 from functools import cached_property
 
+import numpy as np
+
 from textworld.assets import load_json_asset
+from textworld.errors import NeedViolatedError
+from textworld.metrics import get_metrics
+from textworld.batching import SceneBatcher
+from textworld.models.actors.history import ModelSummarizer
 from textworld.models.actors.llm import LLMActor
-from textworld.models.actors.needs import Need
+from textworld.models.actors.memory import EpisodicMemory
+from textworld.models.actors.needs import Need, NeedsEngine
 from textworld.models.actors.player import Player
+from textworld.models.chunks import ChunkedWorld
 from textworld.models.components import Component
-from textworld.models.locations import Location, TheCar, TheWell, TheHouse, Portal
-
-
-def gen_index(width):
-    def _inner(x, y):
-        return y * width + x
-
-    return _inner
-
-
-def generate_forest_tiles(width, height):
-    location_data = load_json_asset("drugs.locations.json")
-    total_tiles = width * height
-    tiles = [
-        Location(
-            entry["name"], [], entry["description"], entry["emoji"], entry["color"]
-        )
-        for entry in location_data
-    ]
-
-    if total_tiles < len(tiles):
-        tiles = tiles[:total_tiles]
-    elif total_tiles > len(tiles):
-        tiles.extend([Location("The Forest") for _ in range(total_tiles - len(tiles))])
-    random.shuffle(tiles)
-
-    for x in range(width):
-        for y in range(height):
-            print("Here!")
-            tile = tiles[y * width + x]
-            tile.x = x
-            tile.y = y
-            if tile.name == "The Forest":
-                tile.name = f"The Forest ({x}, {y})"
-                tile.emoji = "🌲🌳🌲"
-                tile.description = "A random stretch of forest, it's almost pleasant."
-            tile.exits = []
-            if y > 0:
-                tile.exits.append(
-                    Portal("North", destination=tiles[(y - 1) * width + x])
-                )
-            if y < height - 1:
-                tile.exits.append(
-                    Portal("South", destination=tiles[(y + 1) * width + x])
-                )
-            if x < width - 1:
-                tile.exits.append(Portal("East", destination=tiles[y * width + x + 1]))
-            if x > 0:
-                tile.exits.append(Portal("West", destination=tiles[y * width + x - 1]))
-
-    return tiles
+from textworld.models.grid import GridTopology
+from textworld.models.occupancy import OccupancyIndex
+from textworld.scheduler import TurnScheduler
+from textworld.timestep import FixedStep, TimerWheel
 
 
 class Simulation(Component):
-    update_frequency = 1.0
-
-    def __init__(self, width=5, height=8):
-        self.next_update = self.update_frequency
+    def __init__(
+        self,
+        width=5,
+        height=8,
+        concurrent_updates=True,
+        max_concurrent_turns=4,
+        background_turns=True,
+        history_window=20,
+        summarize_with_model=False,
+        memory_model=None,
+        memory_top_k=5,
+        session_max_context=4096,
+        stream_turns=True,
+        num_npcs=None,
+        chunked=False,
+        seed=None,
+        chunk_size=32,
+        max_live_chunks=64,
+        detail_radius=None,
+        llm_calls_per_sec=None,
+        llm_tokens_per_sec=None,
+        max_queued_turns=32,
+        turn_deadline=None,
+        batch_window=None,
+        max_batch=6,
+        update_frequency=1.0,
+        needs_interval=0.25,
+        max_catch_up=5,
+    ):
+        self.time = 0.0
+        # each system steps at its own fixed rate, whatever the frame times are
+        self.turn_step = FixedStep(update_frequency, max_catch_up)
+        self.needs_step = FixedStep(needs_interval, max_catch_up)
+        self.wakeups = TimerWheel(update_frequency)
+        self.actor_updates = 0
+        # everything random in the world (its map, where NPCs start and where
+        # they wander) follows from `seed`, so a seeded run can be repeated
+        self.rng = random.Random(seed)
         self.width = width
         self.height = height
         super().__init__("The Game")
+        self.concurrent_updates = concurrent_updates
+        self.history_window = history_window
+        self.scheduler = TurnScheduler(
+            max_concurrent_turns,
+            calls_per_sec=llm_calls_per_sec,
+            tokens_per_sec=llm_tokens_per_sec,
+            max_queued=max_queued_turns,
+        )
+        self.batcher = (
+            SceneBatcher(batch_window, max_batch, scheduler=self.scheduler)
+            if batch_window
+            else None
+        )
 
-        self.locations = generate_forest_tiles(width, height)
-        for location in self.locations:
-            self.attach_sync(location)
+        self.detail_radius = detail_radius
+        self.summarize_with_model = summarize_with_model
+        self.memory_model = memory_model
+        self.memory_top_k = memory_top_k
+        self.session_max_context = session_max_context
+        self.turn_deadline = turn_deadline
+        self.background_turns = background_turns
+        self.stream_turns = stream_turns
+        self._detailed = set()
+        self.needs = NeedsEngine()
+        self.occupancy = OccupancyIndex()
+        places = load_json_asset("drugs.locations.json")
+        if chunked:
+            # unbounded; width and height only size the spawn area and the minimap
+            self.grid = ChunkedWorld(
+                places,
+                seed=seed,
+                chunk_size=chunk_size,
+                max_live_chunks=max_live_chunks,
+                occupancy=self.occupancy,
+                concurrent_updates=concurrent_updates,
+                wakeups=self.wakeups,
+            )
+        else:
+            self.grid = GridTopology.generate(
+                width,
+                height,
+                places,
+                rng=np.random.default_rng(seed),
+                occupancy=self.occupancy,
+                concurrent_updates=concurrent_updates,
+                wakeups=self.wakeups,
+            )
 
         character_data = load_json_asset("drugs.characters.json")
-        for c_data in character_data:
-            actor = LLMActor(
-                c_data["name"],
-                c_data["private_facts"],
-                c_data["public_facts"],
+        if num_npcs is None:
+            num_npcs = len(character_data)
+        for index in range(num_npcs):
+            c_data = character_data[index % len(character_data)]
+            name = c_data["name"]
+            if index >= len(character_data):
+                name = f"{name} #{index // len(character_data) + 1}"
+            actor = self.create_npc(
+                name, c_data["private_facts"], c_data["public_facts"]
             )
             actor.location = self.get_tile_at(
-                random.randint(0, self.width - 1), random.randint(0, self.height - 1)
+                self.rng.randint(0, self.width - 1),
+                self.rng.randint(0, self.height - 1),
             )
-            self.attach(actor)
+
+    def create_npc(self, name, private_facts, public_facts) -> LLMActor:
+        """An NPC set up to take its turns in this simulation, not yet placed."""
+        actor = LLMActor(
+            name,
+            private_facts,
+            public_facts,
+            summarizer=ModelSummarizer() if self.summarize_with_model else None,
+            memory=(
+                EpisodicMemory(self.memory_model, top_k=self.memory_top_k)
+                if self.memory_model
+                else None
+            ),
+            clock=self.clock,
+        )
+        actor.history.window = self.history_window
+        actor.session.max_context = self.session_max_context
+        actor.scheduler = self.scheduler
+        actor.wakeups = self.wakeups
+        actor.turn_deadline = self.turn_deadline
+        actor.batcher = self.batcher
+        actor.rng = self.rng
+        actor.background_turns = self.background_turns
+        actor.stream_turns = self.stream_turns
+        # promoted by update_detail once it's near the player
+        actor.full_detail = self.detail_radius is None
+        return actor
 
     @cached_property
     def player(self):
@@ -101,15 +171,114 @@ class Simulation(Component):
             Need("Faith", value=100, max_value=100, decay=0.0002),
             Need("Sanity", value=100, max_value=100, decay=0.001),
         ]
+        self.needs.add_actor(player)
+        player.history.window = self.history_window
         player.location = self.get_tile_at(4, 1)
-        self.attach(player)
         return player
 
+    def occupied_locations(self):
+        return [self.get_tile_at(x, y) for x, y in self.occupancy.occupied()]
+
+    async def update(self):
+        """
+        Only actors that are due get updated: ones whose wake-up time has come,
+        ones something happened around (an event in their location's log wakes
+        everyone there) and ones with a turn coming in.  Everyone else sleeps
+        on the timer wheel and costs nothing until then.
+
+        In concurrent mode every location collects its actors' actions at once, then
+        the actions are applied location by location in map order, so the outcome of
+        a tick doesn't depend on which LLM call happened to finish first.
+        """
+        self.update_detail()
+        awake = self.wakeups.advance(self.time)
+        by_location = {}
+        for actor in awake:
+            if actor.location is not None:
+                by_location.setdefault(actor.location, set()).add(actor)
+        locations = sorted(by_location, key=lambda location: (location.y, location.x))
+        self.actor_updates += len(awake)
+
+        if not self.concurrent_updates:
+            for location in locations:
+                actions = await location.update_components(by_location[location])
+                await location.apply_actions(actions)
+        else:
+            async with asyncio.TaskGroup() as group:
+                tasks = [
+                    group.create_task(location.update_components(by_location[location]))
+                    for location in locations
+                ]
+            for location, task in zip(locations, tasks):
+                await location.apply_actions(task.result())
+
+        for actor in awake:
+            wake_time = actor.wake_time()
+            if wake_time is None:
+                self.wakeups.wake(actor)
+            else:
+                self.wakeups.schedule(actor, wake_time)
+        return []
+
+    def update_detail(self):
+        """
+        Only NPCs within `detail_radius` moves of the player get LLM turns; the
+        rest fall back to idle behavior until they come closer, so LLM spend
+        follows what the player can observe rather than the number of NPCs.
+        """
+        if self.detail_radius is None:
+            return
+        x, y = self.occupancy.position_of(self.player)
+        nearby = {
+            actor
+            for actor in self.occupancy.within(x, y, self.detail_radius)
+            if isinstance(actor, LLMActor)
+        }
+        for actor in self._detailed - nearby:
+            actor.set_full_detail(False)
+        for actor in nearby - self._detailed:
+            actor.set_full_detail(True)
+            actor.wake()
+        self._detailed = nearby
+
     def get_tile_at(self, x, y):
-        return self.locations[y * self.width + x]
+        return self.grid.location_at(x, y)
+
+    def clock(self):
+        """Simulated seconds; only advances while the simulation is ticked."""
+        return self.time
+
+    @property
+    def actors(self):
+        return [
+            actor
+            for location in self.occupied_locations()
+            for actor in location.list_actors()
+        ]
+
+    async def cancel_turns(self):
+        """Cancels every NPC turn in flight and waits for them to wind down."""
+        turns = [
+            turn
+            for actor in self.actors
+            if isinstance(actor, LLMActor) and (turn := actor.cancel_turn())
+        ]
+        await asyncio.gather(*turns, return_exceptions=True)
+
+    def until_next_step(self):
+        """Seconds until any system has a step due."""
+        return min(self.turn_step.remaining, self.needs_step.remaining)
 
     async def tick(self, delta_time):
-        self.next_update -= delta_time
-        if self.next_update <= 0:
-            self.next_update += self.update_frequency
-            await self.update()
+        metrics = get_metrics()
+        with metrics.span("tick"):
+            self.time += delta_time
+            crossed = []
+            for _ in range(self.needs_step.advance(delta_time)):
+                with metrics.span("needs"):
+                    crossed.extend(self.needs.update(self.needs_step.interval))
+            if crossed:
+                raise NeedViolatedError(crossed)
+            for _ in range(self.turn_step.advance(delta_time)):
+                with metrics.span("update"):
+                    await self.update()
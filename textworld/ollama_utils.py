@@ -1,29 +1,462 @@
+import asyncio
 import json
+import math
 import re
-from ollama import AsyncClient
+from contextlib import asynccontextmanager
+from time import monotonic, perf_counter
+
+import httpx
+from ollama import AsyncClient, ResponseError
+
+from textworld.errors import EndpointUnavailableError, LLMTimeoutError
+from textworld.jsonstream import JsonObjectStream
+from textworld.llm_cache import ResponseCache
+from textworld.llm_trace import TraceReplay
+from textworld.metrics import get_metrics
 
 json_pattern = r"(\{.*\})"
 json_extract_regex = re.compile(json_pattern, re.MULTILINE | re.DOTALL)
 
+DEFAULT_OLLAMA_HOST = "http://192.168.1.14:11434"
+DEFAULT_OLLAMA_MODEL = "mistral"
+
+# failures a turn can recover from by falling back to a default action
+RECOVERABLE_ERRORS = (
+    TimeoutError,
+    ConnectionError,
+    LLMTimeoutError,
+    EndpointUnavailableError,
+    httpx.HTTPError,
+    ResponseError,
+)
+
+
+class CircuitBreaker:
+    """
+    Stops sending requests to a host after `failure_threshold` failures in a
+    row.  Once `reset_timeout` seconds have passed a single trial request is let
+    through, and its outcome closes the breaker again or keeps it open.
+    """
+
+    def __init__(self, failure_threshold=3, reset_timeout=30.0, clock=monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    @property
+    def available(self):
+        if self.opened_at is None:
+            return True
+        return not self._trial and self.clock() - self.opened_at >= self.reset_timeout
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return "closed"
+        return "half-open" if self.available or self._trial else "open"
+
+    def allow(self):
+        if not self.available:
+            return False
+        if self.opened_at is not None:
+            self._trial = True
+        return True
+
+    def record_success(self):
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+
+    def record_failure(self):
+        self.failures += 1
+        self._trial = False
+        if self.failures >= self.failure_threshold:
+            self.opened_at = self.clock()
+
+    def abandon(self):
+        """The request let through ended without telling us anything."""
+        self._trial = False
+
+
+class OllamaEndpoint:
+    """
+    One Ollama host with a long-lived, keep-alive connection pool.
+
+    `outstanding` counts requests that are either waiting for a slot or in flight,
+    which is what the least-outstanding-requests balancing looks at.  Requests
+    that fail or outlive their timeout count against the host's circuit breaker.
+    With a `trace` (a `TraceRecorder` or `TraceReplay`) requests are recorded,
+    or answered from a recording instead of the host.  A replay never reaches
+    the host, so its failures don't count against the breaker.
+    """
+
+    def __init__(
+        self,
+        base_url,
+        max_in_flight=4,
+        failure_threshold=3,
+        reset_timeout=30.0,
+        trace=None,
+    ):
+        self.base_url = base_url
+        self.max_in_flight = max_in_flight
+        self.outstanding = 0
+        self.requests = 0
+        if isinstance(trace, TraceReplay):
+            failure_threshold = math.inf
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self._slots = asyncio.Semaphore(max_in_flight)
+        # the pool is ours, so it can be closed without going through ollama
+        self._transport = httpx.AsyncHTTPTransport(
+            limits=httpx.Limits(
+                max_connections=max_in_flight,
+                max_keepalive_connections=max_in_flight,
+                keepalive_expiry=300.0,
+            ),
+        )
+        self._http = AsyncClient(host=base_url, transport=self._transport)
+        self._client = self._http if trace is None else trace.wrap(self._http)
+
+    @asynccontextmanager
+    async def reserve(self, timeout=None):
+        """
+        A client to make one request with, once a slot is free.  The request
+        (not the wait for the slot) has `timeout` seconds to finish; the wait
+        is timed as `llm.queue`.
+        """
+        if not self.breaker.allow():
+            raise EndpointUnavailableError(
+                f"{self.base_url} is failing, not retrying yet"
+            )
+        self.requests += 1
+        self.outstanding += 1
+        recorded = False
+        try:
+            waiting = perf_counter()
+            async with self._slots:
+                get_metrics().observe("llm.queue", perf_counter() - waiting)
+                try:
+                    async with asyncio.timeout(timeout):
+                        yield self._client
+                except TimeoutError as error:
+                    self.breaker.record_failure()
+                    recorded = True
+                    raise LLMTimeoutError(
+                        f"{self.base_url} took longer than {timeout}s"
+                    ) from error
+                except (httpx.HTTPError, ResponseError, ConnectionError):
+                    # ollama turns a host it can't connect to into ConnectionError
+                    self.breaker.record_failure()
+                    recorded = True
+                    raise
+                self.breaker.record_success()
+                recorded = True
+        finally:
+            self.outstanding -= 1
+            if not recorded:
+                self.breaker.abandon()
+
+    async def aclose(self):
+        await self._transport.aclose()
+
+
+class LLMSession:
+    """
+    Carries the `context` Ollama returns between calls to the same conversation.
+
+    Passing it back lets the model host reuse its KV state for everything said so
+    far, so each call only has to evaluate the new prompt.  The context is dropped
+    once it grows past `max_context` tokens, starting a fresh conversation.
+    """
+
+    def __init__(self, max_context=4096):
+        self.max_context = max_context
+        self.context = None
+        self.system = None
+        self.stats = {}
+
+    @property
+    def active(self):
+        return self.context is not None
+
+    def reset(self):
+        self.context = None
+        self.system = None
+
+    def continues(self, system):
+        """Whether the next call with `system` carries on from the context."""
+        return self.active and self.system == system
+
+    def prepare(self, system):
+        """Returns the `context` and `system` to send for the next call."""
+        if self.continues(system):
+            # the system prompt is already part of the session's context
+            return self.context, None
+        self.reset()
+        self.system = system
+        return None, system
+
+    def record(self, response):
+        self.stats = {
+            "prompt_eval_count": response.get("prompt_eval_count"),
+            "eval_count": response.get("eval_count"),
+            "total_duration": response.get("total_duration"),
+        }
+        context = response.get("context")
+        if context and len(context) <= self.max_context:
+            self.context = list(context)
+        else:
+            self.reset()
+
 
 class OllamaClient:
 
-    def __init__(self, base_url, model):
-        self._client = AsyncClient(host=base_url)
+    def __init__(
+        self,
+        base_url,
+        model,
+        max_in_flight=4,
+        cache: ResponseCache | None = None,
+        timeout=None,
+    ):
+        base_urls = [base_url] if isinstance(base_url, str) else list(base_url)
+        self.endpoints = [get_endpoint(url, max_in_flight) for url in base_urls]
         self.model = model
+        self.cache = cache
+        self.timeout = timeout
 
-    async def generate(self, prompt, system):
-        response = await self._client.generate(
-            model=self.model, prompt=prompt, system=system, keep_alive=300.0
-        )
-        model_output = response["response"]
-        match = json_extract_regex.search(model_output)
-        if match:
+    def cached(self, prompt, system, session: LLMSession | None = None):
+        """
+        Returns the cache key and cached response for a request.
+
+        Only requests that start a conversation are cached.  A continuing
+        session sends just what changed since its last turn, which reads the
+        same in any number of conversations, and the answer belongs to the one
+        its context holds.  A hit leaves a fresh session fresh.
+        """
+        if self.cache is None or (session is not None and session.continues(system)):
+            return None, None
+        key = self.cache.make_key(self.model, system, prompt)
+        return key, self.cache.get(key)
+
+    def remember(self, key, response):
+        if key is not None and response:
+            self.cache.put(key, response)
+
+    def pick_endpoint(self):
+        endpoints = [
+            endpoint for endpoint in self.endpoints if endpoint.breaker.available
+        ]
+        if not endpoints:
+            raise EndpointUnavailableError("every Ollama host is failing")
+        return min(endpoints, key=lambda endpoint: endpoint.outstanding)
+
+    async def generate(self, prompt, system, session: LLMSession | None = None):
+        cache_key, response = self.cached(prompt, system, session)
+        if response is not None:
+            if session is not None:
+                session.stats = {"cached": True}
+            return response
+
+        context = None
+        if session is not None:
+            context, system = session.prepare(system)
+
+        metrics = get_metrics()
+        async with self.pick_endpoint().reserve(self.timeout) as client:
+            with metrics.span("llm.network"):
+                response = await client.generate(
+                    model=self.model,
+                    prompt=prompt,
+                    system=system,
+                    context=context,
+                    keep_alive=300.0,
+                )
+
+        if session is not None:
+            session.record(response)
+
+        with metrics.span("llm.parse"):
+            model_output = response["response"]
+            match = json_extract_regex.search(model_output)
+            if not match:
+                return None
             try:
-                return json.loads(match.group(1))
+                result = json.loads(match.group(1))
             except json.decoder.JSONDecodeError:
                 return None
+        self.remember(cache_key, result)
+        return result
+
+    async def generate_stream(
+        self,
+        prompt,
+        system,
+        session: LLMSession | None = None,
+        on_field=None,
+        on_partial=None,
+    ):
+        """
+        Streams the completion through an incremental JSON parser.
+
+        `on_field(key, value)` is called as soon as each top-level field of the
+        response object has been parsed and `on_partial(key, text)` with the text
+        of a string field still being written.  Generation is cancelled as soon as
+        the object closes, rather than paying for whatever the model adds after it,
+        unless the `session` keeps context: only the last chunk carries it, so the
+        stream is read to the end (every field has been handed out by then).
+        """
+        cache_key, response = self.cached(prompt, system, session)
+        if response is not None:
+            if session is not None:
+                session.stats = {"cached": True}
+            return response
+
+        context = None
+        if session is not None:
+            context, system = session.prepare(system)
+
+        keep_context = session is not None and session.max_context > 0
+        parser = JsonObjectStream()
+        # parsing is interleaved with the stream, so it's timed chunk by chunk
+        # and taken out of the time spent on the network
+        parsing = 0.0
+        async with self.pick_endpoint().reserve(self.timeout) as client:
+            started = perf_counter()
+            chunks = await client.generate(
+                model=self.model,
+                prompt=prompt,
+                system=system,
+                context=context,
+                stream=True,
+                keep_alive=300.0,
+            )
+            streamed = 0
+            try:
+                async for chunk in chunks:
+                    streamed += 1
+                    parse_started = perf_counter()
+                    fields = parser.feed(chunk["response"])
+                    parsing += perf_counter() - parse_started
+                    if on_field is not None:
+                        for key, value in fields.items():
+                            on_field(key, value)
+                    if on_partial is not None and (partial := parser.partial):
+                        on_partial(*partial)
+
+                    if chunk.get("done"):
+                        if session is not None:
+                            session.record(chunk)
+                        break
+                    if parser.done and not keep_context:
+                        # a cancelled generation never reports its context (or
+                        # token counts, each streamed chunk is roughly one token)
+                        if session is not None:
+                            session.reset()
+                            session.stats = {"eval_count": streamed, "cancelled": True}
+                        break
+            finally:
+                # closing the stream drops the connection, which stops the model
+                await chunks.aclose()
+
+        metrics = get_metrics()
+        metrics.observe("llm.network", perf_counter() - started - parsing)
+        metrics.observe("llm.parse", parsing)
+        self.remember(cache_key, parser.result)
+        return parser.result
 
     async def embedding(self, content):
-        response = self._client.embeddings(model=self.model, prompt=content)
+        async with self.pick_endpoint().reserve(self.timeout) as client:
+            response = await client.embeddings(model=self.model, prompt=content)
         return response
+
+    async def embed(self, contents):
+        """Embeds a batch of strings in one request, returning one vector each."""
+        async with self.pick_endpoint().reserve(self.timeout) as client:
+            response = await client.embed(
+                model=self.model, input=list(contents), keep_alive=300.0
+            )
+        return response["embeddings"]
+
+
+_endpoints: dict[str, OllamaEndpoint] = {}
+_clients: dict[str, OllamaClient] = {}
+_hosts = [DEFAULT_OLLAMA_HOST]
+_default_model = DEFAULT_OLLAMA_MODEL
+_max_in_flight_per_host = 4
+_cache: ResponseCache | None = None
+_request_timeout = None
+_failure_threshold = 3
+_reset_timeout = 30.0
+_trace = None
+
+
+def configure_ollama(
+    hosts,
+    model,
+    max_in_flight_per_host=4,
+    cache=None,
+    request_timeout=None,
+    failure_threshold=3,
+    reset_timeout=30.0,
+    trace=None,
+):
+    """
+    Sets the hosts, model, response cache, request timeout, circuit breaker
+    thresholds and traffic trace (see `textworld.llm_trace`) handed out by
+    `get_ollama_client`.
+    """
+    global _hosts, _default_model, _max_in_flight_per_host, _cache
+    global _request_timeout, _failure_threshold, _reset_timeout, _trace
+    _hosts = list(hosts)
+    _default_model = model
+    _max_in_flight_per_host = max_in_flight_per_host
+    _cache = cache
+    _request_timeout = request_timeout
+    _failure_threshold = failure_threshold
+    _reset_timeout = reset_timeout
+    _trace = trace
+    _endpoints.clear()
+    _clients.clear()
+
+
+def get_endpoint(base_url, max_in_flight=4):
+    endpoint = _endpoints.get(base_url)
+    if endpoint is None:
+        endpoint = _endpoints[base_url] = OllamaEndpoint(
+            base_url, max_in_flight, _failure_threshold, _reset_timeout, _trace
+        )
+    return endpoint
+
+
+def get_ollama_client(model=None):
+    """Returns the shared client for `model`, balanced over the configured hosts."""
+    model = model or _default_model
+    client = _clients.get(model)
+    if client is None:
+        client = _clients[model] = OllamaClient(
+            _hosts,
+            model,
+            max_in_flight=_max_in_flight_per_host,
+            cache=_cache,
+            timeout=_request_timeout,
+        )
+    return client
+
+
+def count_ollama_requests():
+    return sum(endpoint.requests for endpoint in _endpoints.values())
+
+
+async def close_ollama_clients():
+    for endpoint in _endpoints.values():
+        await endpoint.aclose()
+    _endpoints.clear()
+    _clients.clear()
+    if _cache is not None:
+        _cache.close()
+    if _trace is not None:
+        await _trace.aclose()
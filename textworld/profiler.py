@@ -0,0 +1,91 @@
+"""
+A sampling profiler that can be switched on and off while the game runs.
+
+A background thread looks at the stack of the profiled thread every `interval`
+seconds and counts how often each stack comes up.  The result is written in
+the folded format (one `outer;inner;innermost count` line per stack) that
+flamegraph.pl, speedscope and similar tools read.
+"""
+
+import os
+import sys
+import threading
+from collections import Counter
+
+
+def _frame_name(code):
+    return (
+        f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+    )
+
+
+class SamplingProfiler:
+
+    def __init__(self, interval=0.005, thread_id=None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.samples = 0
+        self._stacks = Counter()
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def running(self):
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._sample, name="sampling-profiler", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def toggle(self):
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+        return self.running
+
+    def reset(self):
+        self._stacks.clear()
+        self.samples = 0
+
+    def _sample(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            # code objects are cheap to collect; names are only made on output
+            stack = []
+            while frame is not None:
+                stack.append(frame.f_code)
+                frame = frame.f_back
+            self._stacks[tuple(stack)] += 1
+            self.samples += 1
+
+    def folded(self):
+        names = {}
+        lines = []
+        for stack, count in self._stacks.most_common():
+            frames = []
+            for code in reversed(stack):
+                name = names.get(code)
+                if name is None:
+                    name = names[code] = _frame_name(code)
+                frames.append(name)
+            lines.append(f"{';'.join(frames)} {count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        with open(path, "w") as fd:
+            fd.write(self.folded())
@@ -0,0 +1,223 @@
+import asyncio
+import heapq
+from itertools import count
+from time import monotonic
+
+# turn priorities, highest first
+PRIORITY_CONVERSATION = 2  # the player is talking to the actor
+PRIORITY_NEARBY = 1  # the actor shares a location with the player
+PRIORITY_BACKGROUND = 0
+
+
+class TokenBucket:
+    """
+    `rate` units per second, with room for bursts of up to `capacity` (at least
+    one unit, so rates below one per second still let a unit through).
+    """
+
+    def __init__(self, rate, capacity=None, clock=monotonic):
+        self.rate = rate
+        self.capacity = max(capacity or rate, 1)
+        self.clock = clock
+        self.level = self.capacity
+        self._updated = clock()
+
+    def _refill(self):
+        now = self.clock()
+        self.level = min(self.capacity, self.level + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def delay(self, amount):
+        """Seconds until `amount` units are available (0 if they are now)."""
+        self._refill()
+        return max(0.0, (amount - self.level) / self.rate)
+
+    def take(self, amount):
+        self._refill()
+        self.level -= amount
+
+
+class TurnRequest:
+    def __init__(self, key, priority, turn, future):
+        self.key = key
+        self.priority = priority
+        self.turn = turn
+        self.future: asyncio.Future = future
+        self.waiters = 0
+        self.entry = None
+        self.task: asyncio.Task | None = None
+
+
+class TurnScheduler:
+    """
+    The single queue every NPC turn goes through on its way to the model.
+
+    Turns start in priority order, at most `max_concurrent` at a time and within
+    a calls/sec and a tokens/sec budget; tokens are only known once a turn is
+    done, so `charge` takes them after the fact and later turns wait the debt
+    off.  A second request from an actor that already has a turn waiting joins
+    the waiting one instead of queueing another, and when more than `max_queued`
+    turns are waiting the lowest-priority ones are shed (they resolve to None).
+    """
+
+    def __init__(
+        self,
+        max_concurrent=4,
+        calls_per_sec=None,
+        tokens_per_sec=None,
+        max_queued=32,
+        clock=monotonic,
+    ):
+        self.max_concurrent = max_concurrent
+        self.max_queued = max_queued
+        self.calls = TokenBucket(calls_per_sec, clock=clock) if calls_per_sec else None
+        self.tokens = (
+            TokenBucket(tokens_per_sec, clock=clock) if tokens_per_sec else None
+        )
+        self.running = 0
+        self.submitted = 0
+        self.started = 0
+        self.coalesced = 0
+        self.shed = 0
+        self.deferred = 0
+        self.max_depth = 0
+        self._heap = []
+        self._queued: dict[object, TurnRequest] = {}
+        self._sequence = count()
+        self._wakeup: asyncio.TimerHandle | None = None
+
+    @property
+    def depth(self):
+        return len(self._queued)
+
+    def stats(self):
+        depth_by_priority = {}
+        for request in self._queued.values():
+            depth_by_priority[request.priority] = (
+                depth_by_priority.get(request.priority, 0) + 1
+            )
+        return {
+            "depth": self.depth,
+            "depth_by_priority": depth_by_priority,
+            "max_depth": self.max_depth,
+            "running": self.running,
+            "submitted": self.submitted,
+            "started": self.started,
+            "coalesced": self.coalesced,
+            "shed": self.shed,
+            "deferred": self.deferred,
+        }
+
+    async def submit(self, key, priority, turn):
+        """Runs `turn()` once the scheduler lets it, returning its result."""
+        self.submitted += 1
+        request = self._queued.get(key)
+        if request is None:
+            future = asyncio.get_running_loop().create_future()
+            request = self._queued[key] = TurnRequest(key, priority, turn, future)
+            self._push(request)
+            self._shed_excess()
+            self.max_depth = max(self.max_depth, self.depth)
+        else:
+            self.coalesced += 1
+            if priority > request.priority:
+                request.priority = priority
+                self._push(request)
+
+        request.waiters += 1
+        self._pump()
+        try:
+            return await asyncio.shield(request.future)
+        except asyncio.CancelledError:
+            request.waiters -= 1
+            if not request.waiters:
+                self._abandon(request)
+            raise
+
+    def charge(self, tokens):
+        """Takes the tokens a finished turn used out of the tokens/sec budget."""
+        if self.tokens is not None and tokens:
+            self.tokens.take(tokens)
+
+    def _push(self, request):
+        request.entry = (-request.priority, next(self._sequence), request)
+        heapq.heappush(self._heap, request.entry)
+
+    def _shed_excess(self):
+        while self.depth > self.max_queued:
+            # the oldest of the lowest priority turns has the stalest scene
+            victim = min(
+                self._queued.values(),
+                key=lambda request: (request.priority, request.entry[1]),
+            )
+            self._dequeue(victim)
+            self.shed += 1
+            victim.future.set_result(None)
+
+    def _dequeue(self, request):
+        del self._queued[request.key]
+        request.entry = None
+
+    def _abandon(self, request):
+        if request.task is not None:
+            request.task.cancel()
+        elif request.entry is not None:
+            self._dequeue(request)
+            request.future.cancel()
+
+    def _budget_delay(self):
+        delay = 0.0
+        if self.calls is not None:
+            delay = self.calls.delay(1)
+        if self.tokens is not None:
+            # tokens are charged after the fact, so only wait off any debt
+            delay = max(delay, self.tokens.delay(0))
+        return delay
+
+    def _pump(self):
+        while self._heap and (
+            not self.max_concurrent or self.running < self.max_concurrent
+        ):
+            entry = self._heap[0]
+            request = entry[2]
+            if request.entry is not entry:
+                heapq.heappop(self._heap)
+                continue
+
+            delay = self._budget_delay()
+            if delay > 0:
+                self.deferred += 1
+                self._wake_in(delay)
+                return
+
+            heapq.heappop(self._heap)
+            self._dequeue(request)
+            if self.calls is not None:
+                self.calls.take(1)
+            self._start(request)
+
+    def _wake_in(self, delay):
+        if self._wakeup is not None:
+            return
+        loop = asyncio.get_running_loop()
+        self._wakeup = loop.call_later(delay, self._woken)
+
+    def _woken(self):
+        self._wakeup = None
+        self._pump()
+
+    def _start(self, request):
+        self.running += 1
+        self.started += 1
+        request.task = asyncio.create_task(request.turn())
+        request.task.add_done_callback(lambda task: self._finish(request, task))
+
+    def _finish(self, request, task):
+        self.running -= 1
+        if task.cancelled():
+            request.future.cancel()
+        elif task.exception() is not None:
+            request.future.set_exception(task.exception())
+        else:
+            request.future.set_result(task.result())
+        self._pump()
@@ -1,6 +1,86 @@
 from pydantic_settings import BaseSettings
 
+from textworld.ollama_utils import DEFAULT_OLLAMA_HOST, DEFAULT_OLLAMA_MODEL
+
 
 class AppSettings(BaseSettings):
     map_width: int = 5
     map_height: int = 2
+    # generate the world in chunks as it's explored, with no edges; the map size
+    # then only bounds where NPCs start and what the minimap shows
+    chunked_world: bool = False
+    world_seed: int | None = None
+    chunk_size: int = 32
+    max_live_chunks: int = 64
+    # (columns, rows) of the map the minimap shows around the player; None
+    # shows the whole map (or a map-sized window of a chunked world)
+    minimap_viewport: tuple[int, int] | None = None
+    # seconds between NPC updates and between needs updates, however fast
+    # frames come; after a stall at most max_catch_up_steps of each are run
+    npc_update_interval: float = 1.0
+    needs_update_interval: float = 0.25
+    max_catch_up_steps: int = 5
+    frame_rate: float = 12.0
+    concurrent_npc_turns: bool = True
+    max_concurrent_npc_turns: int = 4
+    # budgets shared by all NPC turns; None leaves them unlimited
+    llm_calls_per_sec: float | None = None
+    llm_tokens_per_sec: float | None = None
+    # past this many waiting NPC turns the least important ones are dropped
+    max_queued_npc_turns: int = 32
+    # NPCs in one location whose turns come due within this many seconds share
+    # a single multi-character prompt; None gives every NPC its own prompt
+    npc_batch_window: float | None = None
+    max_npc_batch: int = 6
+    background_npc_turns: bool = True
+    # NPCs further than this many moves from the player get rule-based turns
+    # instead of LLM ones; None gives every NPC LLM turns
+    npc_detail_radius: int | None = 3
+    ollama_hosts: list[str] = [DEFAULT_OLLAMA_HOST]
+    ollama_model: str = DEFAULT_OLLAMA_MODEL
+    ollama_max_in_flight_per_host: int = 4
+    # seconds a single request to a host may take before it counts as failed
+    ollama_request_timeout: float | None = 30.0
+    # failures in a row before a host is skipped, and for how long
+    ollama_failure_threshold: int = 3
+    ollama_circuit_reset: float = 30.0
+    # seconds an NPC turn may take, queueing included, before falling back
+    npc_turn_deadline: float | None = 45.0
+    history_window: int = 20
+    summarize_history_with_model: bool = False
+    # embedding model used for NPC memories, e.g. "nomic-embed-text"; None disables them
+    memory_model: str | None = None
+    memory_top_k: int = 5
+    # tokens of Ollama context an NPC keeps reusing before starting a fresh prompt
+    session_max_context: int = 4096
+    stream_npc_turns: bool = True
+    # cached responses to identical (normalized) prompts; a size of 0 disables it
+    llm_cache_size: int = 1024
+    llm_cache_ttl: float = 120.0
+    llm_cache_path: str | None = None
+    # JSON-lines log of every NPC turn; None disables it
+    llm_log_path: str | None = "output.jsonl"
+    llm_log_max_bytes: int = 10 * 1024 * 1024
+    llm_log_backups: int = 3
+    llm_log_compress: bool = False
+    # a trace of all Ollama traffic: "record" writes one to llm_trace_path,
+    # "replay" answers from it instead of the hosts, at the recorded latency
+    # or, with llm_replay_timing "instant", at once
+    llm_trace_path: str | None = None
+    llm_trace_mode: str = "record"
+    llm_replay_timing: str = "recorded"
+    # the game is restored from this file on start, if it exists, and saved to
+    # it every snapshot_interval seconds; None disables snapshots
+    snapshot_path: str | None = None
+    snapshot_interval: float = 60.0
+    # "zlib", "zstd" (needs the zstandard package) or None
+    snapshot_compression: str | None = "zlib"
+    # timing spans around the hot paths; exported every metrics_interval
+    # seconds to metrics_path (Prometheus text for *.prom, else JSON)
+    metrics_enabled: bool = True
+    metrics_path: str | None = None
+    metrics_interval: float = 10.0
+    # where the sampling profiler, toggled from the debug overlay, writes its
+    # folded stacks
+    profile_path: str = "profile.folded"
+    profile_interval: float = 0.005
@@ -0,0 +1,805 @@
+"""
+Binary snapshots of a whole simulation: the world, the actors, their histories
+and needs, the scheduling state and the world's random generator.
+
+    writer = SnapshotWriter("forest.twsave")
+    await writer.save(simulation)  # encodes and writes in a worker thread
+    simulation = load_snapshot("forest.twsave", **simulation_kwargs)
+
+A snapshot is a fixed header (magic, format version, codec) followed by the
+body, compressed with zlib or zstd (if the zstandard package is installed).
+Numbers are struct-packed and bulk data (tiles, events, needs, embeddings) is
+stored as little-endian arrays, so restoring is mostly `np.frombuffer`.
+
+In-flight LLM turns and model sessions aren't saved: NPCs think again about
+their scene after a restore.
+"""
+
+import asyncio
+import gc
+import json
+import math
+import os
+import struct
+import zlib
+from itertools import repeat
+
+import numpy as np
+
+from textworld.models.actors.history import ModelSummarizer, RuleSummarizer
+from textworld.models.actors.llm import LLMActor
+from textworld.models.actors.needs import Need
+from textworld.models.actors.player import Player
+from textworld.models.journal import Event, EventKind
+from textworld.models.simulation import Simulation
+
+try:
+    import zstandard
+except ImportError:  # optional
+    zstandard = None
+
+MAGIC = b"TWSNAP"
+VERSION = 2
+# version 1 didn't save the random generator; it restores with a fresh one
+READABLE_VERSIONS = (1, 2)
+_HEADER = struct.Struct("<6sHB")
+CODECS = {None: 0, "zlib": 1, "zstd": 2}
+
+_ACTOR_PLAYER = 0
+_ACTOR_NPC = 1
+
+
+class SnapshotError(Exception):
+    pass
+
+
+def _compress(codec, data, level):
+    if codec == "zlib":
+        return zlib.compress(data, level)
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=level).compress(data)
+    return data
+
+
+def _decompress(codec, data):
+    if codec == CODECS["zlib"]:
+        return zlib.decompress(data)
+    if codec == CODECS["zstd"]:
+        if zstandard is None:
+            raise SnapshotError("snapshot is zstd-compressed; install zstandard")
+        return zstandard.ZstdDecompressor().decompress(data)
+    return data
+
+
+class _Writer:
+    def __init__(self):
+        self.parts = []
+
+    def pack(self, fmt, *values):
+        self.parts.append(struct.pack(fmt, *values))
+
+    def blob(self, data: bytes):
+        self.pack("<I", len(data))
+        self.parts.append(data)
+
+    def text(self, value: str):
+        self.blob(value.encode())
+
+    def array(self, values, dtype):
+        array = np.ascontiguousarray(values, dtype=np.dtype(dtype).newbyteorder("<"))
+        self.pack("<I", len(array))
+        self.parts.append(array.tobytes())
+
+    def strings(self, values: list[str]):
+        # one blob for the lot, cut back up by character lengths
+        self.array([len(value) for value in values], np.uint32)
+        self.text("".join(values))
+
+    def getvalue(self):
+        return b"".join(self.parts)
+
+
+class _Reader:
+    def __init__(self, data):
+        self.data = memoryview(data)
+        self.pos = 0
+
+    def unpack(self, fmt):
+        values = struct.unpack_from(fmt, self.data, self.pos)
+        self.pos += struct.calcsize(fmt)
+        return values
+
+    def blob(self):
+        (length,) = self.unpack("<I")
+        data = bytes(self.data[self.pos : self.pos + length])
+        self.pos += length
+        return data
+
+    def text(self):
+        return self.blob().decode()
+
+    def array(self, dtype):
+        dtype = np.dtype(dtype).newbyteorder("<")
+        (length,) = self.unpack("<I")
+        array = np.frombuffer(self.data, dtype, length, self.pos)
+        self.pos += length * dtype.itemsize
+        return array
+
+    def strings(self):
+        lengths = self.array(np.uint32).tolist()
+        joined = self.text()
+        values = []
+        start = 0
+        for length in lengths:
+            values.append(joined[start : start + length])
+            start += length
+        return values
+
+
+class _EventColumns:
+    """Every event encoded so far, one row each, in growable columns."""
+
+    columns = ("log", "kind", "actor", "dest_x", "dest_y", "text", "company")
+
+    def __init__(self, capacity=1024):
+        self.size = 0
+        self.arrays = {name: np.zeros(capacity, np.int32) for name in self.columns}
+        self.company_size = 0
+        self.company_ids = np.zeros(capacity, np.int32)
+
+    def append(self, columns: dict[str, list], company_ids: list):
+        added = len(columns["log"])
+        needed = self.size + added
+        if needed > len(self.arrays["log"]):
+            capacity = max(needed, 2 * len(self.arrays["log"]))
+            for name, array in self.arrays.items():
+                grown = np.zeros(capacity, np.int32)
+                grown[: self.size] = array[: self.size]
+                self.arrays[name] = grown
+        for name, values in columns.items():
+            self.arrays[name][self.size : needed] = values
+        self.size = needed
+
+        needed = self.company_size + len(company_ids)
+        if needed > len(self.company_ids):
+            grown = np.zeros(max(needed, 2 * len(self.company_ids)), np.int32)
+            grown[: self.company_size] = self.company_ids[: self.company_size]
+            self.company_ids = grown
+        self.company_ids[self.company_size : needed] = company_ids
+        self.company_size = needed
+
+
+class _Capture:
+    """What a snapshot needs from the simulation, taken between ticks."""
+
+    def __init__(self):
+        self.scalars = None
+        self.rng = None
+        self.world = None
+        self.actors = []
+        self.views = []
+        self.view_lengths = []
+        self.logs = []
+        self.needs = None
+
+
+class SnapshotWriter:
+    """
+    Saves snapshots of a simulation to `path`, encoding and writing them in a
+    worker thread.
+
+    Only what can still change is copied on the event loop (actor state, needs,
+    counters, and how long each location log is).  Recorded events never change,
+    so the worker encodes them while the simulation keeps ticking, and keeps
+    them encoded: each save only encodes the events recorded since the last
+    one.  Files are written next to `path` and moved over it, so a crash while
+    saving leaves the previous snapshot in place.
+    """
+
+    def __init__(self, path, compression="zlib", level=None):
+        if compression not in CODECS:
+            raise ValueError(f"unknown snapshot compression {compression!r}")
+        if compression == "zstd" and zstandard is None:
+            raise SnapshotError("zstd compression needs the zstandard package")
+        self.path = path
+        self.compression = compression
+        self.level = level if level is not None else (6 if compression == "zlib" else 3)
+        self.saves = 0
+        self.last_size = 0
+        self._actor_ids = {}
+        self._log_ids = {}
+        self._logs = []
+        self._log_encoded = []
+        self._stays = {}
+        self._texts = []
+        self._text_ids = {}
+        self._events = _EventColumns()
+        self._saving: asyncio.Task | None = None
+
+    @property
+    def saving(self):
+        return self._saving is not None and not self._saving.done()
+
+    async def save(self, simulation):
+        """Snapshots `simulation` now and writes it out without blocking the loop."""
+        if self._saving is not None:
+            # only to wait for it; how it went was the previous caller's business
+            await asyncio.wait([self._saving])
+        capture = self.capture(simulation)
+        self._saving = asyncio.create_task(asyncio.to_thread(self._write, capture))
+        await asyncio.shield(self._saving)
+
+    def save_now(self, simulation):
+        """Snapshots and writes `simulation` on the calling thread."""
+        self._write(self.capture(simulation))
+
+    def _actor_id(self, actor):
+        actor_id = self._actor_ids.get(actor)
+        if actor_id is None:
+            actor_id = self._actor_ids[actor] = len(self._actor_ids)
+        return actor_id
+
+    def _log_id(self, log):
+        log_id = self._log_ids.get(id(log))
+        if log_id is None:
+            log_id = self._log_ids[id(log)] = len(self._logs)
+            # holding on to the log keeps its id from being reused
+            self._logs.append(log)
+            self._log_encoded.append(0)
+        return log_id
+
+    def capture(self, simulation) -> _Capture:
+        capture = _Capture()
+        grid = simulation.grid
+        scheduler = simulation.scheduler
+        capture.scalars = (
+            simulation.time,
+            simulation.actor_updates,
+            simulation.turn_step.accumulated,
+            simulation.needs_step.accumulated,
+            scheduler.submitted,
+            scheduler.started,
+            scheduler.coalesced,
+            scheduler.shed,
+            scheduler.deferred,
+            scheduler.max_depth,
+            scheduler.calls.level if scheduler.calls is not None else math.nan,
+            scheduler.tokens.level if scheduler.tokens is not None else math.nan,
+        )
+        capture.rng = simulation.rng.getstate()
+        if grid.bounded:
+            capture.world = (0, grid.width, grid.height, grid.kinds.copy())
+        else:
+            capture.world = (
+                1,
+                simulation.width,
+                simulation.height,
+                (str(grid.seed), grid.chunk_size, grid.max_live_chunks),
+            )
+        capture.places = grid.places
+
+        simulation.player  # the player is created on first use
+        for actor in simulation.actors:
+            self._actor_id(actor)
+        for actor in simulation.actors:
+            self._capture_actor(capture, actor)
+
+        # logs only grow, so their lengths say what's in the snapshot; the rest
+        # of the bookkeeping is left to the worker
+        capture.views = grid.views()
+        capture.view_lengths = [len(view.log) for view in capture.views]
+
+        needs = simulation.needs
+        capture.needs = (
+            [self._actor_ids[owner] for owner in needs.owners],
+            [need.name for need in needs.needs],
+            needs.values[: needs.size].copy(),
+            needs.max_values[: needs.size].copy(),
+            needs.decays[: needs.size].copy(),
+        )
+        return capture
+
+    def _capture_actor(self, capture, actor):
+        history = actor.history
+        # stays only ever get added, so each is converted once
+        stays = self._stays.setdefault(actor, [])
+        for log, start, end in history.stays[len(stays) :]:
+            stays.append((self._log_id(log), start, end))
+        current = history.current_stay
+        if current is not None:
+            current = self._log_id(current[0]), current[1]
+        record = {
+            "id": self._actor_ids[actor],
+            "kind": _ACTOR_PLAYER if isinstance(actor, Player) else _ACTOR_NPC,
+            "name": actor.name,
+            "private_facts": list(actor.private_facts),
+            "public_facts": list(actor.public_facts),
+            "position": (actor.location.x, actor.location.y),
+            "window": history.window,
+            "summary": history.summary,
+            "summarized": history._summarized,
+            "stays": stays[:],
+            "current": current,
+        }
+        if isinstance(actor, LLMActor):
+            summarizer = actor.summarizer
+            if isinstance(summarizer, ModelSummarizer):
+                summarizer = summarizer.fallback
+            record["turn"] = (
+                actor.next_turn,
+                actor._turn_seen,
+                actor._statements_seen,
+                actor.fallbacks,
+            )
+            if isinstance(summarizer, RuleSummarizer):
+                record["rules"] = (
+                    summarizer.moves,
+                    list(summarizer.places),
+                    list(summarizer.people),
+                    list(summarizer.statements),
+                )
+            memory = actor.memory
+            if memory is not None and memory.index.size:
+                index = memory.index
+                record["memory"] = (
+                    memory._cursor,
+                    index._vectors[: index.size].copy(),
+                    list(index.payloads),
+                )
+        capture.actors.append(record)
+
+    def _collect_logs(self, capture):
+        # a live log is put back on its location's view; the rest are the logs
+        # of views dropped since they were saved, only kept by the histories,
+        # and no longer growing
+        live = {}
+        for view, length in zip(capture.views, capture.view_lengths):
+            live[id(view.log)] = view, length
+            if length:
+                self._log_id(view.log)
+        capture.logs = []
+        for log_id, log in enumerate(self._logs):
+            entry = live.get(id(log))
+            if entry is None:
+                location = log[0].location
+                capture.logs.append(
+                    (log_id, log, len(log), False, location.x, location.y)
+                )
+            else:
+                view, length = entry
+                capture.logs.append((log_id, log, length, True, view.x, view.y))
+
+    def _encode_events(self, capture):
+        """Encodes the events recorded since the last save onto the columns."""
+        actor_ids = self._actor_ids
+        text_ids = self._text_ids
+        texts = self._texts
+        columns = {name: [] for name in _EventColumns.columns}
+        log_column = columns["log"]
+        kinds = columns["kind"]
+        actors = columns["actor"]
+        dest_x = columns["dest_x"]
+        dest_y = columns["dest_y"]
+        text_column = columns["text"]
+        counts = columns["company"]
+        company_ids = []
+        for log_id, log, length, *_ in capture.logs:
+            start = self._log_encoded[log_id]
+            if start == length:
+                continue
+            for event in log[start:length]:
+                log_column.append(log_id)
+                kinds.append(event.kind.value)
+                actors.append(actor_ids[event.actor])
+                destination = event.destination
+                if destination is None:
+                    dest_x.append(0)
+                    dest_y.append(0)
+                else:
+                    dest_x.append(destination.x)
+                    dest_y.append(destination.y)
+                text = event.text
+                if text is None:
+                    text_column.append(-1)
+                else:
+                    text_id = text_ids.get(text)
+                    if text_id is None:
+                        text_id = text_ids[text] = len(texts)
+                        texts.append(text)
+                    text_column.append(text_id)
+                company = event.company
+                counts.append(len(company))
+                if company:
+                    company_ids.extend([actor_ids[other] for other in company])
+            self._log_encoded[log_id] = length
+        self._events.append(columns, company_ids)
+
+    def _write(self, capture):
+        self._collect_logs(capture)
+        self._encode_events(capture)
+        body = _Writer()
+        body.pack("<dq2d6q2d", *capture.scalars)
+        rng_version, rng_words, gauss_next = capture.rng
+        body.pack("<I?d", rng_version, gauss_next is not None, gauss_next or 0.0)
+        body.array(rng_words, np.uint32)
+
+        kind, width, height, world = capture.world
+        body.pack("<Bqq", kind, width, height)
+        if kind == 0:
+            body.array(world, np.uint16)
+        else:
+            seed, chunk_size, max_live_chunks = world
+            body.text(seed)
+            body.pack("<qq", chunk_size, max_live_chunks)
+        body.text(json.dumps(capture.places))
+
+        body.strings(self._texts)
+        body.pack("<I", len(self._actor_ids))
+
+        body.pack("<I", len(capture.logs))
+        for log_id, _, length, live, x, y in capture.logs:
+            body.pack("<II?qq", log_id, length, live, x, y)
+        events = self._events
+        for name in events.columns:
+            body.array(events.arrays[name][: events.size], np.int32)
+        body.array(events.company_ids[: events.company_size], np.int32)
+
+        body.pack("<I", len(capture.actors))
+        for record in capture.actors:
+            self._write_actor(body, record)
+
+        owners, names, values, max_values, decays = capture.needs
+        body.array(owners, np.int32)
+        body.strings(names)
+        body.array(values, np.float64)
+        body.array(max_values, np.float64)
+        body.array(decays, np.float64)
+
+        data = _HEADER.pack(MAGIC, VERSION, CODECS[self.compression]) + _compress(
+            self.compression, body.getvalue(), self.level
+        )
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "wb") as fd:
+            fd.write(data)
+        os.replace(temporary, self.path)
+        self.saves += 1
+        self.last_size = len(data)
+
+    @staticmethod
+    def _write_actor(body, record):
+        body.pack("<IB", record["id"], record["kind"])
+        body.strings(
+            [record["name"], record["summary"]]
+            + record["private_facts"]
+            + record["public_facts"]
+        )
+        body.pack(
+            "<IIqqII",
+            len(record["private_facts"]),
+            len(record["public_facts"]),
+            *record["position"],
+            record["window"],
+            record["summarized"],
+        )
+        body.array([value for stay in record["stays"] for value in stay], np.int64)
+        current = record["current"]
+        body.pack("<?qq", current is not None, *(current or (0, 0)))
+
+        turn = record.get("turn")
+        body.pack("<?", turn is not None)
+        if turn is not None:
+            body.pack("<dqqq", *turn)
+
+        rules = record.get("rules")
+        body.pack("<?", rules is not None)
+        if rules is not None:
+            moves, places, people, statements = rules
+            body.pack("<q", moves)
+            body.strings(places)
+            body.strings(people)
+            body.strings(statements)
+
+        memory = record.get("memory")
+        body.pack("<?", memory is not None)
+        if memory is not None:
+            cursor, vectors, payloads = memory
+            body.pack("<qI", cursor, vectors.shape[1])
+            body.array(vectors.ravel(), np.float32)
+            body.array(payloads, np.int64)
+
+
+def read_snapshot_header(data):
+    if len(data) < _HEADER.size:
+        raise SnapshotError("not a snapshot: too short")
+    magic, version, codec = _HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise SnapshotError("not a snapshot: bad magic")
+    if version not in READABLE_VERSIONS:
+        raise SnapshotError(f"unsupported snapshot version {version}")
+    return version, codec
+
+
+def load_snapshot(path, **simulation_kwargs):
+    """
+    A simulation restored from the snapshot at `path`.  `simulation_kwargs`
+    configure everything that isn't saved (LLM budgets, batching, ...).
+    """
+    with open(path, "rb") as fd:
+        data = fd.read()
+    version, codec = read_snapshot_header(data)
+    body = _Reader(_decompress(codec, memoryview(data)[_HEADER.size :]))
+
+    # a restore allocates objects by the hundred thousand and none of them are
+    # garbage; left on, the cyclic collector keeps rescanning all of them
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _restore(body, version, simulation_kwargs)
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def _restore(body, version, simulation_kwargs):
+    (
+        time,
+        actor_updates,
+        turn_accumulated,
+        needs_accumulated,
+        submitted,
+        started,
+        coalesced,
+        shed,
+        deferred,
+        max_depth,
+        calls_level,
+        tokens_level,
+    ) = body.unpack("<dq2d6q2d")
+    rng_state = None
+    if version >= 2:
+        rng_version, has_gauss, gauss_next = body.unpack("<I?d")
+        rng_words = tuple(body.array(np.uint32).tolist())
+        rng_state = rng_version, rng_words, gauss_next if has_gauss else None
+
+    kind, width, height = body.unpack("<Bqq")
+    # the saved world wins over whatever the caller configured
+    for key in ("chunked", "seed", "chunk_size", "max_live_chunks", "num_npcs"):
+        simulation_kwargs.pop(key, None)
+    if kind == 0:
+        kinds = body.array(np.uint16).copy()
+        simulation = Simulation(width, height, num_npcs=0, **simulation_kwargs)
+        simulation.grid.kinds = kinds
+    else:
+        seed = int(body.text())
+        chunk_size, max_live_chunks = body.unpack("<qq")
+        simulation = Simulation(
+            width,
+            height,
+            num_npcs=0,
+            chunked=True,
+            seed=seed,
+            chunk_size=chunk_size,
+            max_live_chunks=max_live_chunks,
+            **simulation_kwargs,
+        )
+    grid = simulation.grid
+    grid.places = json.loads(body.text())
+
+    simulation.time = time
+    simulation.actor_updates = actor_updates
+    if rng_state is not None:
+        # the NPCs share this generator, so their wandering carries on as it was
+        simulation.rng.setstate(rng_state)
+    simulation.turn_step.accumulated = turn_accumulated
+    simulation.needs_step.accumulated = needs_accumulated
+    scheduler = simulation.scheduler
+    scheduler.submitted = submitted
+    scheduler.started = started
+    scheduler.coalesced = coalesced
+    scheduler.shed = shed
+    scheduler.deferred = deferred
+    scheduler.max_depth = max_depth
+    if scheduler.calls is not None and not math.isnan(calls_level):
+        scheduler.calls.level = calls_level
+    if scheduler.tokens is not None and not math.isnan(tokens_level):
+        scheduler.tokens.level = tokens_level
+
+    texts = body.strings()
+    (actor_count,) = body.unpack("<I")
+    actors = [None] * actor_count
+
+    (log_count,) = body.unpack("<I")
+    logs_meta = [body.unpack("<II?qq") for _ in range(log_count)]
+    columns = {name: body.array(np.int32) for name in _EventColumns.columns}
+    company_ids = body.array(np.int32)
+
+    # actors first: events refer to them
+    (actor_count,) = body.unpack("<I")
+    records = [_read_actor(body) for _ in range(actor_count)]
+    for record in records:
+        if record["kind"] == _ACTOR_PLAYER:
+            actor = Player(record["name"], record["private"], record["public"])
+            actor.history.window = simulation.history_window
+            simulation.player = actor
+        else:
+            actor = simulation.create_npc(
+                record["name"], record["private"], record["public"]
+            )
+        actors[record["id"]] = actor
+
+    logs = _read_events(grid, logs_meta, columns, company_ids, texts, actors)
+
+    for record in records:
+        actor = actors[record["id"]]
+        actor.history.window = record["window"]
+        actor.history.restore(
+            [(logs[log_id], start, end) for log_id, start, end in record["stays"]],
+            (
+                (logs[record["current"][0]], record["current"][1])
+                if record["current"] is not None
+                else None
+            ),
+            record["summary"],
+            record["summarized"],
+        )
+        actor.place(grid.location_at(*record["position"]))
+        if record["turn"] is not None:
+            next_turn, turn_seen, statements_seen, fallbacks = record["turn"]
+            actor.next_turn = next_turn
+            actor._turn_seen = turn_seen
+            actor._statements_seen = statements_seen
+            actor.fallbacks = fallbacks
+            # whatever it was thinking about when the snapshot was taken is gone
+            actor._history_dirty = True
+        rules = record["rules"]
+        if rules is not None and isinstance(actor, LLMActor):
+            summarizer = actor.summarizer
+            if isinstance(summarizer, ModelSummarizer):
+                summarizer = summarizer.fallback
+            moves, places, people, statements = rules
+            summarizer.moves = moves
+            summarizer.places.extend(places)
+            summarizer.people.extend(people)
+            summarizer.statements.extend(statements)
+        memory = record["memory"]
+        if memory is not None and getattr(actor, "memory", None) is not None:
+            cursor, vectors, payloads = memory
+            actor.memory.index.add(vectors, payloads)
+            actor.memory._cursor = cursor
+        simulation.wakeups.wake(actor)
+
+    owners = body.array(np.int32)
+    names = body.strings()
+    values = body.array(np.float64)
+    max_values = body.array(np.float64)
+    decays = body.array(np.float64)
+    needs = {}
+    for owner, name, value, max_value, decay in zip(
+        owners.tolist(), names, values.tolist(), max_values.tolist(), decays.tolist()
+    ):
+        needs.setdefault(owner, []).append(Need(name, value, max_value, decay))
+    for owner, actor_needs in needs.items():
+        actors[owner].needs = actor_needs
+        simulation.needs.add_actor(actors[owner])
+
+    simulation.update_detail()
+    return simulation
+
+
+def _read_actor(body):
+    actor_id, kind = body.unpack("<IB")
+    strings = body.strings()
+    private_count, public_count, x, y, window, summarized = body.unpack("<IIqqII")
+    stays = body.array(np.int64).reshape(-1, 3).tolist()
+    has_current, log_id, start = body.unpack("<?qq")
+
+    record = {
+        "id": actor_id,
+        "kind": kind,
+        "name": strings[0],
+        "summary": strings[1],
+        "private": strings[2 : 2 + private_count],
+        "public": strings[2 + private_count : 2 + private_count + public_count],
+        "position": (x, y),
+        "window": window,
+        "summarized": summarized,
+        "stays": stays,
+        "current": (log_id, start) if has_current else None,
+        "turn": None,
+        "rules": None,
+        "memory": None,
+    }
+    if body.unpack("<?")[0]:
+        record["turn"] = body.unpack("<dqqq")
+    if body.unpack("<?")[0]:
+        (moves,) = body.unpack("<q")
+        record["rules"] = moves, body.strings(), body.strings(), body.strings()
+    if body.unpack("<?")[0]:
+        cursor, dimensions = body.unpack("<qI")
+        vectors = body.array(np.float32).reshape(-1, dimensions)
+        record["memory"] = cursor, vectors, body.array(np.int64).tolist()
+    return record
+
+
+def _objects(values, indices):
+    """`[values[i] for i in indices]`, done by numpy."""
+    table = np.empty(len(values), dtype=object)
+    table[:] = values
+    return table[indices].tolist()
+
+
+def _read_events(grid, logs_meta, columns, company_ids, texts, actors):
+    """The restored location logs, by log id, with live ones put back in place."""
+    # rows are in the order they were encoded, which keeps each log's rows in
+    # log order; a stable sort by log groups them without mixing that up
+    order = np.argsort(columns["log"], kind="stable")
+    counts = columns["company"]
+    company_starts = (np.cumsum(counts, dtype=np.int64) - counts)[order]
+    counts = counts[order]
+    kind_values = columns["kind"][order]
+    total = len(order)
+
+    kinds = _objects(list(EventKind), kind_values)
+    event_actors = _objects(actors, columns["actor"][order])
+    # a text id of -1 picks the None on the end
+    event_texts = _objects(texts + [None], columns["text"][order])
+
+    views = {}
+
+    def view(x, y):
+        location = views.get((x, y))
+        if location is None:
+            location = views[x, y] = grid.location_at(x, y)
+        return location
+
+    # one view lookup per distinct destination, not per departure
+    departed = np.flatnonzero(kind_values == EventKind.DEPARTED)
+    # both coordinates packed into one int64, which np.unique sorts far faster
+    # than pairs
+    positions = (columns["dest_x"][order][departed].astype(np.int64) << 32) | (
+        columns["dest_y"][order][departed].astype(np.int64) & 0xFFFFFFFF
+    )
+    destinations = np.full(total, None, dtype=object)
+    if len(departed):
+        unique, inverse = np.unique(positions, return_inverse=True)
+        destination_views = [
+            view(x, y)
+            for x, y in zip(
+                (unique >> 32).tolist(),
+                (unique & 0xFFFFFFFF).astype(np.uint32).astype(np.int32).tolist(),
+            )
+        ]
+        destinations[departed] = _objects(destination_views, inverse)
+    destinations = destinations.tolist()
+
+    companies = [()] * total
+    company_actors = _objects(actors, company_ids) if len(company_ids) else []
+    with_company = np.flatnonzero(counts)
+    for row, start, count in zip(
+        with_company.tolist(),
+        company_starts[with_company].tolist(),
+        counts[with_company].tolist(),
+    ):
+        companies[row] = tuple(company_actors[start : start + count])
+
+    logs = {}
+    first = 0
+    for log_id, length, live, x, y in sorted(logs_meta):
+        location = view(x, y)
+        end = first + length
+        log = list(
+            map(
+                Event,
+                kinds[first:end],
+                event_actors[first:end],
+                repeat(location, length),
+                destinations[first:end],
+                event_texts[first:end],
+                companies[first:end],
+            )
+        )
+        first = end
+        if live:
+            location.log = log
+        logs[log_id] = log
+    return logs
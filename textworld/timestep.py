@@ -0,0 +1,96 @@
+class FixedStep:
+    """
+    Turns frames of any length into a whole number of fixed-length steps.
+
+    Time left over after the last whole step carries over to the next frame.
+    After a stall at most `max_steps` steps are run at once and the rest of the
+    backlog is dropped (and counted in `dropped`), so one slow frame can't make
+    the following ones slower still.
+    """
+
+    def __init__(self, interval, max_steps=5):
+        self.interval = interval
+        self.max_steps = max_steps
+        self.accumulated = 0.0
+        self.steps = 0
+        self.dropped = 0
+
+    def advance(self, delta_time) -> int:
+        """How many steps are due after another `delta_time` seconds."""
+        self.accumulated += delta_time
+        steps = int(self.accumulated // self.interval)
+        if self.max_steps and steps > self.max_steps:
+            self.dropped += steps - self.max_steps
+            steps = self.max_steps
+            self.accumulated %= self.interval
+        else:
+            self.accumulated -= steps * self.interval
+        self.steps += steps
+        return steps
+
+    @property
+    def remaining(self):
+        """Seconds until the next step is due."""
+        return max(0.0, self.interval - self.accumulated)
+
+
+class TimerWheel:
+    """
+    Wake-up times for any number of sleepers, in a ring of `slots` buckets that
+    are `resolution` seconds wide.
+
+    Scheduling is O(1) and advancing the clock only looks at the buckets it
+    passes, so a sleeper costs nothing until its time comes.  Times more than a
+    full turn of the wheel away wait in their bucket for the right turn.
+    Rescheduling a sleeper just files it again; the stale entry is skipped when
+    its bucket comes up.
+    """
+
+    def __init__(self, resolution=1.0, slots=256, start=0.0):
+        self.resolution = resolution
+        self._buckets = [[] for _ in range(slots)]
+        self._times = {}
+        self._ready = {}
+        self._tick = int(start // resolution)
+
+    def __len__(self):
+        return len(self._times) + len(self._ready)
+
+    def schedule(self, key, when):
+        self._times[key] = when
+        tick = max(int(when // self.resolution), self._tick)
+        self._buckets[tick % len(self._buckets)].append((when, key))
+
+    def wake(self, key):
+        """Makes `key` due on the next `advance`, whatever it was scheduled for."""
+        self._times.pop(key, None)
+        self._ready[key] = None
+
+    def cancel(self, key):
+        self._times.pop(key, None)
+        self._ready.pop(key, None)
+
+    def advance(self, now) -> list:
+        """Everything woken or due by `now`, taken off the wheel."""
+        target = int(now // self.resolution)
+        slots = len(self._buckets)
+        for tick in range(self._tick, min(target, self._tick + slots - 1) + 1):
+            bucket = self._buckets[tick % slots]
+            if not bucket:
+                continue
+            waiting = []
+            for when, key in bucket:
+                if self._times.get(key) != when:
+                    continue  # rescheduled, woken or cancelled since
+                if when <= now:
+                    del self._times[key]
+                    self._ready[key] = None
+                else:
+                    waiting.append((when, key))
+            bucket[:] = waiting
+        # the current bucket may still hold times later in this tick
+        self._tick = max(self._tick, target)
+
+        ready = list(self._ready)
+        self._ready.clear()
+        return ready
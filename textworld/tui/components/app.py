@@ -1,6 +1,8 @@
 from textual.app import App
 from textual.widgets import Button
 
+from textworld.logsink import get_log_sink
+from textworld.ollama_utils import close_ollama_clients
 from textworld.tui.components.screens.gamemenu import GameMenuScreen
 from textworld.tui.components.screens.mainmenu import MainMenuScreen
 from textworld.tui.components.screens.theforestgame import TheForestGameScreen
@@ -26,6 +28,12 @@ class TheForestApp(App):
     def on_ready(self) -> None:
         self.push_screen(MainMenuScreen())
 
+    async def on_unmount(self) -> None:
+        await close_ollama_clients()
+        log_sink = get_log_sink()
+        if log_sink is not None:
+            await log_sink.aclose()
+
     def on_button_pressed(self, event: Button.Pressed) -> None:
         """Event handler called when a button is pressed."""
         button_id = event.button.id
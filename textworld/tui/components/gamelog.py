@@ -1,33 +1,133 @@
-from textual.app import ComposeResult
-from textual.containers import VerticalScroll
-from textual.reactive import reactive
-from textual.widget import Widget
-from textual.widgets import Label
+from bisect import bisect_right
+
+from rich.segment import Segment
+from textual.geometry import Size
+from textual.scroll_view import ScrollView
+from textual.strip import Strip
 
 from textworld.formatting import wordwrap
 
 
-class GameLog(Widget):
-    CSS = """
-    GameLogScroll {
-        height: 100%;
+class GameLog(ScrollView):
+    """
+    The player's log, newest first, below any lines still being written.
+
+    The log only ever grows, so each line is wrapped once, when it first shows
+    up, and kept.  Nothing is laid out as one big block of text: the widget
+    scrolls over the wrapped rows and only renders the ones that are visible,
+    so a frame costs the same however long the log has got.
+    """
+
+    DEFAULT_CSS = """
+    GameLog {
+        height: 1fr;
     }
     """
     classes = "box"
-    lines = reactive([])
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._source = None
+        # every line shown so far, oldest first, its wrapped rows and the
+        # running total of rows at the end of each line
+        self._lines: list[str] = []
+        self._rows: list[list[str]] = []
+        self._ends: list[int] = []
+        self._pending: list[str] = []
+        self._pending_rows: list[str] = []
+        self._wrap_width = None
+
+    @property
+    def row_count(self):
+        return len(self._pending_rows) + (self._ends[-1] if self._ends else 0)
 
     def write_line(self, line):
-        self.lines = self.lines + [line]
+        added = self._append([line])
+        self._changed(added)
 
     def clear(self):
-        self.lines = []
+        self._source = None
+        self._lines = []
+        self._rows = []
+        self._ends = []
+        self._pending = []
+        self._pending_rows = []
+        self._changed(0)
+
+    def set_lines(self, lines, pending=()):
+        """Shows `lines` newest first, below any `pending` lines still being written."""
+        if lines is not self._source or len(lines) < len(self._lines):
+            self._source = lines
+            self._lines = []
+            self._rows = []
+            self._ends = []
+        added = 0
+        if len(lines) > len(self._lines):
+            added = self._append(lines[len(self._lines) :])
+
+        pending = list(pending)
+        if not added and pending == self._pending:
+            return
+        if pending != self._pending:
+            rows = [row for line in pending for row in self._wrap(line)]
+            added += len(rows) - len(self._pending_rows)
+            self._pending = pending
+            self._pending_rows = rows
+        self._changed(added)
+
+    def _wrap(self, line):
+        return wordwrap(line, self._wrap_width or 80).split("\n")
+
+    def _append(self, lines):
+        start = total = self._ends[-1] if self._ends else 0
+        for line in lines:
+            rows = self._wrap(line)
+            self._lines.append(line)
+            self._rows.append(rows)
+            total += len(rows)
+            self._ends.append(total)
+        return total - start
+
+    def _changed(self, added):
+        # new lines go on top, so keep a scrolled-down reader on what they were
+        # reading instead of letting it slide away
+        anchored = self.scroll_y > 0
+        self.virtual_size = Size((self._wrap_width or 0) + 2, self.row_count)
+        if anchored and added:
+            self.scroll_to(
+                y=max(self.scroll_y + added, 0), animate=False, immediate=True
+            )
+        self.refresh()
 
-    def watch_lines(self):
-        label = self.query_one("#GameLogLabel", Label)
-        label.update("\n".join(wordwrap(line) for line in self.lines))
+    def on_resize(self):
+        # leave room for the indent of continued rows
+        width = max(self.scrollable_content_region.width - 2, 10)
+        if width == self._wrap_width:
+            return
+        # the only time lines get wrapped again: the log is laid out for a new width
+        self._wrap_width = width
+        lines = self._lines
+        self._lines = []
+        self._rows = []
+        self._ends = []
+        self._append(lines)
+        self._pending_rows = [row for line in self._pending for row in self._wrap(line)]
+        self._changed(0)
 
-    def set_lines(self, lines):
-        self.lines = lines[::-1]
+    def _row(self, index):
+        pending = len(self._pending_rows)
+        if index < pending:
+            return self._pending_rows[index]
+        index -= pending
+        total = self._ends[-1] if self._ends else 0
+        if index >= total:
+            return ""
+        # rows are stored oldest first but shown newest first, each line's own
+        # rows still reading top to bottom
+        line = bisect_right(self._ends, total - 1 - index)
+        return self._rows[line][index - (total - self._ends[line])]
 
-    def compose(self) -> ComposeResult:
-        yield VerticalScroll(Label(id="GameLogLabel"), id="GameLogScroll")
+    def render_line(self, y: int) -> Strip:
+        scroll_x, scroll_y = self.scroll_offset
+        text = self._row(scroll_y + y)
+        return Strip([Segment(text)]).crop(scroll_x, scroll_x + self.size.width)
@@ -2,7 +2,7 @@ from textual.reactive import reactive
 from textual.widget import Widget
 from textual.widgets import Label
 
-from textworld.map import generate_map_table
+from textworld.map import MapCells
 from textworld.models.locations import Location
 
 
@@ -10,11 +10,17 @@ class MiniMap(Widget):
     can_focus = True
     location = reactive(Location(name="UNK"))
 
+    def __init__(self, *args, viewport=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        # (columns, rows) around the player to show; None shows the whole map
+        self.cells = MapCells(viewport)
+
     def update(self, simulation):
         self.simulation = simulation
         self.location = self.simulation.player.location
-        map_grid = self.query_one("#MapGrid", Label)
-        map_grid.update(generate_map_table(simulation, self.location))
+        table = self.cells.render(simulation, self.location)
+        if table is not None:
+            self.query_one("#MapGrid", Label).update(table)
 
     def watch_location(self, value):
         label = self.query_one("#LocationLabel", Label)
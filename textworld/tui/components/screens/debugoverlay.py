@@ -0,0 +1,81 @@
+from rich.table import Table
+from textual.app import ComposeResult
+from textual.screen import ModalScreen
+from textual.widgets import Footer, Static
+
+from textworld.metrics import Metrics, get_metrics
+from textworld.profiler import SamplingProfiler
+
+
+def span_table(metrics: Metrics, title="Spans"):
+    table = Table(title=title)
+    table.add_column("span")
+    for label in ("count", "p50 ms", "p99 ms", "max ms"):
+        table.add_column(label, justify="right")
+    for name, summary in metrics.summary().items():
+        table.add_row(
+            name,
+            str(summary["count"]),
+            f"{summary['p50'] * 1000:.2f}",
+            f"{summary['p99'] * 1000:.2f}",
+            f"{summary['max'] * 1000:.2f}",
+        )
+    return table
+
+
+class DebugOverlayScreen(ModalScreen):
+    """Live p50/p99 of every instrumented span, over the game, which keeps running."""
+
+    DEFAULT_CSS = """
+    DebugOverlayScreen {
+        align: right top;
+    }
+
+    #DebugSpans {
+        width: auto;
+        height: auto;
+        border: solid green;
+        background: $surface;
+    }
+    """
+    BINDINGS = [
+        ("escape", "dismiss", "Close"),
+        ("p", "toggle_profiler", "Toggle profiler"),
+        ("r", "reset", "Reset"),
+    ]
+
+    def __init__(self, profiler: SamplingProfiler | None = None, profile_path=None):
+        super().__init__()
+        self.profiler = profiler
+        self.profile_path = profile_path
+
+    def compose(self) -> ComposeResult:
+        yield Static(id="DebugSpans")
+        yield Footer()
+
+    def on_mount(self):
+        self.refresh_spans()
+        self.set_interval(0.5, self.refresh_spans)
+
+    def refresh_spans(self):
+        title = "Spans"
+        if self.profiler is not None and self.profiler.running:
+            title += f" (profiling, {self.profiler.samples} samples)"
+        self.query_one("#DebugSpans", Static).update(span_table(get_metrics(), title))
+
+    def action_toggle_profiler(self):
+        if self.profiler is None:
+            return
+        if self.profiler.running:
+            self.profiler.stop()
+            if self.profile_path:
+                self.profiler.write(self.profile_path)
+                self.notify(f"Profile written to {self.profile_path}")
+        else:
+            self.profiler.reset()
+            self.profiler.start()
+        self.refresh_spans()
+
+    def action_reset(self):
+        get_metrics().reset()
+        self.refresh_spans()
@@ -1,3 +1,5 @@
+import asyncio
+import os
 from time import monotonic
 
 from textual.app import ComposeResult
@@ -6,19 +8,85 @@ from textual.reactive import reactive
 from textual.screen import Screen
 from textual.widgets import Footer, Header, Input
 
+from textworld.models.directions import Direction
 from textworld.models.locations import Location
 from textworld.models.simulation import Simulation
 from textworld.tui.components.boxlabel import BoxLabel
 from textworld.tui.components.gamelog import GameLog
 from textworld.tui.components.minimap import MiniMap
 from textworld.tui.components.playerstatus import PlayerStatus
+from textworld.tui.components.screens.debugoverlay import DebugOverlayScreen
+from textworld.llm_cache import ResponseCache
+from textworld.llm_trace import TraceRecorder, TraceReplay
+from textworld.logsink import AsyncLogSink, configure_log_sink
+from textworld.metrics import Metrics, configure_metrics, get_metrics
+from textworld.ollama_utils import configure_ollama
+from textworld.profiler import SamplingProfiler
 from textworld.settings import AppSettings
+from textworld.snapshot import SnapshotWriter, load_snapshot
+from textworld.timestep import FixedStep
 
 
-def create_the_forest():
-    settings = AppSettings()
-    the_forest = Simulation(settings.map_width, settings.map_height)
-    return the_forest
+def create_the_forest(settings: AppSettings | None = None):
+    settings = settings or AppSettings()
+    configure_metrics(Metrics(enabled=settings.metrics_enabled))
+    cache = None
+    if settings.llm_cache_size:
+        cache = ResponseCache(
+            settings.llm_cache_size, settings.llm_cache_ttl, settings.llm_cache_path
+        )
+    if settings.llm_log_path:
+        configure_log_sink(
+            AsyncLogSink(
+                settings.llm_log_path,
+                max_bytes=settings.llm_log_max_bytes,
+                backup_count=settings.llm_log_backups,
+                compress=settings.llm_log_compress,
+            )
+        )
+    trace = None
+    if settings.llm_trace_path and settings.llm_trace_mode == "replay":
+        trace = TraceReplay.load(settings.llm_trace_path, settings.llm_replay_timing)
+    elif settings.llm_trace_path:
+        trace = TraceRecorder(settings.llm_trace_path)
+    configure_ollama(
+        settings.ollama_hosts,
+        settings.ollama_model,
+        max_in_flight_per_host=settings.ollama_max_in_flight_per_host,
+        cache=cache,
+        request_timeout=settings.ollama_request_timeout,
+        failure_threshold=settings.ollama_failure_threshold,
+        reset_timeout=settings.ollama_circuit_reset,
+        trace=trace,
+    )
+    kwargs = dict(
+        concurrent_updates=settings.concurrent_npc_turns,
+        max_concurrent_turns=settings.max_concurrent_npc_turns,
+        background_turns=settings.background_npc_turns,
+        history_window=settings.history_window,
+        summarize_with_model=settings.summarize_history_with_model,
+        memory_model=settings.memory_model,
+        memory_top_k=settings.memory_top_k,
+        session_max_context=settings.session_max_context,
+        stream_turns=settings.stream_npc_turns,
+        chunked=settings.chunked_world,
+        seed=settings.world_seed,
+        chunk_size=settings.chunk_size,
+        max_live_chunks=settings.max_live_chunks,
+        detail_radius=settings.npc_detail_radius,
+        llm_calls_per_sec=settings.llm_calls_per_sec,
+        llm_tokens_per_sec=settings.llm_tokens_per_sec,
+        max_queued_turns=settings.max_queued_npc_turns,
+        turn_deadline=settings.npc_turn_deadline,
+        batch_window=settings.npc_batch_window,
+        max_batch=settings.max_npc_batch,
+        update_frequency=settings.npc_update_interval,
+        needs_interval=settings.needs_update_interval,
+        max_catch_up=settings.max_catch_up_steps,
+    )
+    if settings.snapshot_path and os.path.exists(settings.snapshot_path):
+        return load_snapshot(settings.snapshot_path, **kwargs)
+    return Simulation(settings.map_width, settings.map_height, **kwargs)
 
 
 class TheForestGameScreen(Screen):
@@ -61,38 +129,96 @@ class TheForestGameScreen(Screen):
         ("right", "right", "Right"),
         ("up", "up", "Up"),
         ("down", "down", "Down"),
+        ("f2", "debug_overlay", "Debug"),
     ]
 
-    start_time = reactive(monotonic)
-    runtime = reactive(0.0)
-    previous_runtime = 0
     paused = reactive(False)
+    frame_rate = 12.0
+    snapshots: SnapshotWriter | None = None
+    snapshot_interval = 60.0
+    metrics_path: str | None = None
+    metrics_interval = 10.0
 
     def on_mount(self) -> None:
-        """Called when the game screen loads.  schedules screen updates for 12fps."""
-        self.set_interval(1 / 12, self.update_runtime)
-        self.simulation = create_the_forest()
+        """Called when the game screen loads.  starts the game loop."""
+        settings = AppSettings()
+        self.frame_rate = settings.frame_rate
+        self.simulation = create_the_forest(settings)
+        self.metrics_path = settings.metrics_path
+        self.metrics_interval = settings.metrics_interval
+        self.profiler = SamplingProfiler(settings.profile_interval)
+        self.profile_path = settings.profile_path
+        if settings.snapshot_path:
+            self.snapshots = SnapshotWriter(
+                settings.snapshot_path, settings.snapshot_compression
+            )
+            self.snapshot_interval = settings.snapshot_interval
+        self.run_worker(self.game_loop(), group="game_loop", exclusive=True)
 
-    def update_runtime(self):
-        if not self.paused:
-            self.runtime = monotonic() - self.start_time
+    async def game_loop(self):
+        """
+        Advances the simulation by the real time that passed and redraws the
+        screen at `frame_rate`.  The simulation runs its systems at their own
+        fixed rates, so the loop wakes for whichever is due first, a step or a
+        frame, and frame pacing doesn't depend on how long a step took.
+        """
+        frames = FixedStep(1 / self.frame_rate, max_steps=1)
+        saves = FixedStep(self.snapshot_interval, max_steps=1)
+        exports = FixedStep(self.metrics_interval, max_steps=1)
+        last = monotonic()
+        while True:
+            now = monotonic()
+            delta_time, last = now - last, now
+            if not self.paused:
+                await self.simulation.tick(delta_time)
+            if frames.advance(delta_time):
+                self.draw()
+            if saves.advance(delta_time) and self.snapshots is not None:
+                if not self.snapshots.saving:
+                    self.run_worker(self.autosave())
+            if exports.advance(delta_time) and self.metrics_path:
+                get_metrics().write(self.metrics_path)
+            wait = frames.remaining
+            if not self.paused:
+                wait = min(wait, self.simulation.until_next_step())
+            await asyncio.sleep(wait)
 
-    async def watch_runtime(self, runtime: float) -> None:
-        """Called when the time attribute changes."""
-        await self.simulation.tick(self.runtime - self.previous_runtime)
-        self.previous_runtime = self.runtime
-        mini_map = self.query_one(MiniMap)
-        mini_map.update(simulation=self.simulation)
+    async def autosave(self):
+        # waits for an autosave still being written, unlike save_now
+        try:
+            await self.snapshots.save(self.simulation)
+        except Exception as error:
+            # a save that failed leaves the last one in place; keep playing
+            self.notify(f"Autosave failed: {error}", severity="error", timeout=10)
 
-        player_status = self.query_one(PlayerStatus)
-        player_status.update(simulation=self.simulation)
+    async def on_unmount(self):
+        # the game loop would go on drawing into widgets already gone
+        self.workers.cancel_group(self, "game_loop")
+        if self.snapshots is not None:
+            await self.autosave()
 
-        log = self.query_one(GameLog)
-        log.set_lines(self.simulation.player.history)
+    def draw(self):
+        metrics = get_metrics()
+        with metrics.span("draw"):
+            with metrics.span("draw.minimap"):
+                mini_map = self.query_one(MiniMap)
+                mini_map.update(simulation=self.simulation)
 
-    def watch_paused(self, paused: bool):
-        if not paused:
-            self.start_time = monotonic()
+            with metrics.span("draw.status"):
+                player_status = self.query_one(PlayerStatus)
+                player_status.update(simulation=self.simulation)
+
+            with metrics.span("draw.log"):
+                log = self.query_one(GameLog)
+                log.set_lines(self.simulation.player.history, self.speech_in_progress())
+
+    def speech_in_progress(self):
+        player = self.simulation.player
+        return [
+            f"{actor.name} is saying: {actor.partial_response}..."
+            for actor in player.location.list_actors()
+            if getattr(actor, "partial_response", None)
+        ]
 
     def set_player_location(self, location: Location):
         if self.paused:
@@ -101,28 +227,31 @@ class TheForestGameScreen(Screen):
         env_text = self.query_one("#EnvironmentalText", BoxLabel)
         env_text.update(f"{location.emoji}\n\n{location.description}")
 
-    def action_left(self):
-        portal = self.simulation.player.location.get_exit("west")
+    def move_player(self, direction: Direction):
+        portal = self.simulation.player.location.get_exit(direction)
         if portal:
             self.set_player_location(portal.destination)
 
+    def action_left(self):
+        self.move_player(Direction.WEST)
+
     def action_right(self):
-        portal = self.simulation.player.location.get_exit("east")
-        if portal:
-            self.set_player_location(portal.destination)
+        self.move_player(Direction.EAST)
 
     def action_up(self):
-        portal = self.simulation.player.location.get_exit("north")
-        if portal:
-            self.set_player_location(portal.destination)
+        self.move_player(Direction.NORTH)
 
     def action_down(self):
-        portal = self.simulation.player.location.get_exit("south")
-        if portal:
-            self.set_player_location(portal.destination)
+        self.move_player(Direction.SOUTH)
 
-    def action_pause(self):
+    def action_debug_overlay(self):
+        self.app.push_screen(DebugOverlayScreen(self.profiler, self.profile_path))
+
+    async def action_pause(self):
         self.paused = not self.paused
+        if self.paused:
+            # nothing the NPCs were thinking about will still apply on resume
+            await self.simulation.cancel_turns()
 
     def compose(self) -> ComposeResult:
         yield Header()
@@ -133,7 +262,11 @@ class TheForestGameScreen(Screen):
                 classes="box column-left",
             ),
             Vertical(
-                MiniMap(id="MiniMap", classes="box"),
+                MiniMap(
+                    id="MiniMap",
+                    classes="box",
+                    viewport=AppSettings().minimap_viewport,
+                ),
                 BoxLabel(id="EnvironmentalText"),
                 PlayerStatus(id="PlayerStatus", classes="player_status"),
                 classes="box column-right",
@@ -152,11 +285,9 @@ class TheForestGameScreen(Screen):
         player = self.simulation.player
 
         if cmd.startswith("move"):
-            next_portal = cmd[5:].lower()
-            for portal in player.location.exits:
-                if portal.name.lower() == next_portal:
-                    player.location = portal.destination
-                    self.set_player_location(portal.destination)
+            portal = player.location.get_exit(cmd[5:])
+            if portal:
+                self.set_player_location(portal.destination)
 
         elif cmd.startswith("say"):
             player.queued_actions.append({"action": "say", "content": cmd[4:]})